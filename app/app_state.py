@@ -1,5 +1,8 @@
 # app/app_state.py
-from typing import Optional, Dict, Any
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 import cv2 as cv
 import numpy as np
 
@@ -8,10 +11,10 @@ from storage.recipe_router import RecipeRouter
 from storage.history_logger import HistoryLogger
 
 from core.pipeline import Pipeline
-from core.fixture.template_fixture import TemplateFixture
+from core.fixture.factory import fixture_from_recipe
 from core.tools.diff_from_ref import DiffFromRefTool
 from core.tools.presence_absence import PresenceAbsenceTool
-from core.tools.yolo_roi import YOLOInROITool
+from core.tools.yolo_roi import YOLOInROITool, preload_yolo_models, recipe_yolo_params
 from core.tools.edge_trace import EdgeTraceLineTool, EdgeTraceCircleTool, EdgeTraceCurveTool
 from core.tools.blob_count import BlobCountTool
 from core.tools.template_match import TemplateMatchTool
@@ -19,19 +22,143 @@ from core.tools.hough_circle import HoughCircleTool
 
 
 from interfaces.camera import ICamera
+from config.plc_map import (HR_STATION_BASE, HR_STATION_STRIDE, STN_RESULT_CODE, STN_CYCLE_MS, STN_CYCLE_ID,
+                            STN_RECIPE_ID, STN_MEASURES_0, STN_MEASURES_N)
 
-class AppState:
+
+def pipeline_from_recipe(recipe: Dict[str, Any]) -> Tuple[Pipeline, np.ndarray]:
     """
-    Drží: current recipe, referenčný obrázok, pipeline, logger a *kameru*.
+    Recept (dict) -> (Pipeline, referenčný obrázok); bez prepare a bez stavu aplikácie.
+    Používa ho AppState aj procesy inšpekčnej farmy (každý si pipeline postaví sám).
     """
-    def __init__(self):
-        self.store = RecipeStoreJSON()
-        self.router = RecipeRouter()
-        self.logger = HistoryLogger()
+    ref_path = recipe.get("reference_image", None)
+    if not ref_path:
+        raise FileNotFoundError("V recepte nie je reference_image.")
+    ref = cv.imread(ref_path, cv.IMREAD_GRAYSCALE)
+    if ref is None:
+        raise FileNotFoundError(f"Neviem načítať referenčný obrázok: {ref_path}")
+
+    fixture = fixture_from_recipe(recipe, ref)
+
+    tools_conf = recipe.get("tools", []) or []
+    tools = []
+    for t in tools_conf:
+        typ = (t.get("type", "") or "").lower()
+
+        if typ == "diff_from_ref":
+            tools.append(DiffFromRefTool(
+                name=t.get("name", "diff"),
+                roi_xywh=tuple(t.get("roi_xywh", [0, 0, ref.shape[1]//2, ref.shape[0]//2])),
+                params=t.get("params", {}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
+            ))
+
+        elif typ == "presence_absence":
+            tools.append(PresenceAbsenceTool(
+                name=t.get("name", "presence"),
+                roi_xywh=tuple(t.get("roi_xywh", [ref.shape[1]//2, 0, ref.shape[1]//2, ref.shape[0]//2])),
+                params=t.get("params", {"minScore": 0.7}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "score")
+            ))
+
+        elif typ == "yolo_roi":
+            # nastavenia ONNX Runtime z receptu ("yolo_engine"), ak ich tool nemá vlastné
+            yparams = dict(t.get("params", {}) or {})
+            if recipe.get("yolo_engine") and "engine" not in yparams:
+                yparams["engine"] = recipe["yolo_engine"]
+            tools.append(YOLOInROITool(
+                name=t.get("name", "yolo"),
+                roi_xywh=tuple(t.get("roi_xywh", [ref.shape[1]//2, 0, ref.shape[1]//2, ref.shape[0]//2])),
+                params=yparams,
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "count")
+            ))
+
+        elif typ == "_wip_edge_line":
+            tools.append(EdgeTraceLineTool(
+                name=t.get("name", "Edge line"),
+                roi_xywh=tuple(t.get("roi_xywh", [0, 0, 200, 200])),
+                params=t.get("params", {}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
+            ))
+
+        elif typ == "_wip_edge_circle":
+            tools.append(EdgeTraceCircleTool(
+                name=t.get("name", "Edge circle"),
+                roi_xywh=tuple(t.get("roi_xywh", [0, 0, 200, 200])),
+                params=t.get("params", {}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
+            ))
+
+        elif typ == "_wip_edge_curve":
+            tools.append(EdgeTraceCurveTool(
+                name=t.get("name", "Edge curve"),
+                roi_xywh=tuple(t.get("roi_xywh", [0, 0, 200, 200])),
+                params=t.get("params", {}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
+            ))
+
+        elif typ == "blob_count":
+            tools.append(BlobCountTool(
+                name=t.get("name", "Blob count"),
+                roi_xywh=tuple(t.get("roi_xywh", [0, 0, ref.shape[1]//2, ref.shape[0]//2])),
+                params=t.get("params", {"min_area": 120, "invert": False, "preproc": [], "mask_rects": []}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "ks")
+            ))
+        elif typ == "template_match":
+            tools.append(TemplateMatchTool(
+                name=t.get("name", "Template NCC"),
+                roi_xywh=tuple(t.get("roi_xywh", [0,0,200,200])),
+                params=t.get("params", {"min_score":0.7, "max_matches":5, "min_distance":12, "mode":"best", "preproc":[], "mask_rects":[]}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "score")
+            ))
+
+        elif typ == "hough_circle":
+            tools.append(HoughCircleTool(
+                name=t.get("name", "Hough circle"),
+                roi_xywh=tuple(t.get("roi_xywh", [0,0,200,200])),
+                params=t.get("params", {"dp":1.2,"minDist":12.0,"param1":100.0,"param2":30.0,"minRadius":0,"maxRadius":0,"preproc":[],"mask_rects":[]}),
+                lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "ks")
+            ))
+
+
+        else:
+            # neznámy typ – preskoč (môžeme zalogovať ak chceš)
+            pass
+
+
+    # voliteľné runtime nastavenia pipeline v recepte: "pipeline": {"parallel": true, "max_workers": 8, "mode": "fail_fast"}
+    pipe_opts = recipe.get("pipeline", {}) or {}
+    pipe = Pipeline(tools, fixture=fixture, pxmm=recipe.get("pxmm"),
+                    parallel=bool(pipe_opts.get("parallel", False)),
+                    max_workers=pipe_opts.get("max_workers") or None,
+                    mode=pipe_opts.get("mode", "full"))
+    return pipe, ref
+
+
+class Station:
+    """
+    ELI5: Jedna stanica = jedna kamera + jej recept/pipeline/referencia + blok PLC registrov.
+    Bunka s 2–3 kamerami na ten istý diel má 2–3 stanice; bežia súbežne, verdikty sa spoja podľa cyklu.
+    reg_base = začiatok bloku holding registrov stanice (rozloženie STN_* v config/plc_map).
+    """
+    def __init__(self, name: str, store: RecipeStoreJSON, reg_base: int = HR_STATION_BASE):
+        self.name = name
+        self.store = store
+        self.reg_base = int(reg_base)
         self.current_recipe: Optional[str] = None
         self.ref_img: Optional[np.ndarray] = None
         self.pipeline: Optional[Pipeline] = None
         self.camera: Optional[ICamera] = None
+        self.frame_seq: int = -1  # seq poslednej snímky vydanej z kamery (get_frame new_only)
+        self.last_frame: Optional[np.ndarray] = None
+        self.last_trigger_ms: Optional[float] = None  # trigger -> snímka v poslednom cykle s triggerom
+        self._lock = threading.Lock()  # jedna pipeline = jeden cyklus naraz (fixtúra/tools držia stav)
+        self._pending: Optional[Future] = None  # cyklus z run_cycle; kým nedobehne, stanica je "busy"
+
+    @property
+    def busy(self) -> bool:
+        """Predošlý cyklus stanice ešte beží (napr. prekročil timeout run_cycle)."""
+        return self._pending is not None and not self._pending.done()
 
     # --- kamera ---
     def set_camera(self, cam: ICamera):
@@ -40,17 +167,48 @@ class AppState:
                 self.camera.stop(); self.camera.close()
             except: pass
         self.camera = cam
+        self.frame_seq = -1
         try:
             self.camera.open(); self.camera.start()
         except Exception as e:
             raise RuntimeError(f"Kamera sa nespustila: {e}")
 
-    def get_frame(self, timeout_ms: int = 200) -> Optional[np.ndarray]:
+    def close(self):
+        if self.camera:
+            try:
+                self.camera.stop(); self.camera.close()
+            except: pass
+        if self.pipeline is not None:
+            self.pipeline.release()
+
+    def get_frame(self, timeout_ms: int = 200, new_only: bool = False) -> Optional[np.ndarray]:
+        """
+        Snímka z kamery ako read-only view (bez kópie). new_only=True: len snímka, ktorú sme ešte
+        nevydali (inak None po timeoute) – streaming tak nespracúva tú istú snímku opakovane.
+        """
+        if not self.camera:
+            return None
+        pkt = self.camera.get_frame_after(self.frame_seq if new_only else -1, timeout_ms=timeout_ms)
+        return self._take(pkt)
+
+    def trigger(self) -> Optional[float]:
+        """Diel je na mieste (PLC hrana): kamera si zapamätá čas triggeru."""
+        return self.camera.trigger() if self.camera else None
+
+    def get_frame_after_trigger(self, timeout_ms: int = 500) -> Optional[np.ndarray]:
+        """Prvá snímka zachytená po poslednom trigger() (nie tá, čo v ringu čakala spred dielu)."""
         if not self.camera:
             return None
-        frm = self.camera.get_frame(timeout_ms=timeout_ms)
-        if frm is None:
+        pkt = self.camera.get_frame_after_trigger(timeout_ms=timeout_ms)
+        if pkt is not None:
+            self.last_trigger_ms = self.camera.stats().get("trig_ms")
+        return self._take(pkt)
+
+    def _take(self, pkt) -> Optional[np.ndarray]:
+        if pkt is None:
             return None
+        self.frame_seq = max(self.frame_seq, pkt.seq)
+        frm = pkt.frame
         # pipeline počíta v grayscale, ale zvládne aj BGR; necháme grayscale
         if frm.ndim == 3:
             return cv.cvtColor(frm, cv.COLOR_BGR2GRAY)
@@ -59,104 +217,350 @@ class AppState:
     # --- recept/pipeline ---
     def build_from_recipe(self, recipe_name: str):
         recipe = self.store.load(recipe_name)
-        ref_path = recipe.get("reference_image", None)
-        if not ref_path:
-            raise FileNotFoundError("V recepte nie je reference_image.")
-        ref = cv.imread(ref_path, cv.IMREAD_GRAYSCALE)
-        if ref is None:
-            raise FileNotFoundError(f"Neviem načítať referenčný obrázok: {ref_path}")
-        self.ref_img = ref
-
-        fx = recipe.get("fixture", {"type":"template","tpl_xywh":[ref.shape[1]//2-100, ref.shape[0]//2-100, 200,200], "min_score":0.6})
-        x,y,w,h = fx.get("tpl_xywh",[0,0,200,200])
-        tpl = ref[y:y+h, x:x+w].copy()
-        fixture = TemplateFixture(tpl, min_score=float(fx.get("min_score",0.6)))
-
-        tools_conf = recipe.get("tools", []) or []
-        tools = []
-        for t in tools_conf:
-            typ = (t.get("type", "") or "").lower()
-
-            if typ == "diff_from_ref":
-                tools.append(DiffFromRefTool(
-                    name=t.get("name", "diff"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0, 0, ref.shape[1]//2, ref.shape[0]//2])),
-                    params=t.get("params", {}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
-                ))
-
-            elif typ == "presence_absence":
-                tools.append(PresenceAbsenceTool(
-                    name=t.get("name", "presence"),
-                    roi_xywh=tuple(t.get("roi_xywh", [ref.shape[1]//2, 0, ref.shape[1]//2, ref.shape[0]//2])),
-                    params=t.get("params", {"minScore": 0.7}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "score")
-                ))
-
-            elif typ == "yolo_roi":
-                tools.append(YOLOInROITool(
-                    name=t.get("name", "yolo"),
-                    roi_xywh=tuple(t.get("roi_xywh", [ref.shape[1]//2, 0, ref.shape[1]//2, ref.shape[0]//2])),
-                    params=t.get("params", {}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "count")
-                ))
-
-            elif typ == "_wip_edge_line":
-                tools.append(EdgeTraceLineTool(
-                    name=t.get("name", "Edge line"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0, 0, 200, 200])),
-                    params=t.get("params", {}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
-                ))
-
-            elif typ == "_wip_edge_circle":
-                tools.append(EdgeTraceCircleTool(
-                    name=t.get("name", "Edge circle"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0, 0, 200, 200])),
-                    params=t.get("params", {}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
-                ))
-
-            elif typ == "_wip_edge_curve":
-                tools.append(EdgeTraceCurveTool(
-                    name=t.get("name", "Edge curve"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0, 0, 200, 200])),
-                    params=t.get("params", {}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "px")
-                ))
-
-            elif typ == "blob_count":
-                tools.append(BlobCountTool(
-                    name=t.get("name", "Blob count"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0, 0, ref.shape[1]//2, ref.shape[0]//2])),
-                    params=t.get("params", {"min_area": 120, "invert": False, "preproc": [], "mask_rects": []}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "ks")
-                ))
-            elif typ == "template_match":
-                tools.append(TemplateMatchTool(
-                    name=t.get("name", "Template NCC"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0,0,200,200])),
-                    params=t.get("params", {"min_score":0.7, "max_matches":5, "min_distance":12, "mode":"best", "preproc":[], "mask_rects":[]}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "score")
-                ))
-
-            elif typ == "hough_circle":
-                tools.append(HoughCircleTool(
-                    name=t.get("name", "Hough circle"),
-                    roi_xywh=tuple(t.get("roi_xywh", [0,0,200,200])),
-                    params=t.get("params", {"dp":1.2,"minDist":12.0,"param1":100.0,"param2":30.0,"minRadius":0,"maxRadius":0,"preproc":[],"mask_rects":[]}),
-                    lsl=t.get("lsl", None), usl=t.get("usl", None), units=t.get("units", "ks")
-                ))
+        pipe, ref = pipeline_from_recipe(recipe)
+        pipe.prepare(ref)
+        # výmena pod zámkom cyklu: process() (RunWorker) nikdy nevidí starú pipeline s novou referenciou
+        with self._lock:
+            old = self.pipeline
+            self.ref_img, self.pipeline = ref, pipe
+            self.current_recipe = recipe_name
+        if old is not None:
+            old.release()  # až po prepare novej: spoločné modely ostanú pripnuté, nenačítajú sa znova
+
+    def process(self, img_cur: np.ndarray, mode: Optional[str] = None) -> Dict[str,Any]:
+        """mode: None = podľa receptu; "full" = všetky tools (overlay/log); "fail_fast" = len verdikt."""
+        assert self.pipeline is not None and self.ref_img is not None, "Pipeline/ref nie sú pripravené"
+        with self._lock:
+            return self.pipeline.process(self.ref_img, img_cur, mode=mode)
 
+    def _match_ref_size(self, frm: np.ndarray) -> np.ndarray:
+        hr, wr = self.ref_img.shape[:2]
+        return frm if frm.shape[:2] == (hr, wr) else cv.resize(frm, (wr, hr), interpolation=cv.INTER_AREA)
 
+    def capture_and_process(self, mode: Optional[str] = None, timeout_ms: int = 150,
+                            triggered: bool = False) -> Dict[str, Any]:
+        """
+        Jeden cyklus stanice: snímka -> (rozmer referencie) -> pipeline. Chyba = NOK výsledok, nie výnimka.
+        triggered=True: snímka až po trigger() (out["trigger_ms"] = trigger -> snímka).
+        """
+        t0 = time.perf_counter()
+        try:
+            if self.pipeline is None or self.camera is None:
+                raise RuntimeError("stanica nemá kameru/recept")
+            if triggered:
+                frm = self.get_frame_after_trigger(timeout_ms=timeout_ms)
             else:
-                # neznámy typ – preskoč (môžeme zalogovať ak chceš)
-                pass
+                frm = self.get_frame(timeout_ms=timeout_ms)
+            if frm is None:
+                raise RuntimeError("kamera nedodala snímku" + (" po triggeri" if triggered else ""))
+            frm = self._match_ref_size(frm)
+            self.last_frame = frm
+            out = self.process(frm, mode=mode)
+            if triggered:
+                out["trigger_ms"] = self.last_trigger_ms
+            return out
+        except Exception as e:
+            return {"ok": False, "elapsed_ms": (time.perf_counter() - t0) * 1000.0, "results": [],
+                    "error": f"{type(e).__name__}: {e}"}
 
 
-        self.pipeline = Pipeline(tools, fixture=fixture, pxmm=recipe.get("pxmm"))
-        self.current_recipe = recipe_name
+class CycleAggregator:
+    """
+    ELI5: Zbiera výsledky staníc podľa ID cyklu (trigger). Keď prídu všetky očakávané stanice,
+    vznikne jeden spojený výsledok: ok = všetky OK; results = výsledky staníc za sebou (v poradí staníc).
+    Neúplný cyklus po timeoute sa uzavrie ako NOK (chýbajúce stanice sú v "missing").
+    Jeden agregátor žije cez cykly (AppState): neskorý výsledok uzavretého cyklu sa zahodí; rovnaké ID
+    cyklu od PLC znova (begin) = nový cyklus. Platí prvý výsledok stanice v cykle.
+    """
+    def __init__(self, stations: List[str], timeout_s: float = 5.0):
+        self.stations = list(stations)
+        self.timeout_s = float(timeout_s)
+        self._open: Dict[Any, Dict[str, Any]] = {}
+        self._t0: Dict[Any, float] = {}
+        self._done: Dict[Any, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
 
-    def process(self, img_cur: np.ndarray) -> Dict[str,Any]:
-        assert self.pipeline is not None and self.ref_img is not None, "Pipeline/ref nie sú pripravené"
-        return self.pipeline.process(self.ref_img, img_cur)
+    def begin(self, cycle_id: Any) -> None:
+        """Trigger prišiel: od teraz sa meria wall_ms cyklu (inak od prvého výsledku)."""
+        with self._cond:
+            if self._done.pop(cycle_id, None) is not None:
+                self._open.pop(cycle_id, None)  # ID sa opakuje (PLC) -> starý výsledok neplatí
+                self._t0.pop(cycle_id, None)
+            self._t0.setdefault(cycle_id, time.monotonic())
+
+    def add(self, cycle_id: Any, station: str, out: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Výsledok jednej stanice; vráti spojený výsledok, ak je cyklus práve kompletný."""
+        with self._cond:
+            if cycle_id in self._done:
+                return None  # neskorý výsledok už uzavretého cyklu
+            got = self._open.setdefault(cycle_id, {})
+            self._t0.setdefault(cycle_id, time.monotonic())
+            if station in got:
+                return None  # napr. "busy" už zapísaný, neskorý výsledok predošlého cyklu s tým istým ID
+            got[station] = out
+            if all(n in got for n in self.stations):
+                return self._close_locked(cycle_id)
+            return None
+
+    def _close_locked(self, cycle_id: Any) -> Dict[str, Any]:
+        got = self._open.pop(cycle_id, {})
+        t0 = self._t0.pop(cycle_id, time.monotonic())
+        missing = [n for n in self.stations if n not in got]
+        results = []
+        for n in self.stations:
+            for r in (got.get(n) or {}).get("results", []) or []:
+                results.append(r)
+        combined = {
+            "cycle_id": cycle_id,
+            "ok": not missing and all(bool(got[n].get("ok", False)) for n in self.stations),
+            "elapsed_ms": max([float(o.get("elapsed_ms", 0.0)) for o in got.values()] or [0.0]),
+            "wall_ms": (time.monotonic() - t0) * 1000.0,
+            "results": results,
+            "stations": {n: got[n] for n in self.stations if n in got},
+            "missing": missing,
+        }
+        self._done[cycle_id] = combined
+        while len(self._done) > 64:
+            self._done.pop(next(iter(self._done)))
+        self._cond.notify_all()
+        return combined
+
+    def wait(self, cycle_id: Any, timeout_s: Optional[float] = None) -> Dict[str, Any]:
+        """Počká na spojený výsledok cyklu; po timeoute ho uzavrie ako neúplný (NOK)."""
+        deadline = time.monotonic() + (self.timeout_s if timeout_s is None else float(timeout_s))
+        with self._cond:
+            while cycle_id not in self._done:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    self._open.setdefault(cycle_id, {})
+                    return self._close_locked(cycle_id)
+                self._cond.wait(left)
+            return self._done[cycle_id]
+
+
+def write_station_block(mb, station: Station, out: Dict[str, Any], cycle_id: int) -> None:
+    """Výsledok stanice do jej bloku holding registrov (PLC vidí verdikt každej kamery zvlášť)."""
+    base = station.reg_base
+    mb.set_hr(base + STN_RESULT_CODE, 0 if out.get("ok", False) else 1)
+    mb.set_hr(base + STN_CYCLE_MS, int(out.get("elapsed_ms", 0.0)))
+    mb.set_hr(base + STN_CYCLE_ID, int(cycle_id) & 0xFFFF)
+    res = out.get("results", []) or []
+    for i in range(STN_MEASURES_N):
+        try:
+            val = int(round(float(getattr(res[i], "measured", 0.0)))) if i < len(res) else 0
+        except Exception:
+            val = 0
+        mb.set_hr(base + STN_MEASURES_0 + i, val)
+
+
+_STATION_POOL: Optional[ThreadPoolExecutor] = None
+_STATION_POOL_SIZE = 0
+
+
+def _station_pool(n: int) -> ThreadPoolExecutor:
+    # vlastný pool (nie pool tools): stanica v ňom čaká na svoje tools, na spoločnom poole by sa zasekla
+    global _STATION_POOL, _STATION_POOL_SIZE
+    if _STATION_POOL is None or _STATION_POOL_SIZE < n:
+        old = _STATION_POOL
+        _STATION_POOL_SIZE = max(2, n)
+        _STATION_POOL = ThreadPoolExecutor(max_workers=_STATION_POOL_SIZE, thread_name_prefix="qc-station")
+        if old is not None:
+            old.shutdown(wait=False)
+    return _STATION_POOL
+
+
+class AppState:
+    """
+    Drží: current recipe, referenčný obrázok, pipeline, logger a *kameru*.
+    Kamera/recept/pipeline patria hlavnej stanici ("main"); ďalšie stanice (ďalšie kamery na ten istý diel)
+    sú v self.stations a run_cycle() ich spustí súbežne so spojeným verdiktom.
+    """
+    def __init__(self):
+        self.store = RecipeStoreJSON()
+        self.router = RecipeRouter()
+        self.logger = HistoryLogger()
+        self.main = Station("main", self.store)
+        self.stations: Dict[str, Station] = {"main": self.main}
+        self._cycle_counter = 0
+        self._agg: Optional[CycleAggregator] = None  # jeden cez cykly (neskoré výsledky sa zahodia)
+
+    # --- hlavná stanica (pôvodné API jednej kamery) ---
+    current_recipe = property(lambda self: self.main.current_recipe,
+                              lambda self, v: setattr(self.main, "current_recipe", v))
+    ref_img = property(lambda self: self.main.ref_img, lambda self, v: setattr(self.main, "ref_img", v))
+    pipeline = property(lambda self: self.main.pipeline, lambda self, v: setattr(self.main, "pipeline", v))
+    camera = property(lambda self: self.main.camera, lambda self, v: setattr(self.main, "camera", v))
+    frame_seq = property(lambda self: self.main.frame_seq, lambda self, v: setattr(self.main, "frame_seq", v))
+
+    # --- kamera ---
+    def set_camera(self, cam: ICamera):
+        self.main.set_camera(cam)
+
+    def get_frame(self, timeout_ms: int = 200, new_only: bool = False) -> Optional[np.ndarray]:
+        """Snímka hlavnej kamery (read-only view, bez kópie); new_only = len ešte nevydaná snímka."""
+        return self.main.get_frame(timeout_ms=timeout_ms, new_only=new_only)
+
+    def trigger(self) -> Optional[float]:
+        return self.main.trigger()
+
+    def get_frame_after_trigger(self, timeout_ms: int = 500) -> Optional[np.ndarray]:
+        """Snímka hlavnej kamery zachytená po poslednom trigger()."""
+        return self.main.get_frame_after_trigger(timeout_ms=timeout_ms)
+
+    # --- stanice ---
+    def add_station(self, name: str, reg_base: Optional[int] = None, camera: Optional[ICamera] = None,
+                    recipe: Optional[str] = None) -> Station:
+        """
+        Ďalšia stanica; reg_base default = najnižší voľný blok registrov (HR_STATION_BASE + i*STRIDE).
+        Explicitný reg_base, ktorý sa prekrýva s blokom inej stanice, je chyba (PLC by čítal zmes dvoch kamier).
+        """
+        if name in self.stations:
+            raise ValueError(f"Stanica {name} už existuje")
+        if reg_base is None:
+            reg_base = self._free_reg_base()
+        else:
+            reg_base = int(reg_base)
+            for other in self.stations.values():
+                if abs(other.reg_base - reg_base) < HR_STATION_STRIDE:
+                    raise ValueError(f"Stanica {name}: blok registrov {reg_base} sa prekrýva "
+                                     f"so stanicou {other.name} ({other.reg_base})")
+        st = Station(name, self.store, reg_base)
+        if recipe:
+            st.build_from_recipe(recipe)
+        if camera is not None:
+            st.set_camera(camera)
+        self.stations[name] = st
+        return st
+
+    def _free_reg_base(self, taken: Optional[List[int]] = None) -> int:
+        used = [st.reg_base for st in self.stations.values()] + list(taken or [])
+        i = 0
+        while True:
+            base = HR_STATION_BASE + i * HR_STATION_STRIDE
+            if all(abs(u - base) >= HR_STATION_STRIDE for u in used):
+                return base
+            i += 1
+
+    def remove_station(self, name: str):
+        if name == "main":
+            raise ValueError("Hlavnú stanicu nemožno odstrániť")
+        st = self.stations.pop(name, None)
+        if st is not None:
+            st.close()
+
+    def configure_stations(self, cfgs: List[Dict[str, Any]], make_camera) -> List[str]:
+        """
+        Ďalšie stanice zo settings ("stations": [{name, camera_type, url, recipe, reg_base}]).
+        make_camera(cam_type, url) -> ICamera. Vráti chyby (stanica s chybou sa preskočí, app beží ďalej).
+        Blok registrov bez reg_base = podľa poradia v zozname (i-tá stanica -> HR_STATION_BASE + i*STRIDE,
+        hlavná je 0.), ak ho nemá iná stanica – opakovaná konfigurácia tak dá stanici vždy ten istý blok.
+        """
+        errors = []
+        cfgs = [c for c in (cfgs or []) if c.get("name") and c.get("name") != "main"]
+        for c in cfgs:
+            if c["name"] in self.stations:
+                self.remove_station(c["name"])
+        explicit = [int(c["reg_base"]) for c in cfgs if c.get("reg_base") is not None]
+        bases: List[Optional[int]] = []
+        for i, c in enumerate(cfgs, start=1):
+            if c.get("reg_base") is not None:
+                bases.append(int(c["reg_base"]))
+                continue
+            taken = explicit + [b for b in bases if b is not None]
+            pref = HR_STATION_BASE + i * HR_STATION_STRIDE
+            used = taken + [st.reg_base for st in self.stations.values()]
+            free = all(abs(u - pref) >= HR_STATION_STRIDE for u in used)
+            bases.append(pref if free else self._free_reg_base(taken))
+        for c, base in zip(cfgs, bases):
+            name = c["name"]
+            try:
+                cam = make_camera(c.get("camera_type"), c.get("url", "")) if c.get("camera_type") else None
+                self.add_station(name, base, cam, c.get("recipe"))
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+        return errors
+
+    def next_cycle_id(self) -> int:
+        self._cycle_counter += 1
+        return self._cycle_counter
+
+    def run_cycle(self, cycle_id: Optional[int] = None, mode: Optional[str] = None, plc_mb=None,
+                  timeout_s: float = 5.0, triggered: bool = False, frame_timeout_ms: int = 500) -> Dict[str, Any]:
+        """
+        Jeden trigger = všetky stanice súbežne (každá svoja kamera + pipeline) -> jeden spojený výsledok.
+        plc_mb (ModbusApp): recept stanice podľa jej STN_RECIPE_ID, výsledok stanice do jej bloku registrov.
+        triggered=True: všetky kamery dostanú trigger() hneď (pred prepínaním receptov) a každá stanica
+        spracuje až svoju prvú snímku zachytenú po ňom.
+        Stanica, ktorej predošlý cyklus ešte beží (timeout), sa nespúšťa znova (dve pipeline.process nad tými
+        istými tools/kamerou, prestavba receptu počas behu) – v tomto cykle dá NOK "busy".
+        """
+        cycle_id = self.next_cycle_id() if not cycle_id else int(cycle_id)
+        stations = list(self.stations.values())
+        names = [st.name for st in stations]
+        if self._agg is None or self._agg.stations != names:
+            self._agg = CycleAggregator(names, timeout_s=timeout_s)
+        agg = self._agg
+        agg.begin(cycle_id)
+        ready = [st for st in stations if not st.busy]
+        for st in stations:
+            if st.busy:
+                agg.add(cycle_id, st.name, {"ok": False, "elapsed_ms": 0.0, "results": [],
+                                            "error": "busy: predošlý cyklus stanice ešte beží"})
+        if triggered:
+            for st in ready:
+                st.trigger()
+        if plc_mb is not None:
+            for st in ready:
+                self._switch_station_recipe(st, plc_mb)
+        pool = _station_pool(len(stations))
+        for st in ready:
+            fut = pool.submit(st.capture_and_process, mode, frame_timeout_ms if triggered else 150, triggered)
+            st._pending = fut
+            fut.add_done_callback(lambda f, st=st: agg.add(cycle_id, st.name, f.result()))
+        out = agg.wait(cycle_id, timeout_s)
+        if plc_mb is not None:
+            for st in stations:
+                try:
+                    write_station_block(plc_mb, st, out["stations"].get(st.name, {"ok": False}), cycle_id)
+                except Exception:
+                    pass
+        return out
+
+    def _switch_station_recipe(self, st: Station, plc_mb):
+        try:
+            rid = int(plc_mb.get_hr(st.reg_base + STN_RECIPE_ID))
+        except Exception:
+            return
+        name = self.router.resolve_by_id(rid) if rid else None
+        if name and name != st.current_recipe:
+            try:
+                st.build_from_recipe(name)
+            except Exception:
+                pass  # zlý recept = stanica dá NOK s chybou, cyklus nepadá
+
+    # --- recept/pipeline ---
+    def preload_recipe(self, recipe_name: Optional[str]):
+        """
+        Ďalší recept je známy (PLC ID, kód, výber v GUI), ale ešte sa neprepína:
+        jeho modely sa načítajú na pozadí, build_from_recipe ich potom len vezme z registra.
+        """
+        if not recipe_name:
+            return None  # (už načítané modely register preskočí, netreba porovnávať s current_recipe)
+        try:
+            recipe = self.store.load(recipe_name)
+        except Exception:
+            return None
+        return preload_yolo_models(recipe_yolo_params(recipe))
+
+    def preload_for_id(self, plc_id: Optional[int]):
+        return self.preload_recipe(self.router.resolve_by_id(plc_id)) if plc_id else None
+
+    def preload_for_code(self, code: Optional[str]):
+        return self.preload_recipe(self.router.resolve_by_code(code)) if code else None
+
+    def build_from_recipe(self, recipe_name: str):
+        self.main.build_from_recipe(recipe_name)
+
+    def process(self, img_cur: np.ndarray, mode: Optional[str] = None) -> Dict[str,Any]:
+        """mode: None = podľa receptu; "full" = všetky tools (overlay/log); "fail_fast" = len verdikt."""
+        return self.main.process(img_cur, mode=mode)
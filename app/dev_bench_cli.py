@@ -0,0 +1,187 @@
+# app/dev_bench_cli.py
+# ELI5: Zmeria čas cyklu pipeline na syntetickom (alebo zadanom) snímku.
+#   - "legacy": každý tool si sám zarovná (full-frame warp) + zgrayuje celý frame (pôvodná cesta)
+#   - "ctx":    Pipeline postaví jeden FrameContext, tools ho zdieľajú
+#               (pri posune/afinite sa warpuje len ROI, nie celý frame)
+#   - "parallel": to isté + tools súbežne na zdieľanom thread poole
+#   --letterbox: mikro-benchmark YOLO predspracovania 640x640 (pôvodné vs. do perzistentného buffera)
+import argparse, sys, time
+from pathlib import Path
+
+# umožní spúšťanie aj cez "python app/dev_bench_cli.py"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import numpy as np
+import cv2 as cv
+
+from core.pipeline import Pipeline
+from core.frame_context import align_to_ref, transform_kind
+from core.tools.preproc_plan import plan_stats
+from core.tools.diff_from_ref import DiffFromRefTool
+from core.tools.presence_absence import PresenceAbsenceTool
+from core.tools.blob_count import BlobCountTool
+from core.tools.template_match import TemplateMatchTool
+from core.tools.hough_circle import HoughCircleTool
+from core.tools.edge_trace import EdgeTraceLineTool
+from core.tools.yolo_roi import _letterbox, letterbox_into
+
+
+class _FixedFixture:
+    """Fixtúra s pevnou maticou – benchmark meria tools, nie hľadanie fixtúry."""
+    def __init__(self, H):
+        self.H = H
+
+    def estimate_transform(self, img_cur):
+        return self.H
+
+
+def synth_frames(w: int, h: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ref = np.full((h, w), 140, np.uint8)
+    cv.rectangle(ref, (w // 8, h // 8), (w * 7 // 8, h * 7 // 8), 150, -1)
+    for _ in range(40):
+        cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+        cv.circle(ref, (cx, cy), int(rng.integers(10, 60)), int(rng.integers(60, 220)), -1)
+    ref = cv.add(ref, rng.integers(0, 6, size=ref.shape, dtype=np.uint8))
+    cur = ref.copy()
+    cv.circle(cur, (w // 2, h // 2), 15, 255, -1)
+    cv.rectangle(cur, (w // 3, h // 3), (w // 3 + 40, h // 3 + 40), 30, -1)
+    return ref, cur
+
+
+def build_tools(w: int, h: int, n_tools: int):
+    """Zmes typických nástrojov na rôznych ROI (opakuje sa, kým nie je n_tools)."""
+    rw, rh = max(64, w // 6), max(64, h // 6)
+    tools = []
+    for i in range(n_tools):
+        x = (i * rw) % max(1, w - rw)
+        y = ((i * rw) // max(1, w - rw) * rh) % max(1, h - rh)
+        roi = (int(x), int(y), int(rw), int(rh))
+        kind = i % 6
+        pre = [{"op": "median", "k": 3}, {"op": "clahe", "clip": 2.0, "tile": 8}]
+        if kind == 0:
+            tools.append(DiffFromRefTool(f"diff{i}", roi, {"blur": 3, "thresh": 25, "preproc": pre}, usl=500.0))
+        elif kind == 1:
+            tools.append(PresenceAbsenceTool(f"presence{i}", roi, {"minScore": 0.5, "preproc": pre}))
+        elif kind == 2:
+            tools.append(BlobCountTool(f"blob{i}", roi, {"min_area": 50, "preproc": pre}))
+        elif kind == 3:
+            tools.append(TemplateMatchTool(f"tm{i}", roi, {"min_score": 0.7, "preproc": pre}))
+        elif kind == 4:
+            tools.append(HoughCircleTool(f"hough{i}", roi, {"minDist": 20.0, "preproc": pre}))
+        else:
+            pts = [[roi[0] + 5, roi[1] + rh // 2], [roi[0] + rw - 5, roi[1] + rh // 2]]
+            tools.append(EdgeTraceLineTool(f"edge{i}", roi, {"shape": "line", "pts": pts, "width": 5}))
+    return tools
+
+
+def _stats(ms):
+    a = np.array(ms, dtype=float)
+    return {"mean": float(a.mean()), "p50": float(np.percentile(a, 50)),
+            "p95": float(np.percentile(a, 95)), "max": float(a.max())}
+
+
+def bench(fn, iters: int, warmup: int = 2):
+    for _ in range(warmup):
+        fn()
+    ms = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        ms.append((time.perf_counter() - t0) * 1000.0)
+    return _stats(ms)
+
+
+def bench_letterbox(iters: int, size: int = 640):
+    """YOLO preproc: _letterbox + [::-1] + astype/255 + transpose vs. letterbox_into do jedného buffera."""
+    rng = np.random.default_rng(0)
+    canvas = np.full((size, size, 3), 114, np.uint8)
+    blob = np.empty((1, 3, size, size), np.float32)
+    print(f"letterbox {size}x{size}  iters={iters}")
+    for (h, w) in [(size, size), (480, 640), (1500, 2000), (200, 900)]:
+        roi = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+        def legacy():
+            im, _, _ = _letterbox(roi, new_shape=(size, size))
+            im = im[:, :, ::-1].astype(np.float32) / 255.0
+            return np.transpose(im, (2, 0, 1))[None, ...]
+
+        def into():
+            letterbox_into(roi, blob[0], canvas)
+            return blob
+
+        same = np.array_equal(legacy(), into())
+        a, b = bench(legacy, iters), bench(into, iters)
+        print(f"  roi={w}x{h:<5} legacy={a['mean']:7.3f} ms  into={b['mean']:7.3f} ms  "
+              f"speedup={a['mean'] / max(1e-9, b['mean']):.2f}x  same={same}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ref", default=None, help="Referenčný obrázok (inak syntetický)")
+    ap.add_argument("--cur", default=None, help="Aktuálny obrázok (inak syntetický)")
+    ap.add_argument("--width", type=int, default=2592, help="Šírka syntetického snímku (default 5 MP)")
+    ap.add_argument("--height", type=int, default=1944)
+    ap.add_argument("--tools", type=int, default=10, help="Počet nástrojov v recepte")
+    ap.add_argument("--iters", type=int, default=20)
+    ap.add_argument("--shift", type=float, default=3.0, help="Posun fixtúry v px (0 = bez H)")
+    ap.add_argument("--workers", type=int, default=0, help="Počet workerov pre paralelný režim (0 = podľa jadier)")
+    ap.add_argument("--profile", action="store_true", help="Vypíš časy preproc krokov (PreprocPlan)")
+    ap.add_argument("--letterbox", action="store_true", help="Len mikro-benchmark YOLO letterboxu 640x640")
+    args = ap.parse_args()
+
+    if args.letterbox:
+        bench_letterbox(max(args.iters, 50))
+        return
+
+    if args.ref and args.cur:
+        ref = cv.imread(args.ref, cv.IMREAD_GRAYSCALE)
+        cur = cv.imread(args.cur, cv.IMREAD_GRAYSCALE)
+        if ref is None or cur is None:
+            raise FileNotFoundError(f"{args.ref} / {args.cur}")
+    else:
+        ref, cur = synth_frames(args.width, args.height)
+    h, w = ref.shape[:2]
+
+    H = None
+    if args.shift:
+        H = np.array([[1.0, 0.0, args.shift], [0.0, 1.0, args.shift], [0.0, 0.0, 1.0]], dtype=np.float32)
+
+    tools = build_tools(w, h, args.tools)
+    pipe = Pipeline(tools, fixture=_FixedFixture(H))
+    pipe_par = Pipeline(tools, fixture=_FixedFixture(H), parallel=True, max_workers=args.workers or None)
+    pipe.prepare(ref)
+
+    def legacy_cycle():
+        # pôvodná cesta: každý tool si sám robí warp + gray celého framu
+        for t in tools:
+            t.run(ref, align_to_ref(ref, cur, H), None)
+
+    def ctx_cycle():
+        pipe.process(ref, cur)
+
+    def parallel_cycle():
+        parallel_cycle.last = pipe_par.process(ref, cur)
+
+    print(f"frame={w}x{h}  tools={len(tools)}  iters={args.iters}  H={transform_kind(H)}")
+    res = {"legacy": bench(legacy_cycle, args.iters), "ctx": bench(ctx_cycle, args.iters),
+           "parallel": bench(parallel_cycle, args.iters)}
+    for name, st in res.items():
+        print(f"  {name:<8} mean={st['mean']:8.2f} ms  p50={st['p50']:8.2f}  p95={st['p95']:8.2f}  max={st['max']:8.2f}")
+    print(f"  speedup ctx/legacy (mean)      = {res['legacy']['mean'] / max(1e-9, res['ctx']['mean']):.2f}x")
+    print(f"  speedup parallel/ctx (mean)    = {res['ctx']['mean'] / max(1e-9, res['parallel']['mean']):.2f}x")
+    tool_ms = parallel_cycle.last.get("tool_ms", [])
+    if tool_ms:
+        print(f"  najpomalší tool = {max(tool_ms):.2f} ms, súčet tools = {sum(tool_ms):.2f} ms")
+
+    if args.profile:
+        print("preproc (per op):")
+        for key, steps in plan_stats().items():
+            print(f"  {key}")
+            for st in steps:
+                print(f"    {st['op']:<10} n={st['count']:<6} mean={st['mean_ms']:.3f} ms  total={st['total_ms']:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# app/dev_farm_cli.py
+# ELI5: Zmeria priepustnosť inšpekčnej farmy (N procesov, snímky cez zdieľanú pamäť)
+# oproti jednému procesu, ktorý snímky spracúva za sebou.
+#   --recipe NAME   recept zo store (inak syntetický recept + syntetická snímka ako dev_bench_cli)
+#   --workers 1,2,4 zoznam veľkostí farmy na porovnanie
+#   --replay PATH   snímky z priečinka/videa (ReplayCamera, predčítané – dekód z disku nie je v meraní)
+# Overí aj, že výsledky chodia v poradí snímok a verdikty sa zhodujú s jedným procesom.
+import argparse, sys, tempfile, time
+from pathlib import Path
+
+# umožní spúšťanie aj cez "python app/dev_farm_cli.py"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import numpy as np
+import cv2 as cv
+
+from app.app_state import pipeline_from_recipe
+from app.dev_bench_cli import synth_frames
+from app.inspection_farm import InspectionFarm
+from qcio.cameras.replay_camera import ReplayCamera
+from storage.recipe_store_json import RecipeStoreJSON
+
+
+def synth_recipe(ref: np.ndarray, n_tools: int, tmp_dir: str) -> dict:
+    """Recept s mixom lacných/drahších tools nad syntetickou referenciou (uloženou do tmp)."""
+    h, w = ref.shape[:2]
+    ref_path = str(Path(tmp_dir) / "farm_ref.png")
+    cv.imwrite(ref_path, ref)
+    rw, rh = max(64, w // 6), max(64, h // 6)
+    pre = [{"op": "median", "k": 3}, {"op": "clahe", "clip": 2.0, "tile": 8}]
+    kinds = [("diff_from_ref", {"blur": 3, "thresh": 25, "preproc": pre}),
+             ("blob_count", {"min_area": 50, "preproc": pre}),
+             ("template_match", {"min_score": 0.7, "preproc": pre}),
+             ("hough_circle", {"minDist": 20.0, "preproc": pre})]
+    tools = []
+    for i in range(n_tools):
+        x = (i * rw) % max(1, w - rw)
+        y = ((i * rw) // max(1, w - rw) * rh) % max(1, h - rh)
+        typ, params = kinds[i % len(kinds)]
+        tools.append({"type": typ, "name": f"{typ}{i}", "roi_xywh": [int(x), int(y), int(rw), int(rh)],
+                      "params": params, "usl": 500.0 if typ == "diff_from_ref" else None})
+    return {"reference_image": ref_path, "tools": tools,
+            "fixture": {"type": "template", "tpl_xywh": [w // 2 - 100, h // 2 - 100, 200, 200], "min_score": 0.3}}
+
+
+def _pct(a, q):
+    return float(np.percentile(np.asarray(a, float), q)) if a else 0.0
+
+
+def bench_single(recipe: dict, frames, mode):
+    pipe, ref = pipeline_from_recipe(recipe)
+    pipe.prepare(ref)
+    pipe.process(ref, frames[0], mode=mode)  # warmup
+    verdicts = []
+    t0 = time.perf_counter()
+    for f in frames:
+        verdicts.append(bool(pipe.process(ref, f, mode=mode)["ok"]))
+    dt = time.perf_counter() - t0
+    pipe.release()
+    return len(frames) / dt, verdicts
+
+
+def bench_farm(recipe: dict, frames, workers: int, mode, cv_threads: int):
+    shape = frames[0].shape
+    farm = InspectionFarm(workers=workers, max_shape=shape, mode=mode, cv_threads=cv_threads)
+    t_start = time.perf_counter()
+    farm.start(recipe)
+    t_ready = time.perf_counter() - t_start
+    for e in farm.errors:
+        print(f"    ! {e}")
+
+    results = []
+    t0 = time.perf_counter()
+    sent = 0
+    while len(results) < len(frames):
+        # posielaj, kým sú voľné sloty; inak zober hotový výsledok
+        if sent < len(frames) and farm.in_flight() < farm.slots:
+            if farm.submit(frames[sent], timeout=None) is not None:
+                sent += 1
+            continue
+        r = farm.get_result(timeout=0.05)
+        if r is not None:
+            results.append(r)
+    dt = time.perf_counter() - t0
+    st = farm.stats()
+    farm.stop()
+    in_order = [r.seq for r in results] == list(range(len(frames)))
+    return {"fps": len(frames) / dt, "ready_s": t_ready, "in_order": in_order,
+            "verdicts": [bool(r.out.get("ok")) for r in results],
+            "lat_p50": _pct([r.latency_ms for r in results], 50), "lat_p95": _pct([r.latency_ms for r in results], 95),
+            "proc_ms": _pct([r.proc_ms for r in results], 50),
+            "per_worker": np.bincount([r.worker for r in results], minlength=workers).tolist(),
+            "dropped": st["dropped"]}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--recipe", default=None, help="Názov receptu zo store (inak syntetický)")
+    ap.add_argument("--cur", default=None, help="Snímka na spracovanie (pri --recipe povinná, ak nie je --replay)")
+    ap.add_argument("--replay", default=None, help="Priečinok obrázkov / video ako zdroj snímok (s --recipe)")
+    ap.add_argument("--replay_preload", default="memory", choices=["memory", "memmap"],
+                    help="memmap = dekód raz do .npy cache vedľa zdroja, ďalšie behy štartujú hneď")
+    ap.add_argument("--width", type=int, default=2592)
+    ap.add_argument("--height", type=int, default=1944)
+    ap.add_argument("--tools", type=int, default=12, help="Počet tools syntetického receptu")
+    ap.add_argument("--frames", type=int, default=60)
+    ap.add_argument("--workers", default="1,2,4", help="Veľkosti farmy, napr. 1,2,4")
+    ap.add_argument("--mode", default=None, choices=[None, "full", "fail_fast"])
+    ap.add_argument("--cv_threads", type=int, default=1, help="cv.setNumThreads v každom workeri")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.replay and not args.recipe:
+            raise SystemExit("--replay potrebuje --recipe (syntetický recept nesedí na reálne snímky)")
+        if args.recipe:
+            recipe = RecipeStoreJSON().load(args.recipe)
+            cur = cv.imread(args.cur, cv.IMREAD_GRAYSCALE) if args.cur else None
+            if cur is None and not args.replay:
+                raise FileNotFoundError(f"--cur {args.cur}")
+        else:
+            ref, cur = synth_frames(args.width, args.height)
+            recipe = synth_recipe(ref, args.tools, tmp)
+        if args.replay:
+            # fps=0: každé get_frame_after() = ďalšia snímka zo zásobníka (s loopom), nič sa nestratí
+            cam = ReplayCamera(args.replay, fps=0, loop=True, preload=args.replay_preload, gray=True)
+            cam.open()
+            frames = [cam.get_frame_after(timeout_ms=0).frame for _ in range(args.frames)]
+            cur = frames[0]
+            print(f"replay: {len(cam)} snímok z {args.replay} (preload={args.replay_preload})")
+        else:
+            # mierne odlišné snímky (nech sa nespracúva stále to isté)
+            rng = np.random.default_rng(1)
+            frames = [cv.add(cur, rng.integers(0, 3, size=cur.shape, dtype=np.uint8)) for _ in range(args.frames)]
+
+        h, w = cur.shape[:2]
+        print(f"frame={w}x{h}  frames={args.frames}  recipe={args.recipe or 'synth'}")
+        fps1, ref_verdicts = bench_single(recipe, frames, args.mode)
+        print(f"  1 proces         {fps1:7.2f} fps")
+        for n in [int(v) for v in args.workers.split(",") if v.strip()]:
+            r = bench_farm(recipe, frames, n, args.mode, args.cv_threads)
+            print(f"  farma {n:<2} workerov {r['fps']:7.2f} fps  ({r['fps'] / max(1e-9, fps1):.2f}x)  "
+                  f"lat p50={r['lat_p50']:.1f} p95={r['lat_p95']:.1f} ms  proc p50={r['proc_ms']:.1f} ms  "
+                  f"štart={r['ready_s']:.1f} s  poradie={'OK' if r['in_order'] else 'ZLÉ'}  "
+                  f"verdikty={'zhoda' if r['verdicts'] == ref_verdicts else 'ROZDIEL'}  "
+                  f"na workera={r['per_worker']}  drop={r['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
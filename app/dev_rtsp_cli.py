@@ -2,25 +2,58 @@
 import argparse, cv2 as cv, time
 from qcio.cameras.rtsp_camera import RTSPCamera
 
+def _fmt_stats(st):
+    lag = st.get("lag_ms")
+    return (f"{st.get('fps', 0.0):5.1f} fps | read {st.get('read_ms', 0.0):5.1f} ms | "
+            f"oneskorenie {'--' if lag is None else f'{lag:.0f}'} ms (max {st.get('lag_ms_max', 0.0):.0f}) | "
+            f"skip {st.get('skipped', 0)} | drop {st.get('dropped', 0)} | reconn {st.get('reconnects', 0)}"
+            + (f" | trig {st['trig_ms']:.0f} ms (avg {st.get('trig_ms_avg', 0.0):.0f}, max {st.get('trig_ms_max', 0.0):.0f}"
+               f", timeout {st.get('trig_timeouts', 0)})" if st.get("trig_ms") is not None else ""))
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--url", required=True, help="RTSP URL (rtsp://user:pass@ip:554/...)")
+    ap.add_argument("--low_latency", action="store_true",
+                    help="Low-latency: grab() vyprázdni buffer, retrieve() len najnovšej snímky + low-delay FFmpeg voľby")
+    ap.add_argument("--headless", action="store_true", help="Bez okna, len telemetria (napr. cez SSH)")
+    ap.add_argument("--seconds", type=float, default=0.0, help="Koniec po N sekundách (0 = do ESC / Ctrl+C)")
+    ap.add_argument("--consumer_ms", type=float, default=0.0, help="Simulovaný čas spracovania snímky (pomalý konzument)")
+    ap.add_argument("--trigger_ms", type=float, default=0.0,
+                    help="Simulovaný PLC trigger každých N ms: trigger() + prvá snímka zachytená po ňom (latencia trig)")
     args = ap.parse_args()
 
-    cam = RTSPCamera(args.url)
+    cam = RTSPCamera(args.url, low_latency=args.low_latency)
     cam.open(); cam.start()
-    print("RTSP kamera beží. Stlač ESC pre ukončenie.")
+    print(f"RTSP kamera beží (low_latency={args.low_latency}). Stlač ESC / Ctrl+C pre ukončenie.")
 
-    while True:
-        frame = cam.get_frame(timeout_ms=500)
-        if frame is not None:
-            cv.imshow("RTSP", frame)
-        k = cv.waitKey(1) & 0xff
-        if k == 27:  # ESC
-            break
+    t_start = t_print = time.monotonic()
+    last, age = -1, float("nan")
+    try:
+        while not args.seconds or time.monotonic() - t_start < args.seconds:
+            if args.trigger_ms:
+                time.sleep(args.trigger_ms / 1000.0)  # len simulácia rozostupu dielov, nie čakanie na snímku
+                cam.trigger()
+                pkt = cam.get_frame_after_trigger(timeout_ms=500)
+            else:
+                pkt = cam.get_frame_after(last, timeout_ms=500)
+            if pkt is not None:
+                last = pkt.seq
+                age = (time.monotonic() - pkt.ts) * 1000.0 if pkt.ts is not None else float("nan")
+                if args.consumer_ms:
+                    time.sleep(args.consumer_ms / 1000.0)
+                if not args.headless:
+                    cv.imshow("RTSP", pkt.frame)
+            if time.monotonic() - t_print >= 1.0:
+                t_print = time.monotonic()
+                print(f"{_fmt_stats(cam.stats())} | snímka pri spracovaní stará {age:.0f} ms")
+            if not args.headless and (cv.waitKey(1) & 0xff) == 27:  # ESC
+                break
+    except KeyboardInterrupt:
+        pass
 
     cam.stop(); cam.close()
-    cv.destroyAllWindows()
+    if not args.headless:
+        cv.destroyAllWindows()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,290 @@
+# app/dev_yolo_quant_cli.py
+# ELI5: INT8 verzia YOLO modelu pre linkové PC (ORT na CPU).
+#   1) kvantizácia: "static" (kalibrácia na snímkach z datasets/<recipe>/ok|nok) alebo "dynamic" (bez kalibrácie)
+#   2) porovnanie: oba modely na tých istých snímkach (ROI z YOLO tools receptu) – zhoda detekcií + latencia p50/p95/p99
+#   3) ak zhoda >= --min_agreement, navrhne (s --write aj zapíše) onnx_path na INT8 model do receptu
+import argparse, json, sys, time
+from pathlib import Path
+
+# umožní spúšťanie aj cez "python app/dev_yolo_quant_cli.py"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import numpy as np
+import cv2 as cv
+
+from storage.recipe_store_json import RecipeStoreJSON
+from core.tools.yolo_roi import YOLOModel, YOLOInROITool, batched_nms, letterbox_into, tile_grid
+
+try:
+    from onnxruntime import quantization as ortq
+except Exception:
+    ortq = None  # bez ORT sa kvantizovať nedá (YOLOModel hlási chýbajúce ORT sám)
+
+IMG_EXT = ("*.png", "*.jpg", "*.bmp")
+
+
+def list_images(d: Path):
+    if not d or not d.exists():
+        return []
+    return sorted(p for ext in IMG_EXT for p in d.glob(ext))
+
+
+def yolo_tools(recipe: dict, onnx_path: str):
+    """YOLO tools receptu, ktoré používajú daný model (porovnanie/kalibrácia ide na ich ROI)."""
+    out = []
+    for t in recipe.get("tools", []):
+        if t.get("type") == "yolo_roi" and (t.get("params") or {}).get("onnx_path") == onnx_path:
+            out.append(t)
+    return out
+
+
+def samples(paths, rois):
+    """(názov, BGR ROI) pre každý snímok x ROI; bez ROI = celý snímok."""
+    for p in paths:
+        img = cv.imread(str(p), cv.IMREAD_COLOR)
+        if img is None:
+            continue
+        if not rois:
+            yield p.name, img
+            continue
+        for i, (x, y, w, h) in enumerate(rois):
+            crop = img[max(0, y):y + h, max(0, x):x + w]
+            if crop.size > 0:
+                yield f"{p.name}#{i}", crop
+
+
+def calib_crops(items, params: dict, in_hw):
+    """Dlaždicový tool (params["tiled"]) vidí v RUN dlaždice, nie zmenšené ROI -> kalibrácia na dlaždiciach."""
+    for name, roi in items:
+        if not params.get("tiled"):
+            yield name, roi
+            continue
+        h, w = roi.shape[:2]
+        for tx, ty, tw, th in tile_grid(w, h, int(params.get("tile_size") or max(in_hw)),
+                                        float(params.get("tile_overlap", 0.2)), int(params.get("max_tiles", 16))):
+            yield name, roi[ty:ty + th, tx:tx + tw]
+
+
+class _CalibReader(ortq.CalibrationDataReader if ortq is not None else object):
+    """Kalibračné vstupy pre quantize_static – rovnaký letterbox ako v RUN (YOLOModel)."""
+
+    def __init__(self, input_name: str, in_hw, rois_iter, limit: int):
+        h, w = in_hw
+        canvas = np.full((h, w, 3), 114, np.uint8)
+        self.blobs = []
+        for _, roi in rois_iter:
+            blob = np.empty((1, 3, h, w), np.float32)
+            letterbox_into(roi, blob[0], canvas)
+            self.blobs.append({input_name: blob})
+            if len(self.blobs) >= limit:
+                break
+        self._it = iter(self.blobs)
+
+    def get_next(self):
+        return next(self._it, None)
+
+    def rewind(self):
+        self._it = iter(self.blobs)
+
+    def __len__(self):
+        return len(self.blobs)
+
+
+def quantize(src: str, dst: str, mode: str, calib=None, per_channel: bool = True,
+             calib_method: str = "minmax", exclude=None) -> str:
+    if ortq is None:
+        raise ImportError("onnxruntime nie je nainštalované. pip install onnxruntime")
+    Path(dst).parent.mkdir(parents=True, exist_ok=True)
+    model_in = src
+    try:
+        # shape inference + optimalizácia grafu pred kvantizáciou (odporúčanie ORT); ak zlyhá, ide sa bez nej
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        pre = str(Path(dst).with_suffix(".pre.onnx"))
+        quant_pre_process(src, pre, skip_symbolic_shape=True)
+        model_in = pre
+    except Exception:
+        pass
+
+    if mode == "dynamic":
+        ortq.quantize_dynamic(model_in, dst, weight_type=ortq.QuantType.QUInt8, per_channel=per_channel,
+                              nodes_to_exclude=exclude or [])
+    else:
+        if calib is None or not calib.blobs:
+            raise RuntimeError("Statická kvantizácia potrebuje kalibračné snímky (datasets/<recipe>/ok|nok).")
+        methods = {"minmax": ortq.CalibrationMethod.MinMax, "entropy": ortq.CalibrationMethod.Entropy,
+                   "percentile": ortq.CalibrationMethod.Percentile}
+        ortq.quantize_static(model_in, dst, calib, quant_format=ortq.QuantFormat.QDQ,
+                             activation_type=ortq.QuantType.QUInt8, weight_type=ortq.QuantType.QInt8,
+                             per_channel=per_channel, calibrate_method=methods.get(calib_method, methods["minmax"]),
+                             nodes_to_exclude=exclude or [])
+    if model_in != src:
+        Path(model_in).unlink(missing_ok=True)
+    return dst
+
+
+def detect(model: YOLOModel, roi: np.ndarray, conf_th: float, iou_th: float, params: dict = None):
+    """
+    Ako YOLOInROITool.run (bez masky/preproc): decode nad prahom (pri "tiled" cez dlaždice toolu),
+    class_whitelist, NMS po triedach s agnostic_nms/max_det z params.
+    """
+    p = params or {}
+    if p.get("tiled") and roi.size > 0:
+        xyxy, cls_ids, scores, _ = YOLOInROITool("quant", (0, 0, 0, 0), p)._infer_tiled(model, roi, conf_th)
+    else:
+        xyxy, cls_ids, scores = model.infer(roi, conf_th=conf_th)
+    if p.get("class_whitelist"):
+        keep = np.isin(cls_ids, np.asarray(list(p["class_whitelist"]), dtype=np.int64))
+        xyxy, cls_ids, scores = xyxy[keep], cls_ids[keep], scores[keep]
+    keep = batched_nms(xyxy.astype(np.float32), scores.astype(np.float32), cls_ids.astype(np.int32), iou_th=iou_th,
+                       agnostic=bool(p.get("agnostic_nms", False)), max_det=int(p.get("max_det", 300)))
+    return xyxy[keep], cls_ids[keep], scores[keep]
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU matica (len(a), len(b)) pre xyxy boxy."""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def match(ref, cand, iou_th: float) -> int:
+    """Počet párov (rovnaká trieda, IoU >= iou_th), greedy od najistejšej referenčnej detekcie."""
+    (rb, rc, rs), (cb, cc, _) = ref, cand
+    if len(rb) == 0 or len(cb) == 0:
+        return 0
+    iou = _iou(rb, cb)
+    iou[rc[:, None] != cc[None, :]] = 0.0
+    used = np.zeros(len(cb), bool)
+    n = 0
+    for i in np.argsort(-rs):
+        row = np.where(used, 0.0, iou[i])
+        j = int(np.argmax(row))
+        if row[j] >= iou_th:
+            used[j] = True
+            n += 1
+    return n
+
+
+def _pct(ms):
+    a = np.array(ms, dtype=float) if ms else np.zeros(1)
+    return {"mean": float(a.mean()), "p50": float(np.percentile(a, 50)),
+            "p95": float(np.percentile(a, 95)), "p99": float(np.percentile(a, 99))}
+
+
+def compare(fp_model: YOLOModel, q_model: YOLOModel, items, conf_th: float, iou_th: float, match_iou: float,
+            params: dict = None):
+    n_img = n_same = n_ref = n_q = n_match = 0
+    lat_ref, lat_q, worst = [], [], []
+    for name, roi in items:
+        t0 = time.perf_counter()
+        a = detect(fp_model, roi, conf_th, iou_th, params)
+        t1 = time.perf_counter()
+        b = detect(q_model, roi, conf_th, iou_th, params)
+        t2 = time.perf_counter()
+        lat_ref.append((t1 - t0) * 1000.0)
+        lat_q.append((t2 - t1) * 1000.0)
+        m = match(a, b, match_iou)
+        n_img += 1
+        n_ref += len(a[0]); n_q += len(b[0]); n_match += m
+        if m == len(a[0]) == len(b[0]):
+            n_same += 1
+        else:
+            worst.append({"sample": name, "fp32": int(len(a[0])), "int8": int(len(b[0])), "matched": m})
+    return {
+        "samples": n_img,
+        "agreement": n_same / max(1, n_img),  # podiel vzoriek, kde sa detekcie zhodujú 1:1
+        "recall_vs_fp32": n_match / max(1, n_ref),
+        "precision_vs_fp32": n_match / max(1, n_q),
+        "detections": {"fp32": n_ref, "int8": n_q, "matched": n_match},
+        "latency_ms": {"fp32": _pct(lat_ref), "int8": _pct(lat_q)},
+        "speedup_p50": _pct(lat_ref)["p50"] / max(1e-9, _pct(lat_q)["p50"]),
+        "mismatches": worst[:20],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--recipe", default=None, help="Recept (ROI YOLO tools + datasets/<recipe>/ok|nok)")
+    ap.add_argument("--model", default="models/yolo/model.onnx", help="FP32 ONNX model")
+    ap.add_argument("--out", default=None, help="INT8 model (default <model>.int8.onnx)")
+    ap.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    ap.add_argument("--ok_dir", default=None, help="Priečinok OK snímok (default datasets/<recipe>/ok)")
+    ap.add_argument("--nok_dir", default=None, help="Priečinok NOK snímok (default datasets/<recipe>/nok)")
+    ap.add_argument("--calib_max", type=int, default=200, help="Max. kalibračných vzoriek")
+    ap.add_argument("--calib_method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    ap.add_argument("--no_per_channel", action="store_true", help="Váhy kvantizovať per-tensor")
+    ap.add_argument("--exclude", default="", help="Uzly bez kvantizácie (čiarkou oddelené mená)")
+    ap.add_argument("--skip_quant", action="store_true", help="Len porovnaj existujúci --out s --model")
+    ap.add_argument("--conf_th", type=float, default=None, help="Prah confidence (default conf_thres z receptu/0.25)")
+    ap.add_argument("--iou_th", type=float, default=None, help="NMS IoU (default iou_thres z receptu/0.45)")
+    ap.add_argument("--match_iou", type=float, default=0.5, help="IoU pre zhodu detekcie FP32 vs INT8")
+    ap.add_argument("--min_agreement", type=float, default=0.98, help="Min. zhoda na odporúčanie INT8 modelu")
+    ap.add_argument("--threads", type=int, default=0, help="intra_op_threads pre obe session (0 = ORT)")
+    ap.add_argument("--write", action="store_true", help="Pri dostatočnej zhode zapíš onnx_path do receptu")
+    args = ap.parse_args()
+
+    store, recipe, tools = None, {}, []
+    if args.recipe:
+        store = RecipeStoreJSON()
+        recipe = store.load(args.recipe)
+        tools = yolo_tools(recipe, args.model)
+    rois = [tuple(int(v) for v in t.get("roi_xywh", [0, 0, 0, 0])) for t in tools]
+    params = (tools[0].get("params") or {}) if tools else {}
+    # prahy ako v YOLOInROITool: conf_thres/iou_thres (Builder, RUN), staršie conf_th/iou_th
+    conf_th = args.conf_th if args.conf_th is not None else float(params.get("conf_thres", params.get("conf_th", 0.25)))
+    iou_th = args.iou_th if args.iou_th is not None else float(params.get("iou_thres", params.get("iou_th", 0.45)))
+
+    base = Path("datasets") / args.recipe if args.recipe else None
+    ok_dir = Path(args.ok_dir) if args.ok_dir else (base / "ok" if base else None)
+    nok_dir = Path(args.nok_dir) if args.nok_dir else (base / "nok" if base else None)
+    paths = list_images(ok_dir) + list_images(nok_dir)
+    if not paths:
+        raise RuntimeError("Žiadne snímky – zadaj --recipe (datasets/<recipe>/ok|nok) alebo --ok_dir/--nok_dir.")
+
+    out_path = args.out or str(Path(args.model).with_suffix(".int8.onnx"))
+    engine = {"providers": "cpu", "intra_op_threads": args.threads, "io_binding": True,
+              "optimized_model_path": "", "warmup": 3}
+    fp_model = YOLOModel(args.model, engine=engine)
+
+    if not args.skip_quant:
+        calib = None
+        if args.mode == "static":
+            # kalibrácia rovnomerne cez OK aj NOK (každý n-tý snímok), nie len prvých calib_max
+            step = max(1, len(paths) * max(1, len(rois)) // max(1, args.calib_max))
+            calib = _CalibReader(fp_model.input_name, (fp_model.in_h, fp_model.in_w),
+                                 calib_crops(samples(paths[::step], rois), params,
+                                             (fp_model.in_h, fp_model.in_w)), args.calib_max)
+        t0 = time.perf_counter()
+        quantize(args.model, out_path, args.mode, calib, per_channel=not args.no_per_channel,
+                 calib_method=args.calib_method, exclude=[s for s in args.exclude.split(",") if s])
+        print(f"Kvantizované ({args.mode}) -> {out_path}  za {time.perf_counter() - t0:.1f} s"
+              + (f", kalibrácia {len(calib.blobs)} vzoriek" if calib is not None else ""))
+
+    q_model = YOLOModel(out_path, engine=engine)
+    fp_model.warmup(); q_model.warmup()
+    rep = compare(fp_model, q_model, samples(paths, rois), conf_th, iou_th, args.match_iou, params)
+    rep.update({"model": args.model, "int8_model": out_path, "mode": args.mode, "conf_th": conf_th,
+                "iou_th": iou_th, "tiled": bool(params.get("tiled")), "min_agreement": args.min_agreement,
+                "size_mb": {"fp32": Path(args.model).stat().st_size / 1e6,
+                            "int8": Path(out_path).stat().st_size / 1e6}})
+    rep["recommend_int8"] = bool(rep["agreement"] >= args.min_agreement)
+    print(json.dumps(rep, ensure_ascii=False, indent=2))
+
+    if not rep["recommend_int8"]:
+        print(f"\nZhoda {rep['agreement']:.3f} < {args.min_agreement:.3f} – recept ostáva na FP32 modeli.")
+        return
+    print(f"\nZhoda {rep['agreement']:.3f} >= {args.min_agreement:.3f}: v recepte môžeš nastaviť onnx_path = {out_path}")
+    if args.write and store is not None and tools:
+        for t in tools:
+            t.setdefault("params", {})["onnx_path"] = out_path
+        store.save_version(args.recipe, recipe)
+        print(f"Zapísané do receptu {args.recipe}: {len(tools)} YOLO tool(s) -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
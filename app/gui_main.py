@@ -9,6 +9,9 @@ from app.tabs.run_tab import RunTab
 from app.tabs.history_tab import HistoryTab
 from app.tabs.settings_tab import SettingsTab
 from storage.settings_store import SettingsStore
+from core.tools.yolo_roi import configure_engine
+from core.tools.model_registry import configure_registry
+from qcio.cameras.factory import make_camera
 
 # --- jednoduché QSS pre Dark/Light ---
 DARK_QSS = """
@@ -39,6 +42,10 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.state = AppState()
         self._settings = SettingsStore()
+        configure_engine(self._settings.get_yolo_engine())
+        configure_registry(self._settings.get_model_registry())
+        for err in self.state.configure_stations(self._settings.get_stations(), make_camera):
+            print(f"[STANICE] {err}")
 
         self.tabs = QtWidgets.QTabWidget()
         self.setCentralWidget(self.tabs)
@@ -46,6 +53,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.teach = TeachTab(self.state, self)
         self.builder = BuilderTab(self.state, self)
         self.run = RunTab(self.state, self)
+        self.run.worker.trigger_timeout_ms = self._settings.get_trigger_timeout_ms()
         self.history = HistoryTab(self.state, self)
         self.settings_tab = SettingsTab(self.state, self)
 
@@ -65,6 +73,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self._build_menu()
 
 
+    def closeEvent(self, e):
+        # worker RUN-u musí skončiť skôr, než sa zavrie kamera / Qt objekty
+        self.run.shutdown()
+        super().closeEvent(e)
+
     # --- aplikovanie témy + uloženie preferencie ---
     def _apply_theme(self, theme: str):
         theme = (theme or "dark").lower()
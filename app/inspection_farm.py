@@ -0,0 +1,461 @@
+# app/inspection_farm.py
+# ELI5: "Farma" inšpekcie – viac procesov namiesto jedného (GIL + Qt event loop nebrzdia).
+#   - snímky idú do kruhu v zdieľanej pamäti (ShmFrameRing): buď ich zapisuje capture proces
+#     (kamera beží v ňom), alebo ich posiela hlavný proces cez submit(),
+#   - N worker procesov si každý postaví vlastnú Pipeline pre aktívny recept a číta snímku
+#     priamo zo zdieľanej pamäte (bez kópie, bez pickle obrazu),
+#   - výsledky sa vracajú späť; farma ich zoradí podľa seq snímky a vydá v poradí.
+# Sloty putujú: voľné -> zápis -> job -> worker -> výsledok -> voľné. Zámok na dáta netreba.
+# Joby rozdeľuje hlavný proces (zberné vlákno) – každý worker má vlastnú rúru a farma vie, ktoré
+# (seq, slot) má ktorý worker rozpracované. Pád workera (segfault ORT, OOM kill) = jeho snímky dostanú
+# chybový (NOK) výsledok, sloty sa vrátia a worker sa spustí znova; poradie výsledkov sa nezasekne.
+# (Spoločná mp.Queue by tu nestačila: worker zabitý počas get() si odnesie jej zámok a zasekne ostatných.)
+# Recept: každý job nesie generáciu receptu; worker pred jobom dobehne na rovnakú generáciu,
+# takže snímka sa spracuje receptom, ktorý bol aktívny pri jej odoslaní.
+import multiprocessing as mp
+import multiprocessing.connection
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from qcio.cameras.shm_ring import ShmFrameRing
+
+PREFETCH = 2  # jobov na workera naraz (1 v práci + 1 čakajúci, nech worker nečaká na rozdelenie)
+
+
+class FarmResult(NamedTuple):
+    seq: int            # poradie snímky (výsledky chodia v tomto poradí)
+    ts: float           # capture timestamp snímky (time.monotonic)
+    out: Dict[str, Any] # výstup Pipeline.process (bez overlay polí, ak keep_overlay=False)
+    worker: int         # ktorý proces ju spracoval (-1 = žiadny)
+    proc_ms: float      # čas spracovania vo workeri
+    latency_ms: float   # capture -> výsledok v hlavnom procese (vrátane čakania na poradie)
+
+
+def _lean_out(out: Dict[str, Any]) -> Dict[str, Any]:
+    """Overlay polia sa do hlavného procesu neposielajú (PLC/log ich nepotrebuje, pickle by bol veľký)."""
+    for r in out.get("results", []) or []:
+        if getattr(r, "overlay", None) is not None:
+            r.overlay = None
+    return out
+
+
+def _error_out(msg: str) -> Dict[str, Any]:
+    return {"ok": False, "elapsed_ms": 0.0, "results": [], "error": msg}
+
+
+# -------------------- procesy (spawn: musia byť na úrovni modulu) --------------------
+
+def _worker_main(wid: int, ring_spec, ctl_q, conn, mode: Optional[str],
+                 keep_overlay: bool, cv_threads: int, engine_opts: Optional[Dict[str, Any]]) -> None:
+    import cv2 as cv
+    from app.app_state import pipeline_from_recipe
+    from core.tools.yolo_roi import configure_engine
+
+    if cv_threads > 0:
+        cv.setNumThreads(int(cv_threads))  # N procesov * všetky jadrá = preťaženie; default 1 vlákno/proces
+    configure_engine(engine_opts)
+    ring = ShmFrameRing.attach(*ring_spec)
+    pipe, ref, gen, err = None, None, -1, None
+
+    def switch(target_gen: int):
+        nonlocal pipe, ref, gen, err
+        while gen < target_gen:
+            gen, recipe = ctl_q.get()
+            try:
+                new_pipe, new_ref = pipeline_from_recipe(recipe)
+                new_pipe.prepare(new_ref)
+                if pipe is not None:
+                    pipe.release()
+                pipe, ref, err = new_pipe, new_ref, None
+            except Exception as e:
+                err = f"recept sa nepostavil: {type(e).__name__}: {e}"
+
+    switch(0)
+    conn.send(("ready", wid, err))
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break  # hlavný proces skončil
+            if job is None:
+                break
+            seq, slot, ts, jgen = job
+            switch(jgen)
+            t0 = time.perf_counter()
+            if err is not None or pipe is None:
+                out = _error_out(err or "bez pipeline")
+            else:
+                try:
+                    _, _, frame = ring.read(slot)
+                    out = pipe.process(ref, frame, mode=mode)
+                    del frame
+                    if not keep_overlay:
+                        out = _lean_out(out)
+                except Exception as e:
+                    out = _error_out(f"{type(e).__name__}: {e}")
+            conn.send(("res", seq, slot, ts, wid, out, (time.perf_counter() - t0) * 1000.0))
+    finally:
+        if pipe is not None:
+            pipe.release()
+        ring.close()
+
+
+def _capture_main(camera_factory: Callable[[], Any], ring_spec, free_q, job_w, seq_val, gen_val,
+                  dropped_val, stop_ev, gray: bool) -> None:
+    import cv2 as cv
+
+    ring = ShmFrameRing.attach(*ring_spec)
+    cam = camera_factory()
+    cam.open()
+    cam.start()
+    last = -1
+    try:
+        while not stop_ev.is_set():
+            pkt = cam.get_frame_after(last, timeout_ms=100)
+            if pkt is None:
+                continue
+            last = pkt.seq
+            try:
+                slot = free_q.get_nowait()
+            except queue.Empty:
+                with dropped_val.get_lock():
+                    dropped_val.value += 1  # všetci workeri sú plní – snímka sa zahodí (nie fronta do nekonečna)
+                continue
+            frm = pkt.frame
+            if gray and frm.ndim == 3:
+                frm = cv.cvtColor(frm, cv.COLOR_BGR2GRAY)
+            ts = pkt.ts if pkt.ts is not None else time.monotonic()  # kamera bez capture času
+            _publish(ring, slot, frm, ts, free_q, job_w, seq_val, gen_val, dropped_val)
+    finally:
+        try:
+            cam.stop()
+            cam.close()
+        except Exception:
+            pass
+        ring.close()
+
+
+def _publish(ring: ShmFrameRing, slot: int, frame: np.ndarray, ts: float,
+             free_q, job_w, seq_val, gen_val, dropped_val) -> Optional[int]:
+    """
+    Snímka do slotu + job do rúry farmy; seq sa pridelí až po úspešnom zápise (v poradí nesmú byť diery).
+    Zápis do rúry je pod zámkom seq (zapisuje hlavný proces aj capture proces).
+    """
+    try:
+        ring.write(slot, frame, -1, ts)
+    except ValueError:
+        free_q.put(slot)
+        with dropped_val.get_lock():
+            dropped_val.value += 1
+        return None
+    with seq_val.get_lock():
+        seq = seq_val.value
+        seq_val.value += 1
+        ring.publish(slot, frame.shape, seq, ts)
+        job_w.send((seq, slot, ts, gen_val.value))
+    return seq
+
+
+# -------------------- hlavný proces --------------------
+
+class InspectionFarm:
+    """
+    Použitie:
+        farm = InspectionFarm(workers=4, max_shape=(1944, 2592))
+        farm.start(recipe_dict)                      # snímky posiela hlavný proces cez submit()
+        farm.start(recipe_dict, camera_factory=...)  # alebo kamera beží v capture procese
+        seq = farm.submit(frame)
+        res = farm.get_result(timeout=1.0)           # FarmResult, v poradí seq
+        farm.stop()
+    camera_factory musí byť picklovateľná (napr. functools.partial(RTSPCamera, url)).
+    Spadnutý worker sa spustí znova (max max_respawns-krát na workera); každý pád je v errors.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_shape: Tuple[int, ...] = (1944, 2592),
+                 slots: Optional[int] = None, mode: Optional[str] = None, keep_overlay: bool = False,
+                 cv_threads: int = 1, engine_opts: Optional[Dict[str, Any]] = None,
+                 on_result: Optional[Callable[[FarmResult], None]] = None, max_respawns: int = 3):
+        self.workers = max(1, int(workers or max(1, (mp.cpu_count() or 2) - 1)))
+        self.max_shape = tuple(max_shape)
+        self.slots = int(slots or 2 * self.workers + 2)  # každý worker 1 v práci + 1 čakajúci + rezerva
+        self.mode = mode
+        self.keep_overlay = bool(keep_overlay)
+        self.cv_threads = int(cv_threads)
+        self.engine_opts = engine_opts
+        self.on_result = on_result
+        self.max_respawns = int(max_respawns)
+
+        self._ctx = mp.get_context("spawn")  # bezpečné aj s Qt/vláknami v hlavnom procese (a na Windows)
+        self._ring: Optional[ShmFrameRing] = None
+        self._procs: List[Any] = []
+        self._conns: List[Any] = []          # rúra hlavný proces <-> worker (joby tam, výsledky späť)
+        self._assigned: List[Deque[Tuple[int, int, float]]] = []  # (seq, slot, ts) rozpracované workerom
+        self._ready: List[bool] = []
+        self._capture = None
+        self._ctl_qs: List[Any] = []
+        self._results: "queue.Queue[FarmResult]" = queue.Queue()
+        self._collector: Optional[threading.Thread] = None
+        self._send_lock = threading.Lock()   # rúry workerov: zberné vlákno + stop()
+        self._gen = -1
+        self._recipe: Optional[Dict[str, Any]] = None
+        self._running = False
+        # štatistiky
+        self.done = 0
+        self.errors: List[str] = []
+        self.respawns: List[int] = []
+
+    # -------------------- štart / stop --------------------
+
+    def start(self, recipe: Dict[str, Any], camera_factory: Optional[Callable[[], Any]] = None,
+              gray: bool = True, ready_timeout: float = 120.0) -> None:
+        ctx = self._ctx
+        self._ring = ShmFrameRing(self.slots, self.max_shape)
+        self._free_q = ctx.Queue()
+        self._job_r, self._job_w = ctx.Pipe(duplex=False)  # joby od výrobcov snímok -> zberné vlákno
+        self._seq = ctx.Value("q", 0)
+        self._gen_val = ctx.Value("q", 0)
+        self._dropped = ctx.Value("q", 0)
+        self._stop_ev = ctx.Event()
+        for i in range(self.slots):
+            self._free_q.put(i)
+
+        self._ctl_qs = [ctx.Queue() for _ in range(self.workers)]
+        self._gen = -1
+        self.set_recipe(recipe)
+        self._backlog: Deque[Tuple[int, int, float, int]] = deque()  # joby, ktoré ešte nemajú workera
+        self._assigned = [deque() for _ in range(self.workers)]
+        self._ready = [False] * self.workers
+        self._conns = [None] * self.workers
+        self._procs = [None] * self.workers
+        self.respawns = [0] * self.workers
+        for wid in range(self.workers):
+            self._spawn(wid)
+
+        # čakaj, kým si všetci postavia pipeline (prvý cyklus už neplatí stavbu receptu)
+        deadline = time.monotonic() + ready_timeout
+        while not all(self._ready):
+            waiting = [c for c, r in zip(self._conns, self._ready) if not r]
+            for c in mp.connection.wait(waiting, timeout=0.5):
+                try:
+                    self._handle(self._conns.index(c), c.recv())
+                except EOFError:
+                    pass  # worker skončil – ohlási sa nižšie
+            dead = [p.name for p, r in zip(self._procs, self._ready) if not r and not p.is_alive()]
+            if dead or time.monotonic() > deadline:
+                ready = sum(self._ready)
+                self.stop()
+                raise RuntimeError(f"Farma: pripravených {ready}/{self.workers} workerov"
+                                   + (f", skončili: {', '.join(dead)}" if dead else " (timeout)"))
+
+        self._running = True
+        self._next = 0
+        self._pending: Dict[int, Tuple] = {}
+        self._collector = threading.Thread(target=self._collect, name="qc-farm-collect", daemon=True)
+        self._collector.start()
+
+        if camera_factory is not None:
+            self._capture = ctx.Process(target=_capture_main, name="qc-farm-capture", daemon=True,
+                                        args=(camera_factory, self._ring.spec(), self._free_q, self._job_w,
+                                              self._seq, self._gen_val, self._dropped, self._stop_ev, gray))
+            self._capture.start()
+
+    def _spawn(self, wid: int) -> None:
+        mine, theirs = self._ctx.Pipe(duplex=True)
+        p = self._ctx.Process(target=_worker_main, name=f"qc-farm-{wid}", daemon=True,
+                              args=(wid, self._ring.spec(), self._ctl_qs[wid], theirs, self.mode,
+                                    self.keep_overlay, self.cv_threads, self.engine_opts))
+        p.start()
+        theirs.close()  # koniec rúry patrí workerovi; keď zomrie, recv() tu dostane EOF
+        self._procs[wid], self._conns[wid], self._ready[wid] = p, mine, False
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._running = False
+        if self._capture is not None:
+            self._stop_ev.set()
+            self._capture.join(timeout)
+            self._capture = None
+        if self._collector is not None:
+            self._collector.join(timeout)  # dorozdeľuje a zozbiera rozpracované snímky
+            self._collector = None
+        with self._send_lock:
+            for c in self._conns:
+                try:
+                    c.send(None)
+                except Exception:
+                    pass
+        for p in self._procs:
+            if p is None:
+                continue
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        for c in self._conns:
+            if c is not None:
+                c.close()
+        self._procs, self._conns = [], []
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    # -------------------- recept / snímky --------------------
+
+    def set_recipe(self, recipe: Dict[str, Any]) -> int:
+        """Nový recept pre všetkých workerov; platí pre snímky odoslané odteraz. Vráti generáciu."""
+        self._gen += 1
+        self._recipe = recipe
+        for q in self._ctl_qs:
+            q.put((self._gen, recipe))
+        with self._gen_val.get_lock():
+            self._gen_val.value = self._gen
+        return self._gen
+
+    def submit(self, frame: np.ndarray, ts: Optional[float] = None, timeout: Optional[float] = 0.0) -> Optional[int]:
+        """
+        Snímka z hlavného procesu (1 kópia do zdieľanej pamäte). Vráti seq, alebo None,
+        ak nie je voľný slot do timeoutu (0 = nečakaj, None = čakaj) – snímka sa vtedy zahodí.
+        """
+        try:
+            slot = self._free_q.get(timeout=timeout) if timeout != 0.0 else self._free_q.get_nowait()
+        except queue.Empty:
+            with self._dropped.get_lock():
+                self._dropped.value += 1
+            return None
+        ts = time.monotonic() if ts is None else float(ts)
+        return _publish(self._ring, slot, frame, ts, self._free_q, self._job_w,
+                        self._seq, self._gen_val, self._dropped)
+
+    # -------------------- rozdeľovanie / výsledky --------------------
+
+    def _collect(self) -> None:
+        while self._running or self._pending or self.in_flight() > 0:
+            live = [c for wid, c in enumerate(self._conns) if self._procs[wid] is not None]
+            for c in mp.connection.wait([self._job_r] + live, timeout=0.1):
+                if c is self._job_r:
+                    self._backlog.append(c.recv())
+                    continue
+                wid = self._conns.index(c)
+                try:
+                    self._handle(wid, c.recv())
+                except (EOFError, OSError):
+                    self._worker_died(wid)
+            for wid, p in enumerate(self._procs):
+                if p is not None and not p.is_alive():
+                    self._worker_died(wid)
+            self._dispatch()
+            if not any(p is not None for p in self._procs):
+                self._fail_backlog("žiadny živý worker")  # ďalšie snímky hneď NOK, nie večné čakanie
+
+    def _dispatch(self) -> None:
+        """Joby z backlogu workerom s najmenej rozpracovanými (max PREFETCH na workera)."""
+        while self._backlog:
+            cand = [w for w in range(self.workers)
+                    if self._procs[w] is not None and self._ready[w] and len(self._assigned[w]) < PREFETCH]
+            if not cand:
+                return
+            wid = min(cand, key=lambda w: len(self._assigned[w]))
+            job = self._backlog.popleft()
+            self._assigned[wid].append((job[0], job[1], job[2]))
+            try:
+                with self._send_lock:
+                    self._conns[wid].send(job)
+            except (OSError, ValueError):
+                self._worker_died(wid)
+
+    def _handle(self, wid: int, msg) -> None:
+        if msg[0] == "ready":
+            self._ready[wid] = True
+            if msg[2]:
+                self.errors.append(f"worker {wid}: {msg[2]}")
+            return
+        if msg[0] != "res":
+            return
+        _, seq, slot, ts, _, out, proc_ms = msg
+        job = self._assigned[wid]
+        if job and job[0][0] == seq:
+            job.popleft()
+        else:
+            self._assigned[wid] = deque(j for j in job if j[0] != seq)
+        self._free_q.put(slot)  # slot späť medzi voľné hneď – poradie výsledkov ho nedrží
+        self._add(seq, ts, out, wid, proc_ms)
+
+    def _worker_died(self, wid: int) -> None:
+        """Rozpracované snímky workera = chybový výsledok + slot späť; worker znova (max max_respawns)."""
+        p = self._procs[wid]
+        if p is None:
+            return
+        p.join(1.0)
+        code = p.exitcode
+        for seq, slot, ts in self._assigned[wid]:
+            self._free_q.put(slot)
+            self._add(seq, ts, _error_out(f"worker {wid} spadol (exitcode {code})"), wid, 0.0)
+        self._assigned[wid].clear()
+        try:
+            self._conns[wid].close()
+        except Exception:
+            pass
+        if self._running and self.respawns[wid] < self.max_respawns:
+            self.respawns[wid] += 1
+            self.errors.append(f"worker {wid} spadol (exitcode {code}), štart znova "
+                               f"({self.respawns[wid]}/{self.max_respawns})")
+            ctl = self._ctx.Queue()
+            ctl.put((self._gen, self._recipe))  # nový worker rovno na aktuálnu generáciu receptu
+            self._ctl_qs[wid] = ctl
+            self._spawn(wid)
+        else:
+            if self._running:
+                self.errors.append(f"worker {wid} spadol (exitcode {code}), ďalší štart sa nerobí")
+            self._procs[wid] = None
+
+    def _fail_backlog(self, msg: str) -> None:
+        while self._job_r.poll():
+            self._backlog.append(self._job_r.recv())
+        while self._backlog:
+            seq, slot, ts, _ = self._backlog.popleft()
+            self._free_q.put(slot)
+            self._add(seq, ts, _error_out(msg), -1, 0.0)
+
+    def _add(self, seq: int, ts: float, out: Dict[str, Any], wid: int, proc_ms: float) -> None:
+        """Výsledok do preusporiadania; vydajú sa všetky, ktoré sú na rade."""
+        self._pending[seq] = (ts, out, wid, proc_ms)
+        while self._next in self._pending:
+            ts, out, wid, proc_ms = self._pending.pop(self._next)
+            res = FarmResult(self._next, ts, out, wid, proc_ms, (time.monotonic() - ts) * 1000.0)
+            self._next += 1
+            self.done += 1
+            if self.on_result is not None:
+                try:
+                    self.on_result(res)
+                except Exception:
+                    pass
+            else:
+                self._results.put(res)
+
+    def get_result(self, timeout: Optional[float] = None) -> Optional[FarmResult]:
+        """Ďalší výsledok v poradí seq (None po timeoute)."""
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def in_flight(self) -> int:
+        """Odoslané snímky, ktorých výsledok ešte nebol vydaný."""
+        return (self._seq.value - self._next) if self._ring is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": sum(1 for p in self._procs if p is not None and p.is_alive()),
+            "slots": self.slots,
+            "submitted": self._seq.value if self._ring is not None else 0,
+            "done": self.done,
+            "in_flight": self.in_flight(),
+            "reorder_wait": len(self._pending) if self._running else 0,
+            "dropped": self._dropped.value if self._ring is not None else 0,
+            "recipe_gen": self._gen,
+            "respawns": sum(self.respawns),
+        }
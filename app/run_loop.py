@@ -3,9 +3,9 @@ import cv2 as cv
 import numpy as np
 from typing import Optional, Dict, Any, Tuple
 from core.pipeline import Pipeline
-from core.fixture.template_fixture import TemplateFixture
+from core.fixture.factory import fixture_from_recipe
 from core.tools.diff_from_ref import DiffFromRefTool
-from core.tools.yolo_roi import YOLOInROITool
+from core.tools.yolo_roi import YOLOInROITool, preload_yolo_models, recipe_yolo_params
 from core.tools.codes_decoder import decode_codes
 from storage.recipe_store_json import RecipeStoreJSON
 from storage.recipe_router import RecipeRouter
@@ -43,10 +43,7 @@ class RunApp:
         self.ref_img = ref
 
         # fixture – z receptu (tpl_xywh)
-        fx = recipe.get("fixture", {"type":"template", "tpl_xywh":[ref.shape[1]//2-100, ref.shape[0]//2-100, 200, 200], "min_score":0.6})
-        x,y,w,h = fx.get("tpl_xywh", [0,0,200,200])
-        tpl = ref[y:y+h, x:x+w].copy()
-        fixture = TemplateFixture(tpl, min_score=float(fx.get("min_score", 0.6)))
+        fixture = fixture_from_recipe(recipe, ref)
 
         # tools – pre jednoduchosť dve položky (diff + YOLO), z receptu vieš spraviť dynamiku
         tools_conf = recipe.get("tools", [])
@@ -62,19 +59,40 @@ class RunApp:
                     units=t.get("units","px")
                 ))
             elif ttype == "yolo_roi":
+                # nastavenia ONNX Runtime z receptu ("yolo_engine"), ak ich tool nemá vlastné
+                yparams = dict(t.get("params",{}) or {})
+                if recipe.get("yolo_engine") and "engine" not in yparams:
+                    yparams["engine"] = recipe["yolo_engine"]
                 tools.append(YOLOInROITool(
                     name=t.get("name","yolo"),
                     roi_xywh=tuple(t.get("roi_xywh",[ref.shape[1]//2,0,ref.shape[1]//2, ref.shape[0]//2])),
-                    params=t.get("params",{}),
+                    params=yparams,
                     lsl=t.get("lsl",None), usl=t.get("usl",None),
                     units=t.get("units","count")
                 ))
             # sem môžeš doplniť ďalšie tool typy (presence_absence, edgesHough,...)
 
-        self.pipe = Pipeline(tools, fixture=fixture, pxmm=recipe.get("pxmm", None))
+        pipe_opts = recipe.get("pipeline", {}) or {}
+        old = self.pipe
+        self.pipe = Pipeline(tools, fixture=fixture, pxmm=recipe.get("pxmm", None),
+                             parallel=bool(pipe_opts.get("parallel", False)),
+                             max_workers=pipe_opts.get("max_workers") or None,
+                             mode=pipe_opts.get("mode", "full"))
+        self.pipe.prepare(ref)
+        if old is not None:
+            old.release()  # až po prepare novej: spoločné modely ostanú pripnuté
         self.current_recipe = recipe_name
         print(f"[RUN] Nahratý recept: {recipe_name}")
 
+    def preload_recipe(self, recipe_name: Optional[str]):
+        """Modely receptu, na ktorý sa ide prepnúť, sa načítajú na pozadí (kým beží capture)."""
+        if not recipe_name or recipe_name == self.current_recipe:
+            return None
+        try:
+            return preload_yolo_models(recipe_yolo_params(self.store.load(recipe_name)))
+        except Exception:
+            return None
+
     def ensure_recipe(self, plc_id: Optional[int], cur_bgr: np.ndarray):
         # 1) PLC má prioritu
         if plc_id is not None:
@@ -113,6 +131,10 @@ class RunApp:
         except:
             plc_id = None
 
+        # ID receptu je známe už teraz => modely nového receptu sa načítavajú počas capture
+        if plc_id is not None:
+            self.preload_recipe(self.router.resolve_by_id(plc_id))
+
         cur = self.capture_frame()
         cur_bgr = cv.cvtColor(cur, cv.COLOR_GRAY2BGR)
 
@@ -0,0 +1,166 @@
+# app/run_worker.py
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from PyQt5 import QtCore
+
+from qcio.plc.plc_qt_controller import TRIGGER_COIL_ADDR
+from config.plc_map import HR_CYCLE_ID
+
+
+class InspectionWorker(QtCore.QThread):
+    """
+    ELI5: Capture + process beží tu, nie v GUI vlákne (pomalý tool nezamrazí UI).
+      - streaming: berie len NOVÉ snímky z kamery a každú spracuje (mode="full"),
+      - PLC: obsluhuje handshake (plc.tick); hrana triggeru = camera.trigger() a spracuje sa prvá snímka
+        zachytená po nej (čaká max trigger_timeout_ms, nie pevný sleep; latencia v camera.stats()),
+        pri viacerých staniciach jeden trigger = všetky stanice súbežne (state.run_cycle),
+      - manuálny cyklus: príkaz z GUI cez ohraničenú frontu príkazov.
+    Hotové výsledky idú do ohraničenej fronty (drop-oldest) a GUI dostane len signál resultReady;
+    GUI si pri svojom prekreslení vezme najnovší výsledok (take_latest), staršie sa zahodia.
+    """
+    resultReady = QtCore.pyqtSignal()
+    cycleError = QtCore.pyqtSignal(str)
+
+    def __init__(self, state, prepare_frame: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 max_results: int = 2, trigger_timeout_ms: int = 500, parent=None):
+        super().__init__(parent)
+        self.state = state
+        self.prepare_frame = prepare_frame or (lambda f: f)
+        self._results = deque(maxlen=max(1, int(max_results)))
+        self._res_lock = threading.Lock()
+        self._cmds: "queue.Queue[str]" = queue.Queue(maxsize=4)
+        self._running = False
+        self._paused = False
+        self.plc = None  # PLCQtController (nastavuje GUI); None = streaming
+        self.trigger_timeout_ms = int(trigger_timeout_ms)  # max čakanie na snímku po triggeri
+        # štatistiky pre RUN
+        self.cycles = 0
+        self.render_dropped = 0  # hotové výsledky, ktoré GUI nestihlo vykresliť
+        self.last_cycle_ms = 0.0
+
+    # -------------------- ovládanie z GUI --------------------
+
+    def stop(self, wait_ms: int = 2000) -> None:
+        self._running = False
+        self.wait(wait_ms)
+
+    def set_paused(self, paused: bool) -> None:
+        self._paused = bool(paused)
+
+    def set_plc(self, plc) -> None:
+        self.plc = plc
+
+    def request_cycle(self) -> bool:
+        """Manuálny cyklus (plný report); plná fronta príkazov = požiadavka sa zahodí."""
+        try:
+            self._cmds.put_nowait("cycle")
+            return True
+        except queue.Full:
+            return False
+
+    def take_latest(self) -> Optional[Dict[str, Any]]:
+        """Najnovší hotový výsledok (frame, out, source) alebo None; staršie nevykreslené sa zahodia."""
+        with self._res_lock:
+            if not self._results:
+                return None
+            item = self._results.pop()
+            self.render_dropped += len(self._results)
+            self._results.clear()
+            return item
+
+    # -------------------- vlákno --------------------
+
+    def _publish(self, frame: np.ndarray, out: Dict[str, Any], source: str) -> None:
+        with self._res_lock:
+            if len(self._results) == self._results.maxlen:
+                self.render_dropped += 1  # deque(maxlen) vyhodí najstarší
+            self._results.append({"frame": frame, "out": out, "source": source})
+        self.resultReady.emit()
+
+    def _cycle(self, source: str, mode: Optional[str], new_only: bool, timeout_ms: int,
+               triggered: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Jedna snímka -> pipeline -> výsledok do fronty; None = žiadna (nová) snímka.
+        triggered=True: snímka až po state.trigger() (new_only sa neuplatní).
+        """
+        if triggered:
+            frm = self.state.get_frame_after_trigger(timeout_ms=timeout_ms)
+        else:
+            frm = self.state.get_frame(timeout_ms=timeout_ms, new_only=new_only)
+        if frm is None:
+            return None
+        frm = self.prepare_frame(frm)
+        t0 = time.perf_counter()
+        out = self.state.process(frm, mode=mode)
+        if triggered:
+            out["trigger_ms"] = self.state.main.last_trigger_ms
+        self.last_cycle_ms = (time.perf_counter() - t0) * 1000.0
+        self.cycles += 1
+        self._publish(frm, out, source)
+        return out
+
+    def _stations_cycle(self) -> Dict[str, Any]:
+        """Všetky stanice naraz; PLC dostane spojený verdikt, RUN zobrazí hlavnú stanicu."""
+        try:
+            cycle_id = int(self.plc.mb.get_hr(HR_CYCLE_ID))
+        except Exception:
+            cycle_id = 0
+        t0 = time.perf_counter()
+        out = self.state.run_cycle(cycle_id or None, mode=None, plc_mb=self.plc.mb,
+                                   triggered=True, frame_timeout_ms=self.trigger_timeout_ms)
+        self.last_cycle_ms = (time.perf_counter() - t0) * 1000.0
+        self.cycles += 1
+        main = self.state.main
+        if main.last_frame is not None and "main" in out["stations"]:
+            self._publish(main.last_frame, out["stations"]["main"], "plc")
+        return out
+
+    def _plc_step(self) -> None:
+        fired = []
+
+        def do_cycle_capture():
+            if len(self.state.stations) > 1:
+                fired.append(True)
+                return self._stations_cycle()  # trigger() dostanú kamery všetkých staníc
+            # hrana triggeru = diel je na mieste: spracuje sa prvá snímka zachytená po nej
+            # (nie tá, čo v ringu čakala spred dielu) – bez pevného čakania, len kým snímka príde
+            self.state.trigger()
+            out = self._cycle("plc", None, new_only=False, timeout_ms=self.trigger_timeout_ms, triggered=True)
+            fired.append(True)
+            return out if out is not None else {"ok": False, "elapsed_ms": 0.0, "results": [],
+                                                "error": "no frame after trigger"}
+
+        self.plc.tick(do_cycle_capture)
+        if fired:
+            try:
+                self.plc.mb.set_coil(TRIGGER_COIL_ADDR, 0)  # test trigger z RUN sa po cykle zhodí
+            except Exception:
+                pass
+
+    def run(self) -> None:
+        self._running = True
+        while self._running:
+            try:
+                cmd = self._cmds.get_nowait()
+            except queue.Empty:
+                cmd = None
+            ready = self.state.pipeline is not None and self.state.camera is not None
+            try:
+                if cmd == "cycle" and ready:
+                    self._cycle("manual", "full", new_only=False, timeout_ms=150)
+                elif self._paused or not ready:
+                    self.msleep(20)
+                elif self.plc is not None:
+                    self._plc_step()
+                    self.msleep(5)
+                else:
+                    # streaming: čaká na novú snímku (bez busy-loopu), spracuje ju
+                    self._cycle("stream", "full", new_only=True, timeout_ms=50)
+            except Exception as e:
+                self.cycleError.emit(f"{type(e).__name__}: {e}")
+                self.msleep(100)
@@ -387,6 +387,17 @@ class BuilderTab(QtWidgets.QWidget):
         g_y.addRow("Conf threshold:", self.dbl_conf)
         g_y.addRow("IoU threshold:", self.dbl_iou)
         g_y.addRow("Max detections:", self.spin_max_det)
+        # dlaždice: veľké ROI v natívnom rozlíšení (malé vady sa nestratia zmenšením na vstup modelu)
+        self.chk_yolo_tiled = QtWidgets.QCheckBox("Dlaždice (natívne rozlíšenie)")
+        self.spin_tile_size = QtWidgets.QSpinBox(); self.spin_tile_size.setRange(0, 4096); self.spin_tile_size.setSingleStep(32); self.spin_tile_size.setSpecialValueText("auto"); self.spin_tile_size.setValue(0)
+        self.dbl_tile_overlap = QtWidgets.QDoubleSpinBox(); self.dbl_tile_overlap.setRange(0.0, 0.9); self.dbl_tile_overlap.setSingleStep(0.05); self.dbl_tile_overlap.setValue(0.2)
+        self.spin_max_tiles = QtWidgets.QSpinBox(); self.spin_max_tiles.setRange(1, 256); self.spin_max_tiles.setValue(16)
+        self.chk_yolo_tiled.setToolTip("ROI sa rozdelí na prekrývajúce sa dlaždice, detekcie sa spoja globálnym NMS.")
+        self.spin_tile_size.setToolTip("auto = vstup modelu (napr. 640 alebo 1280); inak pevná veľkosť dlaždice v px.")
+        g_y.addRow(self.chk_yolo_tiled)
+        g_y.addRow("Veľkosť dlaždice (px):", self.spin_tile_size)
+        g_y.addRow("Prekrytie (podiel):", self.dbl_tile_overlap)
+        g_y.addRow("Max. dlaždíc:", self.spin_max_tiles)
 
         # 4) Template Match (NCC)
         self.grp_tmpl = QtWidgets.QWidget()
@@ -821,6 +832,10 @@ class BuilderTab(QtWidgets.QWidget):
         self.dbl_conf.setValue(float(params.get("conf_thres", 0.25)))
         self.dbl_iou.setValue(float(params.get("iou_thres", 0.45)))
         self.spin_max_det.setValue(int(params.get("max_det", 100)))
+        self.chk_yolo_tiled.setChecked(bool(params.get("tiled", False)))
+        self.spin_tile_size.setValue(int(params.get("tile_size") or 0))  # 0 = auto (vstup modelu)
+        self.dbl_tile_overlap.setValue(float(params.get("tile_overlap", 0.2)))
+        self.spin_max_tiles.setValue(int(params.get("max_tiles", 16)))
 
         # --- Blob-count ---
         self.spin_min_area.setValue(int(params.get("min_area", 120)))
@@ -1276,6 +1291,13 @@ class BuilderTab(QtWidgets.QWidget):
             p["conf_thres"] = float(self.dbl_conf.value())
             p["iou_thres"]  = float(self.dbl_iou.value())
             p["max_det"]    = int(self.spin_max_det.value())
+            p["tiled"]        = bool(self.chk_yolo_tiled.isChecked())
+            if self.spin_tile_size.value() > 0:
+                p["tile_size"] = int(self.spin_tile_size.value())
+            else:
+                p.pop("tile_size", None)  # auto: tool vezme vstup modelu
+            p["tile_overlap"] = float(self.dbl_tile_overlap.value())
+            p["max_tiles"]    = int(self.spin_max_tiles.value())
 
         elif t.get("type") == "blob_count":
             p["min_area"]      = int(self.spin_min_area.value())
@@ -1,4 +1,5 @@
 # app/tabs/run_tab.py
+import time
 from PyQt5 import QtWidgets, QtCore, QtGui
 import cv2 as cv
 import numpy as np
@@ -9,6 +10,7 @@ from app.widgets.tool_strip import ToolStrip
 from core.vis.overlay import compose_overlay
 
 from app.widgets.live_tuning import LiveTuningPanel
+from app.run_worker import InspectionWorker
 from qcio.plc.plc_qt_controller import PLCQtController
 from storage.dataset_store import save_ok, save_nok
 from storage.recipe_store_json import RecipeStoreJSON
@@ -49,8 +51,8 @@ class RunTab(QtWidgets.QWidget):
         self._last_out = None
         self._last_out_from_plc = None
         self._visible_tool_idx = None
-        self._do_cycle_capture = False  # <<< NOVÉ
-        self._freeze_plc_manual = False  # po manuálnom cykle v PLC móde zamraz zobrazenie
+        self._cam_stats_t = 0.0  # kedy sa naposledy prekreslila telemetria kamery
+        self._result_pending = False  # worker má hotový výsledok, ktorý ešte nebol vykreslený
 
 
         self._build()
@@ -71,10 +73,18 @@ class RunTab(QtWidgets.QWidget):
         self.btn_trigger.clicked.connect(self._trigger_now)
         self.btn_save_ok.clicked.connect(self._save_ok)
         self.btn_save_nok.clicked.connect(self._save_nok)
+        self.chk_plc.toggled.connect(self._on_plc_toggled)
 
+        # capture + inspekcia bežia vo worker vlákne; GUI len kreslí najnovší výsledok
+        self.worker = InspectionWorker(self.state, prepare_frame=self._match_ref_size, parent=self)
+        self.worker.resultReady.connect(self._on_result_ready)
+        self.worker.cycleError.connect(self._on_cycle_error)
+        self.worker.start()
+
+        # render tick (~30 fps): kreslí max. raz za tick, bez ohľadu na to, koľko cyklov worker stihol
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.loop_tick)
-        self.timer.start(50)
+        self.timer.start(33)
 
 
     def _build(self):
@@ -89,6 +99,11 @@ class RunTab(QtWidgets.QWidget):
         self.lbl_verdict.setStyleSheet("QLabel{font-size:28px; padding:8px; border-radius:8px; background:#555; color:white;}")
 
         self.lbl_latency = QtWidgets.QLabel("lat: -- ms")
+        self.lbl_cam = QtWidgets.QLabel("cam: --")
+        self.lbl_cam.setToolTip("Telemetria kamery: efektívne fps, trvanie read/dekódu, vek poslednej snímky,\n"
+                                "oneskorenie za streamom (buffer podľa PTS), snímky prepísané bez spracovania (drop),\n"
+                                "staré snímky preskočené v low-latency režime (skip), počet reconnectov\n"
+                                "a v PLC móde trigger -> prvá snímka po ňom (trig, max; timeouty).")
         self.chk_plc = QtWidgets.QCheckBox("PLC mód (Modbus/TCP)")
         self.lbl_plc = QtWidgets.QLabel("PLC: Ready=0 Busy=0 OK=0 NOK=0")
 
@@ -115,6 +130,7 @@ class RunTab(QtWidgets.QWidget):
         # Pravý panel – pridaj všetky prvky v poradí
         right.addWidget(self.lbl_verdict)
         right.addWidget(self.lbl_latency)
+        right.addWidget(self.lbl_cam)
         right.addWidget(self.chk_plc)
         right.addWidget(self.lbl_plc)
         right.addWidget(self.btn_cycle)
@@ -149,6 +165,12 @@ class RunTab(QtWidgets.QWidget):
                 self.chk_plc.setChecked(False)
                 self.plc = None
 
+    def _on_plc_toggled(self, checked: bool):
+        # PLC handshake obsluhuje worker; GUI len vytvorí server a odovzdá ho
+        if checked:
+            self._ensure_plc()
+        self.worker.set_plc(self.plc if (checked and self.plc) else None)
+
  
     # ---------- Render ----------
 
@@ -284,6 +306,10 @@ class RunTab(QtWidgets.QWidget):
             ok_t     = getattr(r, "ok", True)
             units    = getattr(r, "units", "")
 
+            if not getattr(r, "evaluated", True):
+                lines.append(f"{name} | nevyhodnotené (fail-fast: verdikt už bol NOK)")
+                continue
+
             details  = getattr(r, "details", {}) or {}
             if details.get("metric") == "coverage_pct":
                 units = "%"
@@ -472,95 +498,66 @@ class RunTab(QtWidgets.QWidget):
     def _cycle_now(self):
         if self.state.pipeline is None or self.state.camera is None:
             return
-        # NOVÉ
-        frm = self.state.get_frame(timeout_ms=150)
-        if frm is None: 
-            return
-        frm_proc = self._match_ref_size(frm)
-        self._last_frame = frm_proc.copy()
         self.live_panel.apply_to_tool(self._active_tool())
-
-        out = self.state.process(frm_proc)
-        self._render_out(frm_proc, out)
-        self._last_out = out
-
-        self._render_out(frm_proc, out)
-        self._last_out = out
-
-        if self.chk_plc.isChecked():
-            self._last_out_from_plc = out
-            self._freeze_plc_manual = True   # <<< ZAMRAZ PO MANUÁLNOM CYKLE V PLC
-        # nič ďalšie – _render_out už volá tool_strip.update_status(...)
-
-
+        # manuálny cyklus = plný report (všetky tools do overlay/logu); spraví ho worker
+        self.worker.request_cycle()
 
     def _trigger_now(self):
         self._ensure_plc()
         if not self.plc: return
         self.plc.mb.set_coil(20, 1)
 
-    def loop_tick(self):
-        if self.state.pipeline is None or self.state.camera is None:
+    def _update_cam_stats(self):
+        """Telemetria kamery do RUN (max ~4x za sekundu, nech label nebliká)."""
+        now = time.monotonic()
+        if now - self._cam_stats_t < 0.25 or self.state.camera is None:
             return
+        self._cam_stats_t = now
+        try:
+            st = self.state.camera.stats()
+        except Exception:
+            st = {}
+        if not st:
+            self.lbl_cam.setText("cam: --")
+            return
+        age, lag, trig = st.get("age_ms"), st.get("lag_ms"), st.get("trig_ms")
+        trig_txt = ""
+        if trig is not None or st.get("trig_timeouts"):
+            trig_txt = (f"trig {'--' if trig is None else f'{trig:.0f}'} ms (max {st.get('trig_ms_max', 0.0):.0f}"
+                        f", timeout {st.get('trig_timeouts', 0)}) | ")
+        self.lbl_cam.setText(
+            f"cam: {st.get('fps', 0.0):.1f} fps | read {st.get('read_ms', 0.0):.1f} ms "
+            f"(max {st.get('read_ms_max', 0.0):.1f}) | vek {'--' if age is None else f'{age:.0f}'} ms | "
+            f"oneskorenie {'--' if lag is None else f'{lag:.0f}'} ms | {trig_txt}"
+            f"drop {st.get('dropped', 0)} | skip {st.get('skipped', 0)} | reconn {st.get('reconnects', 0)} | "
+            f"nevykreslené {self.worker.render_dropped}")
+
+    def _on_result_ready(self):
+        # len značka; kreslí sa v render ticku (signály z workera sa tak nehromadia v GUI)
+        self._result_pending = True
+
+    def _on_cycle_error(self, msg: str):
+        self.lbl_latency.setText(f"lat: -- ms | chyba: {msg}")
 
-        # --- PLC režim ---
-        if self.chk_plc.isChecked():
-            # Ak máme "zmrazený" manuálny cyklus, iba PREKRESĽUJEME posledný výsledok.
-            if self._freeze_plc_manual and (self._last_frame is not None) and (self._last_out_from_plc is not None):
-                # žiadne nové snímanie, žiadny nový process – len render
-                self._render_out(self._last_frame, self._last_out_from_plc)
-                self._last_out = self._last_out_from_plc
-                return
-
-            # Inak bežný PLC tick (len keď PLC povie „rob cyklus“),
-            # ale aj tak si zoberieme JEDEN aktuálny frame:
-            frm = self.state.get_frame(timeout_ms=50)
-            if frm is None:
-                return
-            frm_proc = self._match_ref_size(frm)
-            self._last_frame = frm_proc.copy()
-
-            self._ensure_plc()
-            if not self.plc:
-                return
-
-            self._last_out_from_plc = None
-
-            def do_cycle_capture():
-                self.live_panel.apply_to_tool(self._active_tool())
-                out = self.state.process(frm_proc)
-                self._last_out_from_plc = out
-                return out
-
-            # PLC handshake – ak trigger/busy atď., zavolá do_cycle_capture raz
-            self.plc.tick(do_cycle_capture)
-
-            if self._last_out_from_plc is not None:
-                # Máme nové dáta z PLC cyklu → zruš freeze (ak by bol z predošlého cyklu)
-                self._freeze_plc_manual = False
-                self._render_out(frm_proc, self._last_out_from_plc)
-                self._last_out = self._last_out_from_plc
-                try:
-                    self.plc.mb.set_coil(20, 0)
-                except:
-                    pass
-            return  # dôležité: nepadni do non-PLC vetvy
-
-        # --- non-PLC režim (bežný streaming) ---
-        # NOVÉ
-        frm = self.state.get_frame(timeout_ms=50)
-        if frm is None: 
+    def loop_tick(self):
+        self._update_cam_stats()
+        if not self._result_pending:
             return
-        frm_proc = self._match_ref_size(frm)
-        self._last_frame = frm_proc.copy()
-        self.live_panel.apply_to_tool(self._active_tool())
-        out = self.state.process(frm_proc)
-        self._render_out(frm_proc, out)
+        self._result_pending = False
+        item = self.worker.take_latest()
+        if item is None:
+            return
+        frm, out = item["frame"], item["out"]
+        self._last_frame = frm
         self._last_out = out
+        if item["source"] != "stream":
+            self._last_out_from_plc = out
+        self._render_out(frm, out)
 
-
-        # _render_out už robí tool_strip.update_status(...)
-
+    def shutdown(self):
+        """Zastaví worker (pri zatváraní okna), nech nepracuje s kamerou počas ukončovania."""
+        self.timer.stop()
+        self.worker.stop()
 
     # --- ukladanie datasetu ---
     def _save_ok(self):
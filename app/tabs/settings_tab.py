@@ -1,12 +1,7 @@
 # app/tabs/settings_tab.py
 import os
 from PyQt5 import QtWidgets, QtCore
-from interfaces.camera_dummy import DummyCamera
-from qcio.cameras.rtsp_camera import RTSPCamera
-try:
-    from qcio.cameras.rtsp_gst_camera import RTSPGstCamera
-except Exception:
-    RTSPGstCamera = None
+from qcio.cameras.factory import camera_types, make_camera
 
 from storage.settings_store import SettingsStore
 from app.widgets.recipe_picker import RecipePicker
@@ -48,21 +43,22 @@ class SettingsTab(QtWidgets.QWidget):
 
         # prepojenia
         self.recipe_picker.changed.connect(lambda name: setattr(self.state, "current_recipe", name))
+        # výber receptu = vieme, čo príde => modely sa načítavajú na pozadí ešte pred "Použiť"
+        self.recipe_picker.changed.connect(self.state.preload_recipe)
         self.btn_recipe_del.clicked.connect(self._on_recipe_delete)
 
         # Kamera
         g2 = QtWidgets.QGroupBox("Kamera")
         f2 = QtWidgets.QFormLayout(g2)
         self.cmb_cam = QtWidgets.QComboBox()
-        items = ["DummyCamera","RTSP (OpenCV/FFmpeg)"]
-        if RTSPGstCamera is not None:
-            items.append("RTSP (GStreamer HW)")
-        self.cmb_cam.addItems(items)
+        self.cmb_cam.addItems(camera_types())
 
         self.edit_rtsp = QtWidgets.QLineEdit(os.environ.get("RTSP_URL", "rtsp://user:pass@ip:554/stream2"))
+        self.edit_rtsp.setToolTip("RTSP: rtsp://user:pass@ip:554/...\n"
+                                  "Replay: priečinok/video[?fps=10&loop=1&preload=memory|memmap|none]  (fps=0 = čo najrýchlejšie)")
 
         f2.addRow("Typ:", self.cmb_cam)
-        f2.addRow("RTSP URL:", self.edit_rtsp)
+        f2.addRow("RTSP URL / cesta:", self.edit_rtsp)
 
         # Profily kamier
         g3 = QtWidgets.QGroupBox("Profily kamier")
@@ -204,14 +200,7 @@ class SettingsTab(QtWidgets.QWidget):
         # 3) kamera
         cam_type = self.cmb_cam.currentText()
         try:
-            if cam_type == "DummyCamera":
-                cam = DummyCamera()
-            elif cam_type == "RTSP (OpenCV/FFmpeg)":
-                cam = RTSPCamera(self.edit_rtsp.text().strip())
-            else:
-                if RTSPGstCamera is None:
-                    raise RuntimeError("GStreamer nie je k dispozícii")
-                cam = RTSPGstCamera(self.edit_rtsp.text().strip(), latency_ms=0)
+            cam = make_camera(cam_type, self.edit_rtsp.text())
             self.state.set_camera(cam)
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Chyba kamery", f"Kamera sa nepodarila spustiť:\n{e}")
@@ -60,7 +60,7 @@ class TeachTab(QtWidgets.QWidget):
         if img is None:
             QtWidgets.QMessageBox.warning(self, "Pozor", "Z kamery neprišla snímka.")
             return
-        self.ref_img = img
+        self.ref_img = img.copy()  # referencia žije dlho – nedržíme ňou slot v ringu kamery
         self.ref_path = None  # bude sa ukladať pri save
         self.view.set_ndarray(img)
 
@@ -66,7 +66,7 @@ class ToolStrip(QtWidgets.QListWidget):
         for i in range(self.count()):
             it = self.item(i)
             ok_flag = None
-            if i < len(res):
+            if i < len(res) and getattr(res[i], "evaluated", True):
                 ok_flag = bool(getattr(res[i], "ok", True))
             icon = self._make_icon(base, self._tools[i] if i < len(self._tools) else None,
                                    ok=ok_flag, selected=(i == self.currentRow()))
@@ -168,7 +168,9 @@ class ToolStrip(QtWidgets.QListWidget):
     def _build_tooltip(self, i: int, res: list) -> str:
         label = getattr(self._tools[i], "name", f"Tool {i+1}") if i < len(self._tools) else f"Tool {i+1}"
         parts = [label]
-        if i < len(res):
+        if i < len(res) and not getattr(res[i], "evaluated", True):
+            parts.append("nevyhodnotené (fail-fast)")
+        elif i < len(res):
             r = res[i]
             measured = getattr(r, "measured", None)
             units    = getattr(r, "units", "") or ""
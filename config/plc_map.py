@@ -14,3 +14,14 @@ HR_CYCLE_MS    = 12
 HR_OK_COUNT    = 13
 HR_NOK_COUNT   = 14
 HR_MEASURES_0  = 100  # prvých 10 meraní: 100..109
+HR_CYCLE_ID    = 15   # ID cyklu/triggera od PLC (0 = app si čísluje sama)
+
+# Blok registrov na stanicu (viac kamier na jeden diel): stanica i má blok HR_STATION_BASE + i*HR_STATION_STRIDE
+HR_STATION_BASE   = 200
+HR_STATION_STRIDE = 20
+STN_RESULT_CODE = 0   # 0 = OK, 1 = NOK
+STN_CYCLE_MS    = 1
+STN_CYCLE_ID    = 2   # ID cyklu, ku ktorému výsledok patrí
+STN_RECIPE_ID   = 3   # PLC -> app: recept stanice (0 = nemeniť)
+STN_MEASURES_0  = 10  # prvých 10 meraní stanice: +10..+19
+STN_MEASURES_N  = 10
@@ -0,0 +1,32 @@
+# core/fixture/factory.py
+from typing import Any, Dict, Union
+
+import numpy as np
+
+from .template_fixture import TemplateFixture
+from .pyramid_fixture import PyramidFixture
+
+
+def fixture_from_recipe(recipe: Dict[str, Any], ref: np.ndarray) -> Union[TemplateFixture, PyramidFixture]:
+    """
+    ELI5: Sekcia "fixture" receptu + referenčný obrázok -> fixture (šablóna = výrez ref podľa tpl_xywh).
+    Bez sekcie: TemplateFixture zo stredu ref (200x200). Jediné miesto, kde sa fixture z receptu stavia,
+    aby GUI aj run_loop hľadali diel rovnako.
+    """
+    fx = recipe.get("fixture", {"type": "template",
+                                "tpl_xywh": [ref.shape[1]//2-100, ref.shape[0]//2-100, 200, 200],
+                                "min_score": 0.6})
+    x, y, w, h = fx.get("tpl_xywh", [0, 0, 200, 200])
+    tpl = ref[y:y+h, x:x+w].copy()
+    if (fx.get("type") or "template").lower() == "pyramid":
+        # coarse-to-fine + okno hľadania + voliteľná rotácia
+        margin = fx.get("search_margin")
+        return PyramidFixture(tpl, min_score=float(fx.get("min_score", 0.6)),
+                              levels=fx.get("levels"),
+                              angle_range=float(fx.get("angle_range", 0.0)),
+                              angle_step=float(fx.get("angle_step", 1.0)),
+                              search_margin=None if margin is None else int(margin),
+                              taught_xy=(x, y),
+                              track_last=bool(fx.get("track_last", True)),
+                              fallback_full=bool(fx.get("fallback_full", True)))
+    return TemplateFixture(tpl, min_score=float(fx.get("min_score", 0.6)))
@@ -0,0 +1,203 @@
+# core/fixture/pyramid_fixture.py
+import math
+import cv2 as cv
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+def _inner_scale(w: int, h: int, max_angle_deg: float) -> float:
+    """
+    Koľko zo šablóny ostane platné pri rotácii o ±max_angle: stredový obdĺžnik
+    (w*s, h*s) musí po otočení ostať celý vnútri pôvodnej šablóny (žiadne čierne rohy).
+    """
+    a = math.radians(abs(max_angle_deg))
+    if a <= 0.0:
+        return 1.0
+    c, s = math.cos(a), math.sin(a)
+    return min(1.0, w / (w * c + h * s), h / (w * s + h * c))
+
+
+def _pyr_down(img: np.ndarray, levels: int) -> np.ndarray:
+    for _ in range(levels):
+        img = cv.pyrDown(img)
+    return img
+
+
+class PyramidFixture:
+    """
+    ELI5: Rýchlejší a "otočný" brat TemplateFixture.
+    1) Hľadáme na zmenšenom obrázku (pyramída, 2^levels menší) – lacné hrubé nájdenie.
+    2) Na plnom rozlíšení už len doladíme v malom okne okolo hrubého nálezu.
+    3) Voliteľne hľadáme len v okne okolo naučenej pozície / posledného nálezu (search_margin).
+    4) Voliteľne máme banku otočených šablón (±angle_range po angle_step) => vieme aj rotáciu.
+
+    Výsledok je rigidná H (rotácia okolo stredu šablóny + posun) a skóre.
+    Pri uhle 0 je H presne ako v TemplateFixture (posun = ľavý horný roh nálezu).
+    """
+
+    def __init__(self, template_img: np.ndarray, min_score: float = 0.6,
+                 levels: Optional[int] = None, angle_range: float = 0.0, angle_step: float = 1.0,
+                 search_margin: Optional[int] = None, taught_xy: Optional[Tuple[int, int]] = None,
+                 track_last: bool = True, fallback_full: bool = True, coarse_candidates: int = 3,
+                 method: int = cv.TM_CCOEFF_NORMED):
+        if template_img.ndim == 3:
+            template_img = cv.cvtColor(template_img, cv.COLOR_BGR2GRAY)
+        self.template = template_img
+        self.h_t, self.w_t = template_img.shape[:2]
+        self.method = method
+        self.min_score = float(min_score)
+        self.search_margin = None if search_margin is None else max(0, int(search_margin))
+        self.taught_xy = None if taught_xy is None else (int(taught_xy[0]), int(taught_xy[1]))
+        self.track_last = bool(track_last)
+        self.fallback_full = bool(fallback_full)
+        self.coarse_candidates = max(1, int(coarse_candidates))
+
+        # posledný výsledok (pre GUI/diagnostiku a pre hľadanie okolo posledného nálezu)
+        self.last_score: float = 0.0
+        self.last_angle: float = 0.0
+        self.last_xy: Optional[Tuple[int, int]] = None
+
+        # --- banka otočených šablón (stredový výrez, aby rohy po rotácii neboli čierne) ---
+        angle_range = abs(float(angle_range))
+        angle_step = max(0.1, abs(float(angle_step)))
+        n = int(math.floor(angle_range / angle_step + 1e-9))
+        self.angles: List[float] = [0.0] + [s * k * angle_step for k in range(1, n + 1) for s in (1.0, -1.0)]
+        self.angles.sort()
+
+        sc = _inner_scale(self.w_t, self.h_t, angle_range if n > 0 else 0.0)
+        # rovnaká parita ako šablóna => offset výrezu je celé číslo a uhol 0 dá presne TemplateFixture posun
+        wi = max(8, int(self.w_t * sc)); wi -= (self.w_t - wi) % 2
+        hi = max(8, int(self.h_t * sc)); hi -= (self.h_t - hi) % 2
+        wi, hi = min(wi, self.w_t), min(hi, self.h_t)
+        self.ox, self.oy = (self.w_t - wi) // 2, (self.h_t - hi) // 2
+        self.w_i, self.h_i = wi, hi
+
+        center = (self.w_t / 2.0, self.h_t / 2.0)
+        self.bank: List[np.ndarray] = []
+        for ang in self.angles:
+            if ang == 0.0:
+                rot = template_img
+            else:
+                M = cv.getRotationMatrix2D(center, ang, 1.0)
+                rot = cv.warpAffine(template_img, M, (self.w_t, self.h_t),
+                                    flags=cv.INTER_LINEAR, borderMode=cv.BORDER_REPLICATE)
+            self.bank.append(np.ascontiguousarray(rot[self.oy:self.oy + hi, self.ox:self.ox + wi]))
+
+        # --- pyramída: najhrubšia úroveň, kde má šablóna ešte aspoň ~24 px ---
+        if levels is None:
+            levels = 0
+            while min(wi, hi) >> (levels + 1) >= 24 and levels < 4:
+                levels += 1
+        self.levels = max(0, int(levels))
+        self.bank_coarse: List[np.ndarray] = [_pyr_down(t, self.levels) for t in self.bank]
+
+    # -------------------- pomocné --------------------
+
+    def _score_loc(self, res: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        min_val, max_val, min_loc, max_loc = cv.minMaxLoc(res)
+        if self.method in [cv.TM_SQDIFF, cv.TM_SQDIFF_NORMED]:
+            return 1.0 - min_val, min_loc
+        return max_val, max_loc
+
+    def _window(self, shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Okno hľadania (x1, y1, x2, y2) v plnom rozlíšení; bez search_margin = celý frame."""
+        Hh, Ww = shape[:2]
+        anchor = self.last_xy if (self.track_last and self.last_xy is not None) else self.taught_xy
+        if self.search_margin is None or anchor is None:
+            return 0, 0, Ww, Hh
+        m = self.search_margin
+        ax, ay = anchor[0] + self.ox, anchor[1] + self.oy  # ľavý horný roh vnútorného výrezu
+        return (max(0, ax - m), max(0, ay - m),
+                min(Ww, ax + self.w_i + m), min(Hh, ay + self.h_i + m))
+
+    def _search(self, gray: np.ndarray, win: Tuple[int, int, int, int]) -> Tuple[float, int, Tuple[int, int]]:
+        """Hrubé hľadanie na pyramíde + doladenie na plnom rozlíšení. Vracia (score, idx_uhla, (x, y) výrezu)."""
+        x1, y1, x2, y2 = win
+        if x2 - x1 < self.w_i or y2 - y1 < self.h_i:
+            return -1.0, 0, (0, 0)
+
+        # 1) hrubá úroveň: všetky uhly, celé okno; pár najlepších kandidátov (nie len 1 peak)
+        if self.levels > 0:
+            small = _pyr_down(gray[y1:y2, x1:x2], self.levels)
+            coarse = []
+            for i, tpl in enumerate(self.bank_coarse):
+                if small.shape[0] < tpl.shape[0] or small.shape[1] < tpl.shape[1]:
+                    continue
+                res = cv.matchTemplate(small, tpl, self.method)
+                if self.method in [cv.TM_SQDIFF, cv.TM_SQDIFF_NORMED]:
+                    res = 1.0 - res
+                for _ in range(self.coarse_candidates):
+                    _, s, _, loc = cv.minMaxLoc(res)
+                    coarse.append((s, i, loc))
+                    # potlač okolie peaku, nech ďalší kandidát je iné miesto
+                    cv.rectangle(res, (loc[0] - tpl.shape[1] // 2, loc[1] - tpl.shape[0] // 2),
+                                 (loc[0] + tpl.shape[1] // 2, loc[1] + tpl.shape[0] // 2), -2.0, -1)
+            if not coarse:
+                return -1.0, 0, (0, 0)
+            coarse.sort(key=lambda c: -c[0])
+            seeds = []
+            for c in coarse:  # susedné uhly dávajú peak na tom istom mieste => berieme rôzne miesta
+                if all(abs(c[2][0] - o[2][0]) > 2 or abs(c[2][1] - o[2][1]) > 2 for o in seeds):
+                    seeds.append(c)
+                if len(seeds) >= self.coarse_candidates:
+                    break
+        else:
+            seeds = [None]
+
+        # 2) jemná úroveň: malé okno okolo hrubého nálezu, najlepší uhol a jeho susedia
+        best = (-2.0, 0, (0, 0))
+        r = (1 << self.levels) + 2
+        for seed in seeds:
+            if seed is None:
+                fx1, fy1, fx2, fy2 = x1, y1, x2, y2
+                cand = range(len(self.bank))
+            else:
+                _, bi, (cx, cy) = seed
+                f = 1 << self.levels
+                fx1, fy1 = max(x1, x1 + cx * f - r), max(y1, y1 + cy * f - r)
+                fx2, fy2 = min(x2, x1 + cx * f + self.w_i + r), min(y2, y1 + cy * f + self.h_i + r)
+                cand = [i for i in (bi - 1, bi, bi + 1) if 0 <= i < len(self.bank)]
+            roi = gray[fy1:fy2, fx1:fx2]
+            if roi.shape[0] < self.h_i or roi.shape[1] < self.w_i:
+                continue
+            for i in cand:
+                s, (lx, ly) = self._score_loc(cv.matchTemplate(roi, self.bank[i], self.method))
+                if s > best[0]:
+                    best = (s, i, (fx1 + lx, fy1 + ly))
+        return best
+
+    def _rigid_h(self, angle: float, top_left: Tuple[int, int]) -> np.ndarray:
+        """H = posun(top_left) · rotácia okolo stredu šablóny; uhol 0 => čistý posun."""
+        if angle == 0.0:
+            R = np.eye(3, dtype=np.float64)
+        else:
+            R = np.vstack([cv.getRotationMatrix2D((self.w_t / 2.0, self.h_t / 2.0), angle, 1.0), [0.0, 0.0, 1.0]])
+        T = np.array([[1.0, 0.0, top_left[0]], [0.0, 1.0, top_left[1]], [0.0, 0.0, 1.0]])
+        return (T @ R).astype(np.float32)
+
+    # -------------------- API --------------------
+
+    def estimate(self, img_cur: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+        """Vráti (H alebo None, skóre). H je rigidná 3x3 (float32)."""
+        gray = cv.cvtColor(img_cur, cv.COLOR_BGR2GRAY) if img_cur.ndim == 3 else img_cur
+
+        win = self._window(gray.shape)
+        score, idx, (lx, ly) = self._search(gray, win)
+        full = (0, 0, gray.shape[1], gray.shape[0])
+        if score < self.min_score and self.fallback_full and win != full:
+            score, idx, (lx, ly) = self._search(gray, full)
+
+        self.last_score = float(max(score, 0.0))
+        if score < self.min_score:
+            # nenašlo sa dosť dobre; okno sa vráti na naučenú pozíciu
+            self.last_xy = None
+            return None, self.last_score
+
+        top_left = (lx - self.ox, ly - self.oy)
+        self.last_angle = float(self.angles[idx])
+        self.last_xy = top_left
+        return self._rigid_h(self.last_angle, top_left), self.last_score
+
+    def estimate_transform(self, img_cur: np.ndarray) -> Optional[np.ndarray]:
+        H, _ = self.estimate(img_cur)
+        return H
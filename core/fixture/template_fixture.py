@@ -18,6 +18,7 @@ class TemplateFixture:
         self.h_t, self.w_t = template_img.shape[:2]
         self.method = method
         self.min_score = min_score
+        self.last_score: float = 0.0
 
     def estimate_transform(self, img_cur: np.ndarray) -> Optional[np.ndarray]:
         if img_cur.ndim == 3:
@@ -35,6 +36,7 @@ class TemplateFixture:
             score = max_val
             top_left = max_loc
 
+        self.last_score = float(score)
         if score < self.min_score:
             # nenašlo sa dosť dobre
             return None
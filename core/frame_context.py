@@ -0,0 +1,192 @@
+# core/frame_context.py
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import cv2 as cv
+
+
+def align_to_ref(img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray] = None) -> np.ndarray:
+    """Zarovná curr. frame na veľkosť/rovinu referencie (warp H alebo resize)."""
+    if fixture_transform is not None:
+        return cv.warpPerspective(img_cur, fixture_transform, (img_ref.shape[1], img_ref.shape[0]))
+    if img_cur.shape[:2] != img_ref.shape[:2]:
+        return cv.resize(img_cur, (img_ref.shape[1], img_ref.shape[0]), interpolation=cv.INTER_LINEAR)
+    return img_cur
+
+
+def _to_gray(img: np.ndarray) -> np.ndarray:
+    return cv.cvtColor(img, cv.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def _to_bgr(img: np.ndarray) -> np.ndarray:
+    return cv.cvtColor(img, cv.COLOR_GRAY2BGR) if img.ndim == 2 else img
+
+
+def transform_kind(H: Optional[np.ndarray], eps: float = 1e-9) -> str:
+    """
+    Druh transformácie fixtúry: "none" | "shift" (celočíselný posun) | "affine"
+    (sub-pixel posun, rotácia, mierka) | "perspective" (nenulový posledný riadok).
+    """
+    if H is None:
+        return "none"
+    M = np.asarray(H, dtype=np.float64)
+    if abs(M[2, 0]) > eps or abs(M[2, 1]) > eps or abs(M[2, 2]) <= eps:
+        return "perspective"
+    M = M / M[2, 2]
+    if np.allclose(M[:2, :2], np.eye(2), rtol=0.0, atol=eps):
+        tx, ty = M[0, 2], M[1, 2]
+        if abs(tx - round(tx)) <= eps and abs(ty - round(ty)) <= eps:
+            return "shift"
+    return "affine"
+
+
+def _shift_crop(src: np.ndarray, x1: int, y1: int, x2: int, y2: int, tx: int, ty: int) -> np.ndarray:
+    """
+    Výrez ROI po celočíselnom posune (tx, ty) bez warpu celého framu.
+    Rovnaký výsledok ako warpPerspective(...)[y1:y2, x1:x2]: čo padne mimo src, je 0.
+    Keď je celý výrez vnútri src, vráti sa view (bez kópie).
+    """
+    sx1, sy1, sx2, sy2 = x1 - tx, y1 - ty, x2 - tx, y2 - ty
+    Hs, Ws = src.shape[:2]
+    if sx1 >= 0 and sy1 >= 0 and sx2 <= Ws and sy2 <= Hs:
+        return src[sy1:sy2, sx1:sx2]
+    out = np.zeros((y2 - y1, x2 - x1) + src.shape[2:], dtype=src.dtype)
+    cx1, cy1, cx2, cy2 = max(0, sx1), max(0, sy1), min(Ws, sx2), min(Hs, sy2)
+    if cx2 > cx1 and cy2 > cy1:
+        out[cy1 - sy1:cy2 - sy1, cx1 - sx1:cx2 - sx1] = src[cy1:cy2, cx1:cx2]
+    return out
+
+
+def _warp_crop(src: np.ndarray, H: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+    """
+    Warp len do veľkosti ROI: T(-x1,-y1) @ H posunie výstup tak, aby (x1,y1) bol (0,0).
+    Rovnaké ako výrez z full-frame warpPerspective (pri rotácii max. ±1 z zaokrúhlenia
+    interpolácie), ale počíta sa len plocha ROI.
+    """
+    T = np.array([[1.0, 0.0, -x1], [0.0, 1.0, -y1], [0.0, 0.0, 1.0]])
+    M = T @ np.asarray(H, dtype=np.float64)
+    return cv.warpPerspective(src, M, (x2 - x1, y2 - y1))
+
+
+def clip_roi(roi: Tuple[int, int, int, int], shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """Prienik ROI s obrazom (x1, y1, x2, y2); prázdny prienik => x2<=x1 alebo y2<=y1."""
+    x, y, w, h = [int(v) for v in roi]
+    H, W = shape[:2]
+    return max(0, x), max(0, y), min(W, x + w), min(H, y + h)
+
+
+class FrameContext:
+    """
+    ELI5: Jeden snímok = jeden kontext. Pipeline ho postaví raz za cyklus a všetky
+    tools z neho čítajú zarovnaný frame, gray a ďalšie odvodené roviny.
+    Warp + cvtColor tak beží raz za cyklus, nie raz na každý tool.
+    Všetko sa počíta lenivo (až keď si to prvý tool vypýta) a výsledok sa zdieľa.
+
+    Pri posune/afinite fixtúry sa celý frame vôbec newarpuje: crop() vezme ROI priamo
+    zo zdroja (celočíselný posun = slice) alebo warpne len plochu ROI. Celý frame
+    sa zarovná len pri perspektíve alebo pri inom rozmere bez H (resize).
+
+    Tools do vrátených polí NEZAPISUJÚ (sú zdieľané) – ak treba meniť, najprv .copy().
+    """
+
+    def __init__(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray] = None):
+        self.img_ref = img_ref
+        self.img_cur = img_cur
+        self.H = fixture_transform
+        self.ref_shape: Tuple[int, int] = tuple(img_ref.shape[:2])
+        self.mode = transform_kind(fixture_transform)
+        if self.mode == "none" and img_cur.shape[:2] != self.ref_shape:
+            self.mode = "resize"
+        self._planes: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    # -------------------- lenivé roviny --------------------
+
+    def plane(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Vráti rovinu 'key'; ak ešte neexistuje, vypočíta ju cez fn() (raz za cyklus)."""
+        try:
+            return self._planes[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._planes:
+                self._planes[key] = fn()
+            return self._planes[key]
+
+    def put(self, key: str, value: Any) -> None:
+        """Uloží hotový výsledok do kontextu (napr. dávkový pre-pass Pipeline pre konkrétny tool)."""
+        with self._lock:
+            self._planes[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._planes.get(key, default)
+
+    @property
+    def aligned(self) -> np.ndarray:
+        """Current frame v rovine/rozmere referencie."""
+        return self.plane("aligned", lambda: align_to_ref(self.img_ref, self.img_cur, self.H))
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.plane("gray", lambda: _to_gray(self.aligned))
+
+    @property
+    def bgr(self) -> np.ndarray:
+        return self.plane("bgr", lambda: _to_bgr(self.aligned))
+
+    @property
+    def ref_gray(self) -> np.ndarray:
+        return self.plane("ref_gray", lambda: _to_gray(self.img_ref))
+
+    # -------------------- ROI výrezy --------------------
+
+    def crop(self, roi: Tuple[int, int, int, int], kind: str = "raw") -> np.ndarray:
+        """
+        Výrez ROI (v súradniciach referencie) zo zarovnaného framu.
+        kind: "raw" (ako prišiel) | "gray" | "bgr". ROI sa oreže na rozmer referencie.
+        Výrezy sa cacheujú per (ROI, kind) – tools s rovnakým ROI zdieľajú jeden výrez.
+        """
+        x1, y1, x2, y2 = clip_roi(roi, self.ref_shape)
+        if x2 <= x1 or y2 <= y1:
+            if kind == "gray":
+                return np.zeros((0, 0), dtype=self.img_cur.dtype)
+            if kind == "bgr":
+                return np.zeros((0, 0, 3), dtype=self.img_cur.dtype)
+            return self.img_cur[0:0, 0:0]
+
+        if self.mode in ("perspective", "resize"):
+            if kind == "gray":
+                src = self.gray
+            elif kind == "bgr":
+                src = self.bgr
+            else:
+                src = self.aligned
+            return src[y1:y2, x1:x2]
+
+        if kind == "gray":
+            return self.plane(f"crop:gray:{x1},{y1},{x2},{y2}",
+                              lambda: _to_gray(self._crop_raw(x1, y1, x2, y2)))
+        if kind == "bgr":
+            return self.plane(f"crop:bgr:{x1},{y1},{x2},{y2}",
+                              lambda: _to_bgr(self._crop_raw(x1, y1, x2, y2)))
+        return self._crop_raw(x1, y1, x2, y2)
+
+    def _crop_raw(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """Surový výrez bez full-frame warpu (režimy none/shift/affine)."""
+        if self.mode == "none":
+            return self.img_cur[y1:y2, x1:x2]
+        if self.mode == "shift":
+            M = np.asarray(self.H, dtype=np.float64)
+            tx, ty = int(round(M[0, 2] / M[2, 2])), int(round(M[1, 2] / M[2, 2]))
+            return self.plane(f"crop:raw:{x1},{y1},{x2},{y2}",
+                              lambda: _shift_crop(self.img_cur, x1, y1, x2, y2, tx, ty))
+        return self.plane(f"crop:raw:{x1},{y1},{x2},{y2}",
+                          lambda: _warp_crop(self.img_cur, self.H, x1, y1, x2, y2))
+
+    def crop_ref(self, roi: Tuple[int, int, int, int], kind: str = "raw") -> np.ndarray:
+        """Výrez ROI z referencie (rovnaké orezanie ako crop)."""
+        src = self.ref_gray if kind == "gray" else self.img_ref
+        x1, y1, x2, y2 = clip_roi(roi, self.ref_shape)
+        if x2 <= x1 or y2 <= y1:
+            return src[0:0, 0:0]
+        return src[y1:y2, x1:x2]
@@ -1,34 +1,181 @@
 # core/pipeline.py
+import os
 import time
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional, Tuple
 import numpy as np
 from .tools.base_tool import BaseTool, ToolResult
+from .frame_context import FrameContext
 
 
+# -------------------- zdieľaný pool pre paralelný režim --------------------
+# Jeden pool na proces: prežije prepnutie receptu (nová Pipeline), nevytvára sa každý cyklus.
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_SIZE = 0
+_POOL_LOCK = threading.Lock()
+
+
+def default_workers() -> int:
+    """Počet workerov podľa jadier (OpenCV/ORT počas výpočtu púšťajú GIL)."""
+    return max(1, min(16, os.cpu_count() or 1))
+
+
+def get_tool_pool(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """Vráti zdieľaný ThreadPoolExecutor; ak treba väčší, starý sa dobehne a nahradí."""
+    global _POOL, _POOL_SIZE
+    n = int(max_workers) if max_workers else default_workers()
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE < n:
+            old = _POOL
+            _POOL = ThreadPoolExecutor(max_workers=n, thread_name_prefix="qc-tool")
+            _POOL_SIZE = n
+            if old is not None:
+                old.shutdown(wait=False)
+        return _POOL
+
+
+def _run_tool(tool: BaseTool, img_ref: np.ndarray, img_cur: np.ndarray,
+              H: Optional[np.ndarray], ctx: FrameContext) -> Tuple[ToolResult, float]:
+    """Spustí jeden tool, zmeria jeho čas; výnimka = NOK výsledok, nie pád celého cyklu."""
+    t0 = time.perf_counter()
+    try:
+        r = tool.run(img_ref, img_cur, H, ctx=ctx)
+    except Exception as e:
+        r = ToolResult(ok=False, measured=0.0, lsl=tool.lsl, usl=tool.usl,
+                       details={"roi_xywh": tool.roi_xywh, "error": f"{type(e).__name__}: {e}"})
+    ms = (time.perf_counter() - t0) * 1000.0
+    if isinstance(r.details, dict):
+        r.details["elapsed_ms"] = ms
+    return r, ms
+
+
+def _skipped_result(tool: BaseTool) -> ToolResult:
+    """Výsledok pre tool, ktorý fail-fast nespustil (verdikt už bol NOK)."""
+    return ToolResult(ok=False, measured=0.0, lsl=tool.lsl, usl=tool.usl,
+                      details={"roi_xywh": tool.roi_xywh, "skipped": "fail_fast"}, evaluated=False)
+
+
+MODE_FULL = "full"
+MODE_FAIL_FAST = "fail_fast"
+
 
 class Pipeline:
     """
     Orchestruje: fixtúra -> tools -> verdict.
+    Za cyklus sa postaví jeden FrameContext (warp + gray raz), ktorý zdieľajú všetky tools.
+    parallel=True: tools bežia súbežne na zdieľanom poole (poradie výsledkov = poradie v recepte).
+    mode="full": vždy všetky tools (log, RUN overlay).
+    mode="fail_fast": len verdikt čo najskôr (PLC) – tools od najlacnejšieho (priemerný nameraný čas),
+                      prvý NOK zastaví cyklus, zvyšné sú vo výsledkoch ako evaluated=False.
     """
-    def __init__(self, tools: List[BaseTool], fixture, pxmm: Optional[Dict] = None):
+    COST_ALPHA = 0.2  # váha nového merania v kĺzavom priemere času toolu
+
+    def __init__(self, tools: List[BaseTool], fixture, pxmm: Optional[Dict] = None,
+                 parallel: bool = False, max_workers: Optional[int] = None, mode: str = MODE_FULL):
         self.tools = tools
         self.fixture = fixture  # objekt s .estimate_transform(img)->np.ndarray
         self.pxmm = pxmm or {}
+        self.parallel = bool(parallel)
+        self.max_workers = max_workers
+        self.mode = MODE_FAIL_FAST if str(mode).lower() == MODE_FAIL_FAST else MODE_FULL
+        self._cost_ms: List[Optional[float]] = [None] * len(tools)
 
-    def process(self, img_ref: np.ndarray, img_cur: np.ndarray) -> Dict:
+    def prepare(self, img_ref: np.ndarray) -> None:
+        """
+        Teach-time príprava pri stavbe receptu: tools si predpočítajú referenčnú stranu
+        (ROI/šablóny po preproc), aby to prvý RUN cyklus neplatil. Chyba jedného toolu nič nezablokuje.
+        """
+        for tool in self.tools:
+            try:
+                tool.prepare(img_ref)
+            except Exception:
+                pass
+
+    def release(self) -> None:
+        """Pipeline sa nahrádza novou (iný recept): tools uvoľnia pripnuté zdroje (modely v registri)."""
+        for tool in self.tools:
+            try:
+                tool.release()
+            except Exception:
+                pass
+
+    # -------------------- cena toolov (pre fail-fast poradie) --------------------
+
+    def _update_cost(self, i: int, ms: float) -> None:
+        if len(self._cost_ms) != len(self.tools):  # zoznam tools sa zmenil zvonka
+            self._cost_ms = [None] * len(self.tools)
+        old = self._cost_ms[i]
+        self._cost_ms[i] = ms if old is None else (1.0 - self.COST_ALPHA) * old + self.COST_ALPHA * ms
+
+    def cost_order(self) -> List[int]:
+        """Indexy tools od najlacnejšieho; ešte nemerané idú prvé (nech sa zmerajú)."""
+        costs = self._cost_ms if len(self._cost_ms) == len(self.tools) else [None] * len(self.tools)
+        return sorted(range(len(self.tools)), key=lambda i: (costs[i] is not None, costs[i] or 0.0, i))
+
+    def _batch_prepass(self, ctx: FrameContext) -> None:
+        """
+        Tools s rovnakou triedou, ktoré vedia bežať dávkovo (classmethod run_batch, napr. YOLO:
+        viac ROI -> jeden session.run), sa spustia naraz; výsledky si uložia do ctx a ich run()
+        ich už len vyzdvihne. Chyba dávky nič nerozbije – tools potom pobežia po jednom.
+        """
+        groups: Dict[Any, List[BaseTool]] = {}
+        for tool in self.tools:
+            fn = getattr(type(tool), "run_batch", None)
+            if fn is not None:
+                groups.setdefault(getattr(fn, "__func__", fn), []).append(tool)
+        for group in groups.values():
+            if len(group) > 1:
+                try:
+                    type(group[0]).run_batch(group, ctx)
+                except Exception:
+                    pass
+
+    def process(self, img_ref: np.ndarray, img_cur: np.ndarray, mode: Optional[str] = None) -> Dict:
+        """mode: None = podľa Pipeline.mode; "full" / "fail_fast" vynúti režim pre tento cyklus."""
         t0 = time.perf_counter()
+        mode = self.mode if mode is None else (MODE_FAIL_FAST if str(mode).lower() == MODE_FAIL_FAST else MODE_FULL)
         H = self.fixture.estimate_transform(img_cur) if self.fixture else None
+        ctx = FrameContext(img_ref, img_cur, H)
 
-        results: List[ToolResult] = []
-        for tool in self.tools:
-            r = tool.run(img_ref, img_cur, H)
-            results.append(r)
+        runs: List[Optional[Tuple[ToolResult, float]]] = [None] * len(self.tools)
+        batch_ms = 0.0
+        if mode != MODE_FAIL_FAST:
+            # fail-fast dávku nerobí – tá by vyhodnotila aj tools, ktoré sa možno vôbec nespustia
+            tb = time.perf_counter()
+            self._batch_prepass(ctx)
+            batch_ms = (time.perf_counter() - tb) * 1000.0
+
+        if mode == MODE_FAIL_FAST:
+            # sekvenčne podľa ceny – pri prvom NOK končíme (paralelizmus by len pálil CPU na zbytočné tools)
+            for i in self.cost_order():
+                runs[i] = _run_tool(self.tools[i], img_ref, img_cur, H, ctx)
+                if not runs[i][0].ok:
+                    break
+        elif self.parallel and len(self.tools) > 1:
+            pool = get_tool_pool(self.max_workers)
+            futures = [pool.submit(_run_tool, tool, img_ref, img_cur, H, ctx) for tool in self.tools]
+            runs = [f.result() for f in futures]
+        else:
+            runs = [_run_tool(tool, img_ref, img_cur, H, ctx) for tool in self.tools]
+
+        for i, run in enumerate(runs):
+            if run is None:
+                runs[i] = (_skipped_result(self.tools[i]), 0.0)
+            else:
+                self._update_cost(i, run[1])
 
+        results: List[ToolResult] = [r for r, _ in runs]
         verdict = all(r.ok for r in results)
         elapsed_ms = (time.perf_counter() - t0) * 1000.0
         return {
             "ok": verdict,
             "elapsed_ms": elapsed_ms,
+            "mode": mode,
             "results": results,
-            "fixture": {"H": H.tolist() if isinstance(H, np.ndarray) else None}
+            "tool_ms": [ms for _, ms in runs],
+            "batch_ms": batch_ms,
+            "evaluated": sum(1 for r in results if r.evaluated),
+            "fixture": {"H": H.tolist() if isinstance(H, np.ndarray) else None, "mode": ctx.mode,
+                        "score": getattr(self.fixture, "last_score", None)}
         }
@@ -21,10 +21,9 @@ class BlobCountTool(BaseTool):
     """
     TYPE = "blob_count"
 
-    def run(self, img_ref, img_cur, fixture_transform=None) -> ToolResult:
-        # 1) dorovnaj current do ref (aby ROI/masky sedeli 1:1)
-        cur_aligned = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
-            
+    def run(self, img_ref, img_cur, fixture_transform=None, ctx=None) -> ToolResult:
+        # 1) dorovnaj current do ref (aby ROI/masky sedeli 1:1) – zdieľaný FrameContext
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
 
         # 2) bezpečné ROI
         x, y, w, h = [int(v) for v in self.roi_xywh]
@@ -37,13 +36,12 @@ class BlobCountTool(BaseTool):
                 details={"error": "empty_roi"}, overlay=None
             )
 
-        roi = cur_aligned[y:y+h, x:x+w]
-        roi_gray = roi if roi.ndim == 2 else cv.cvtColor(roi, cv.COLOR_BGR2GRAY)
+        roi_gray = ctx.crop((x, y, w, h), kind="gray")
 
         # 3) maska do ROI-lokálnych súradníc
         params = dict(self.params or {})
         mask_rects = params.get("mask_rects", []) or []
-        m = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=(h, w)) if mask_rects else None
+        m = self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape=(h, w)) if mask_rects else None
 
 
 
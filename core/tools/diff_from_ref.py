@@ -1,17 +1,10 @@
 # core/tools/diff_from_ref.py
 import cv2 as cv
 import numpy as np
-from typing import Tuple, Optional, List
+from typing import Tuple, Optional
 from .base_tool import BaseTool, ToolResult
-
-def _safe_crop(img: np.ndarray, roi: Tuple[int,int,int,int]) -> np.ndarray:
-    x, y, w, h = roi
-    H, W = img.shape[:2]
-    x1 = max(0, x); y1 = max(0, y)
-    x2 = min(W, x + w); y2 = min(H, y + h)
-    if x2 <= x1 or y2 <= y1:
-        return img[0:0, 0:0]
-    return img[y1:y2, x1:x2]
+from ..frame_context import FrameContext
+from .mask_cache import mask_mtime
 
 def _warp_to_ref(img_cur: np.ndarray, img_ref_shape: Tuple[int,int], H: Optional[np.ndarray]) -> np.ndarray:
     """Vždy pracujeme v súradniciach referencie (rovnaký rozmer)."""
@@ -29,68 +22,91 @@ def _align_same_size(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarr
         return a[0:0,0:0], b[0:0,0:0]
     return a[:h, :w], b[:h, :w]
 
-def _mask_from_rects_ignore(full_shape: Tuple[int,int], rects: List[List[int]]) -> np.ndarray:
+def _blob_features(labels: np.ndarray, stats: np.ndarray, centroids: np.ndarray, diff: np.ndarray,
+                   keep: np.ndarray, offset: Tuple[int,int] = (0, 0)) -> dict:
     """
-    Vytvor binárnu masku pre OPERÁCIU bitwise_and:
-      255 = ponechaj / analyzuj
-        0 = IGNORUJ (vypni)
-    rects = ZOZNAM OBLASTÍ, KTORÉ SA IGNORUJÚ (t.j. nastavíme na 0).
+    Per-blob vlastnosti ponechaných blobov ako kompaktné numpy polia (K = počet blobov):
+      bbox (K,4) int32 x,y,w,h a centroid (K,2) float32 – v súradniciach referencie (offset = ľavý horný roh ROI),
+      area (K,) int32, max_diff (K,) = najväčší |cur-ref| v blobe.
     """
-    H, W = full_shape
-    m = np.full((H, W), 255, np.uint8)  # default = analyzovať všetko
-    for r in rects or []:
-        x,y,w,h = [int(v) for v in r]
-        x1 = max(0, x); y1 = max(0, y)
-        x2 = min(W, x+w); y2 = min(H, y+h)
-        if x2 > x1 and y2 > y1:
-            m[y1:y2, x1:x2] = 0        # tieto oblasti IGNORUJ
-    return m
-
-def _load_mask(mask_path: Optional[str]) -> Optional[np.ndarray]:
-    if not mask_path: return None
-    m = cv.imread(mask_path, cv.IMREAD_GRAYSCALE)
-    if m is None: return None
-    _, m = cv.threshold(m, 1, 255, cv.THRESH_BINARY)
-    return m
+    idx = np.flatnonzero(keep)
+    ox, oy = offset
+    bbox = stats[idx, :4].astype(np.int32)
+    bbox[:, 0] += ox
+    bbox[:, 1] += oy
+    cent = centroids[idx].astype(np.float32)
+    cent[:, 0] += ox
+    cent[:, 1] += oy
+    # max diff per label jedným prechodom cez popredie (nie maska per blob)
+    mx = np.zeros(len(keep), dtype=diff.dtype)
+    fg = labels > 0
+    np.maximum.at(mx, labels[fg], diff[fg])
+    return {"bbox": bbox, "centroid": cent,
+            "area": stats[idx, cv.CC_STAT_AREA].astype(np.int32), "max_diff": mx[idx]}
 
 class DiffFromRefTool(BaseTool):
-    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray]) -> ToolResult:
-       
-       
-        # 1) do rozmeru referencie (jednotné cez BaseTool helper)
-        ref_gray = cv.cvtColor(img_ref, cv.COLOR_BGR2GRAY) if img_ref.ndim == 3 else img_ref
-        cur_to_ref = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
-        cur_gray = cv.cvtColor(cur_to_ref, cv.COLOR_BGR2GRAY) if cur_to_ref.ndim == 3 else cur_to_ref
-
-
-        # 2) maska: mask_rects (ignoruje sa) alebo maska zo súboru
+    def _roi_mask(self, ref_shape: Tuple[int,int]) -> np.ndarray:
+        """ROI-lokálna maska (255=analyzuj, 0=ignoruj) z mask_rects alebo zo súboru mask_path."""
         params = self.params or {}
         mask_rects = params.get("mask_rects", []) or []
         mask_path = params.get("mask_path", None)
+        x, y, w, h = self.roi_xywh
 
-        mask_full = None
-        if mask_rects:
-            # najprv „full“ (kvôli fallbacku), reálne však pre ROI použijeme ROI-lokálnu cez helper nižšie
-            mask_full = _mask_from_rects_ignore(ref_gray.shape[:2], mask_rects)
-        else:
-            mask_full = _load_mask(mask_path)
-            if mask_full is not None and mask_full.shape[:2] != ref_gray.shape[:2]:
-                mask_full = None
-        if mask_full is None:
-            mask_full = np.full(ref_gray.shape[:2], 255, np.uint8)
-
+        # ROI-lokálna maska zo zdieľanej cache (bez full-frame medzikroku, súbor len pri zmene mtime)
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(ref_shape[1], x + w), min(ref_shape[0], y + h)
+        roi_shape = (max(0, y2 - y1), max(0, x2 - x1))
+        return self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape, mask_path=mask_path,
+                                    ref_shape=ref_shape, default_full=True)
+
+    def _ref_side(self, img_ref: np.ndarray, ctx: Optional[FrameContext] = None) -> dict:
+        """
+        Referenčná strana (gray -> ROI -> preproc -> maska -> blur) sa počas RUN nemení,
+        preto sa počíta raz a drží v cache, kým sa nezmenia params/ROI alebo referencia.
+        """
+        params = self.params or {}
+        key = self._params_key(self.roi_xywh, params.get("mask_rects"), params.get("mask_path"),
+                               mask_mtime(params.get("mask_path")), params.get("preproc"), params.get("blur", 3))
+
+        def build():
+            c = ctx if ctx is not None else FrameContext(img_ref, img_ref)
+            roi_mask = self._roi_mask(c.ref_shape)
+            roi_ref = c.crop_ref(self.roi_xywh, kind="gray")
+            roi_mask, _ = _align_same_size(roi_mask, roi_ref)
+            if roi_ref.size == 0 or roi_mask.size == 0:
+                return {"roi_ref": roi_ref, "roi_mask": roi_mask}
+
+            chain = params.get("preproc", []) or []
+            if chain:
+                roi_ref = self._apply_preproc_chain(roi_ref, chain, mask=roi_mask)
+            roi_ref = cv.bitwise_and(roi_ref, roi_mask)
+            blur = int(params.get("blur", 3))
+            if blur > 0 and blur % 2 == 1:
+                roi_ref = cv.GaussianBlur(roi_ref, (blur, blur), 0)
+            return {"roi_ref": self._readonly(roi_ref), "roi_mask": self._readonly(roi_mask)}
+
+        return self._ref_cached(img_ref, key, build)
+
+    def prepare(self, img_ref: np.ndarray) -> None:
+        self._ref_side(img_ref)
+
+    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray],
+            ctx: Optional[FrameContext] = None) -> ToolResult:
+
+        # 1) do rozmeru referencie – zarovnaný gray frame zdieľa celý cyklus (FrameContext)
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
+
+        # 2) referenčná strana + ROI-lokálna maska (mask_rects ignorované / maska zo súboru) – z cache
+        params = self.params or {}
+        mask_rects = params.get("mask_rects", []) or []
+        mask_path = params.get("mask_path", None)
+        ref_side = self._ref_side(img_ref, ctx)
+        roi_ref = ref_side["roi_ref"]
+        roi_mask = ref_side["roi_mask"]
 
-        # 3) ROI v referenčných súradniciach + ROI-lokálna maska
+        # 3) ROI v referenčných súradniciach
         x, y, w, h = self.roi_xywh
-        roi_ref  = _safe_crop(ref_gray, (x,y,w,h))
-        roi_cur  = _safe_crop(cur_gray, (x,y,w,h))
-
-        # maska do ROI lokálu:
-        if mask_rects:
-            roi_mask = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=roi_ref.shape)
-        else:
-            roi_mask_full = mask_full  # zo súboru alebo full-255
-            roi_mask = _safe_crop(roi_mask_full, (x,y,w,h))
+        roi_cur  = ctx.crop((x,y,w,h), kind="gray")
 
         roi_ref, roi_cur = _align_same_size(roi_ref, roi_cur)
         roi_mask, _      = _align_same_size(roi_mask, roi_cur)
@@ -106,22 +122,19 @@ class DiffFromRefTool(BaseTool):
 
             return ToolResult(ok=False, measured=0.0, lsl=self.lsl, usl=self.usl, details=details, overlay=None)
 
-        # 4) Predspracovanie (rovnaké na REF aj CUR), rešpektuje masku (0=ignoruj)
+        # 4) Predspracovanie CUR (REF je už predspracovaná v cache), rešpektuje masku (0=ignoruj)
         chain = params.get("preproc", []) or []
         if chain:
-            roi_ref = self._apply_preproc_chain(roi_ref, chain, mask=roi_mask)
             roi_cur = self._apply_preproc_chain(roi_cur, chain, mask=roi_mask)
             pre_desc = self._preproc_desc(chain)
             pre_preview = cv.cvtColor(roi_cur, cv.COLOR_GRAY2BGR)
 
         # 5) aplikuj masku (nulujeme ignorované oblasti pre diff)
-        roi_ref = cv.bitwise_and(roi_ref, roi_mask)
         roi_cur = cv.bitwise_and(roi_cur, roi_mask)
 
         # 6) diff + prahovanie
         blur = int(params.get("blur", 3))
         if blur > 0 and blur % 2 == 1:
-            roi_ref = cv.GaussianBlur(roi_ref, (blur, blur), 0)
             roi_cur = cv.GaussianBlur(roi_cur, (blur, blur), 0)
 
 
@@ -134,18 +147,18 @@ class DiffFromRefTool(BaseTool):
             k = cv.getStructuringElement(cv.MORPH_ELLIPSE, (3,3))
             bw = cv.morphologyEx(bw, cv.MORPH_OPEN, k, iterations=morph_open)
 
-        num_labels, labels, stats, _ = cv.connectedComponentsWithStats(bw, connectivity=8)
+        num_labels, labels, stats, centroids = cv.connectedComponentsWithStats(bw, connectivity=8)
         min_blob_area = int(params.get("min_blob_area", 20))
-        areas = []
-        kept_mask = np.zeros_like(bw)
-        for lbl in range(1, num_labels):
-            area = stats[lbl, cv.CC_STAT_AREA]
-            if area >= min_blob_area:
-                areas.append(area)
-                kept_mask[labels == lbl] = 255
-
-        total_area = float(np.sum(areas)) if areas else 0.0
-        count = int(len(areas))
+
+        # 7) filter podľa plochy naraz cez LUT nad stats (label 0 = pozadie), žiadna slučka po blobových maskách
+        keep = np.zeros(num_labels, dtype=bool)
+        keep[1:] = stats[1:, cv.CC_STAT_AREA] >= min_blob_area
+        lut = np.where(keep, 255, 0).astype(np.uint8)
+        kept_mask = lut[labels]
+        blobs = _blob_features(labels, stats, centroids, diff, keep, offset=(max(0, x), max(0, y)))
+
+        total_area = float(blobs["area"].sum()) if len(blobs["area"]) else 0.0
+        count = int(len(blobs["area"]))
         measured = total_area if params.get("measure","area") == "area" else float(count)
 
         ok = True
@@ -162,7 +175,8 @@ class DiffFromRefTool(BaseTool):
             "thresh": thresh_val,
             "min_blob_area": min_blob_area,
             "mask_rects": mask_rects,
-            "used_mask_path": (mask_path if mask_path else None)
+            "used_mask_path": (mask_path if mask_path else None),
+            "blobs": blobs
 
         }
         details["preproc_desc"] = pre_desc
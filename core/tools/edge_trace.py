@@ -4,6 +4,8 @@ import numpy as np
 import cv2 as cv
 import math
 from .base_tool import BaseTool, ToolResult
+from ..frame_context import FrameContext
+from .mask_cache import cached_mask, mask_key
 
 # --- helpers ---
 
@@ -184,18 +186,18 @@ def _draw_edge_marks_on_overlay(overlay: np.ndarray, M: np.ndarray, x_start:int,
 # --- tools ---
 
 class _EdgeTraceBase(BaseTool):
-    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray]) -> ToolResult:
+    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray],
+            ctx: Optional[FrameContext] = None) -> ToolResult:
         if img_ref is None or img_cur is None or img_cur.size == 0:
             return ToolResult(False, 0.0, self.lsl, self.usl, {"error":"empty image", "roi_xywh": self.roi_xywh})
 
-        # 1) Zarovnanie na referenciu (BaseTool)
-        cur_ref = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
-        cur_gray = cv.cvtColor(cur_ref, cv.COLOR_BGR2GRAY) if cur_ref.ndim == 3 else cur_ref
+        # 1) Zarovnanie na referenciu + gray (zdieľaný FrameContext)
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
 
         # 2) ROI crop
         x, y, w, h = [int(v) for v in self.roi_xywh]
         roi = (x, y, w, h)
-        roi_gray = _safe_crop(cur_gray, roi)
+        roi_gray = ctx.crop(roi, kind="gray")
         if roi_gray.size == 0:
             return ToolResult(False, 0.0, self.lsl, self.usl, {"error":"roi out of bounds", "roi_xywh": roi})
 
@@ -203,7 +205,10 @@ class _EdgeTraceBase(BaseTool):
         p_global = dict(self.params or {})
         p_local = _shape_to_roi_local(p_global, roi)
 
-        band = _draw_shape_mask(roi_gray.shape[0], roi_gray.shape[1], p_local)
+        # pás okolo tvaru sa mení len so shape parametrami -> zdieľaná cache masiek (read-only)
+        shape_sig = {k: p_local.get(k) for k in ("shape", "pts", "cx", "cy", "r", "width")}
+        band = cached_mask(mask_key("edge_band", roi_gray.shape[:2], shape_sig),
+                           lambda: _draw_shape_mask(roi_gray.shape[0], roi_gray.shape[1], p_local))
         if band.sum() == 0:
             return ToolResult(False, 0.0, self.lsl, self.usl, {"error":"shape mask empty (nakresli tvar)", "roi_xywh": roi})
 
@@ -211,7 +216,7 @@ class _EdgeTraceBase(BaseTool):
         pre_desc = "—"
         pre_preview = None
         mask_rects = (self.params or {}).get("mask_rects", []) or []
-        full_mask = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=roi_gray.shape) if mask_rects else None
+        full_mask = self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape=roi_gray.shape) if mask_rects else None
 
         chain = p_global.get("preproc", []) or []
         if chain:
@@ -53,11 +53,11 @@ class HoughCircleTool(BaseTool):
       - Parametre: dp, minDist, param1, param2, minRadius, maxRadius
       - Metrika: počet kruhov (ks).
     """
-    def run(self, img_ref, img_cur, fixture_transform=None):
+    def run(self, img_ref, img_cur, fixture_transform=None, ctx=None):
         x, y, w, h = [int(v) for v in self.roi_xywh]
 
-        # dorovnaj current na referenciu
-        img_cur = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
+        # dorovnaj current na referenciu (zdieľaný FrameContext)
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
 
         Hc, Wc = img_ref.shape[:2]
         x = max(0, min(x, Wc-1)); y = max(0, min(y, Hc-1))
@@ -74,8 +74,8 @@ class HoughCircleTool(BaseTool):
         chain     = p.get("preproc", []) or []
         mask_rects= p.get("mask_rects", []) or []
 
-        roi = img_cur[y:y+h, x:x+w]
-        m = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=roi.shape) if mask_rects else None
+        roi = ctx.crop((x, y, w, h))
+        m = self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape=roi.shape) if mask_rects else None
         roi_p = self._apply_preproc_chain(roi, chain, mask=m)
 
 
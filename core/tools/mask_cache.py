@@ -0,0 +1,125 @@
+# core/tools/mask_cache.py
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+import numpy as np
+import cv2 as cv
+
+from ..frame_context import clip_roi
+
+# ELI5: Masky (mask_rects / mask_path) sa počas RUN nemenia, tak ich nestaviame každý frame.
+# Cache je zdieľaná všetkými tools (rovnaké ROI + rovnaké masky = jedno pole).
+# Kľúč obsahuje aj mtime súboru masky => keď niekto masku prekreslí, načíta sa nanovo.
+# Vrátené polia sú read-only (zdieľajú sa medzi vláknami) – kto chce meniť, spraví .copy().
+
+
+def _readonly(arr: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    if isinstance(arr, np.ndarray):
+        arr.setflags(write=False)
+    return arr
+
+
+def rects_roi_mask(x: int, y: int, w: int, h: int, mask_rects, roi_shape) -> Optional[np.ndarray]:
+    """ROI-lokálna maska (255=analyzuj) ako prienik ROI a mask_rects (bez cache)."""
+    if not mask_rects:
+        return None
+    H, W = roi_shape[:2]
+    m = np.full((H, W), 255, np.uint8)
+    for (rx, ry, rw, rh) in mask_rects:
+        Lx = max(x, int(rx)); Ly = max(y, int(ry))
+        Rx = min(x + w, int(rx) + int(rw)); Ry = min(y + h, int(ry) + int(rh))
+        if Rx > Lx and Ry > Ly:
+            fx = Lx - x; fy = Ly - y; fw = Rx - Lx; fh = Ry - Ly
+            m[fy:fy+fh, fx:fx+fw] = 0
+    return m
+
+
+def mask_mtime(mask_path: Optional[str]) -> Optional[float]:
+    """mtime súboru masky (None = nie je/neexistuje) – súčasť kľúča cache."""
+    if not mask_path:
+        return None
+    try:
+        return os.stat(mask_path).st_mtime
+    except OSError:
+        return None
+
+
+# -------------------- LRU cache --------------------
+
+_MASK_CACHE: "OrderedDict[str, Any]" = OrderedDict()
+_MASK_CACHE_MAX = 512
+_MASK_LOCK = threading.Lock()
+
+
+def cached_mask(key: str, build: Callable[[], Optional[np.ndarray]]) -> Optional[np.ndarray]:
+    """Všeobecný vstup do cache: ak kľúč nepoznáme, maska sa postaví cez build() a zamkne."""
+    with _MASK_LOCK:
+        if key in _MASK_CACHE:
+            _MASK_CACHE.move_to_end(key)
+            return _MASK_CACHE[key]
+    val = _readonly(build())
+    with _MASK_LOCK:
+        _MASK_CACHE[key] = val
+        _MASK_CACHE.move_to_end(key)
+        while len(_MASK_CACHE) > _MASK_CACHE_MAX:
+            _MASK_CACHE.popitem(last=False)
+    return val
+
+
+def mask_key(*parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+def load_mask_file(mask_path: Optional[str]) -> Optional[np.ndarray]:
+    """Binárna maska zo súboru (255=analyzuj); z disku sa číta len pri zmene cesty/mtime."""
+    mtime = mask_mtime(mask_path)
+    if mtime is None:
+        return None
+
+    def build():
+        m = cv.imread(mask_path, cv.IMREAD_GRAYSCALE)
+        if m is None:
+            return None
+        _, m = cv.threshold(m, 1, 255, cv.THRESH_BINARY)
+        return m
+
+    return cached_mask(mask_key("file", mask_path, mtime), build)
+
+
+def roi_mask(roi_xywh: Sequence[int], roi_shape: Tuple[int, int],
+             mask_rects: Optional[List[List[int]]] = None, mask_path: Optional[str] = None,
+             ref_shape: Optional[Tuple[int, int]] = None, default_full: bool = False) -> Optional[np.ndarray]:
+    """
+    ROI-lokálna maska (255=analyzuj, 0=ignoruj), zdieľaná a read-only.
+      - mask_rects (ignorované oblasti v ref súradniciach) majú prednosť,
+      - inak mask_path (celoobrázková maska; použije sa len ak sedí na ref_shape),
+      - inak None, alebo plná 255 maska pri default_full=True.
+    """
+    x, y, w, h = [int(v) for v in roi_xywh]
+    mask_rects = [[int(v) for v in r] for r in (mask_rects or [])]
+    mtime = mask_mtime(mask_path) if (mask_path and not mask_rects) else None
+    key = mask_key("roi", (x, y, w, h), tuple(roi_shape[:2]), mask_rects,
+                   None if mask_rects else mask_path, mtime,
+                   None if ref_shape is None else tuple(ref_shape[:2]), bool(default_full))
+
+    def build():
+        if mask_rects:
+            return rects_roi_mask(x, y, w, h, mask_rects, roi_shape)
+        full = load_mask_file(mask_path) if mask_path else None
+        if full is not None and ref_shape is not None and full.shape[:2] == tuple(ref_shape[:2]):
+            x1, y1, x2, y2 = clip_roi((x, y, w, h), full.shape)
+            if x2 > x1 and y2 > y1:
+                return full[y1:y2, x1:x2].copy()
+            return np.zeros((0, 0), np.uint8)
+        if default_full:
+            return np.full(roi_shape[:2], 255, np.uint8)
+        return None
+
+    return cached_mask(key, build)
+
+
+def clear_mask_cache() -> None:
+    with _MASK_LOCK:
+        _MASK_CACHE.clear()
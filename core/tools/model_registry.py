@@ -0,0 +1,191 @@
+# core/tools/model_registry.py
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# ELI5: Jedno miesto pre celý proces, kde žijú načítané modely (ONNX session).
+#   - pamäťový rozpočet (budget_mb) + LRU: keď sa nezmestí nový, vyhodí sa najdlhšie nepoužitý,
+#   - refcount: modely aktívnej pipeline sú "pripnuté" a nevyhodia sa (acquire/release),
+#   - preload: modely ďalšieho receptu sa načítajú na pozadí hneď, ako poznáme ID/kód receptu,
+#     takže prvý cyklus po prepnutí už neplatí stavbu session.
+# Veľkosť modelu je odhad: veľkosť súboru * mem_factor (váhy + arény ORT); presné RSS na session nevieme.
+
+
+class _Entry:
+    __slots__ = ("model", "size", "refs")
+
+    def __init__(self, model: Any, size: int):
+        self.model = model
+        self.size = int(size)
+        self.refs = 0
+
+
+def model_file_size(path: Optional[str]) -> int:
+    """Bajty modelu na disku (aj s externými dátami vedľa .onnx, ak sú)."""
+    if not path:
+        return 0
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    data = path + ".data"
+    if os.path.exists(data):
+        size += os.path.getsize(data)
+    return size
+
+
+class ModelRegistry:
+    def __init__(self, budget_mb: float = 2048.0, mem_factor: float = 3.0):
+        self.budget_mb = float(budget_mb)
+        self.mem_factor = float(mem_factor)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    # -------------------- konfigurácia --------------------
+
+    def configure(self, budget_mb: Optional[float] = None, mem_factor: Optional[float] = None) -> None:
+        if budget_mb is not None:
+            self.budget_mb = float(budget_mb)
+        if mem_factor is not None:
+            self.mem_factor = float(mem_factor)
+        with self._lock:
+            self._evict_locked()
+
+    # -------------------- načítanie / LRU --------------------
+
+    def get(self, key: str, factory: Callable[[], Any], path: Optional[str] = None) -> Any:
+        """
+        Model pre kľúč; ak nie je načítaný, postaví ho factory() (mimo zámku, ostatné modely idú ďalej).
+        Súbežné žiadosti o ten istý kľúč (napr. RUN + preload) čakajú na jednu stavbu.
+        """
+        while True:
+            with self._lock:
+                e = self._entries.get(key)
+                if e is not None:
+                    self._entries.move_to_end(key)
+                    return e.model
+                ev = self._loading.get(key)
+                if ev is None:
+                    ev = threading.Event()
+                    self._loading[key] = ev
+                    break
+            ev.wait()  # niekto iný ho práve načítava; po dokončení skúsime znova (pri chybe postavíme sami)
+
+        try:
+            model = factory()
+        except Exception:
+            with self._lock:
+                self._loading.pop(key, None)
+            ev.set()
+            raise
+        with self._lock:
+            self._entries[key] = _Entry(model, model_file_size(path) * self.mem_factor)
+            self._loading.pop(key, None)
+            self.loads += 1
+            self._evict_locked(keep=key)
+        ev.set()
+        return model
+
+    def _used(self) -> int:
+        return sum(e.size for e in self._entries.values())
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        """
+        LRU: vyhadzuj najstaršie nepripnuté, kým sme nad rozpočtom (pripnuté rozpočet môžu prekročiť).
+        keep = práve načítaný model – nevyhodí sa hneď, aj keby bol sám väčší než rozpočet.
+        """
+        budget = self.budget_mb * 1024 * 1024
+        if budget <= 0:
+            return
+        used = self._used()
+        for key in list(self._entries.keys()):
+            if used <= budget:
+                break
+            e = self._entries[key]
+            if e.refs > 0 or key == keep:
+                continue
+            used -= e.size
+            del self._entries[key]
+            self.evictions += 1
+
+    # -------------------- refcount (modely aktívnej pipeline) --------------------
+
+    def acquire(self, key: str, factory: Callable[[], Any], path: Optional[str] = None) -> Any:
+        model = self.get(key, factory, path)
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:  # medzičasom ho vyhodil iný load – vráť ho späť, teraz už pripnutý
+                e = self._entries[key] = _Entry(model, model_file_size(path) * self.mem_factor)
+            e.refs += 1
+        return model
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None and e.refs > 0:
+                e.refs -= 1
+            self._evict_locked()
+
+    # -------------------- preload na pozadí --------------------
+
+    def preload(self, jobs: List[Tuple[str, Callable[[], Any], Optional[str]]]) -> Optional[threading.Thread]:
+        """
+        jobs = [(key, factory, path)]: načítaj na pozadí (daemon vlákno), čo ešte nie je v registri.
+        Chyba načítania sa ignoruje – RUN ju aj tak ohlási pri prvom použití.
+        """
+        with self._lock:
+            todo = [j for j in jobs if j[0] not in self._entries and j[0] not in self._loading]
+        if not todo:
+            return None
+
+        def work():
+            for key, factory, path in todo:
+                try:
+                    self.get(key, factory, path)
+                except Exception:
+                    pass
+
+        th = threading.Thread(target=work, name="qc-model-preload", daemon=True)
+        th.start()
+        return th
+
+    # -------------------- diagnostika --------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._entries),
+                "used_mb": self._used() / (1024 * 1024),
+                "budget_mb": self.budget_mb,
+                "pinned": sum(1 for e in self._entries.values() if e.refs > 0),
+                "loading": len(self._loading),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def clear(self) -> None:
+        """Zahodí nepripnuté modely (napr. pri zmene engine nastavení)."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.refs == 0]:
+                del self._entries[key]
+
+
+_REGISTRY = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    return _REGISTRY
+
+
+def configure_registry(opts: Optional[Dict[str, Any]]) -> None:
+    """Nastavenia zo settings.json ("model_registry": {"budget_mb": ..., "mem_factor": ...})."""
+    opts = opts or {}
+    _REGISTRY.configure(opts.get("budget_mb"), opts.get("mem_factor"))
@@ -0,0 +1,298 @@
+# core/tools/preproc_plan.py
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import cv2 as cv
+
+
+def _odd(k: int) -> int:
+    return k if k % 2 == 1 else k + 1
+
+
+# -------------------- kompilácia jednotlivých op --------------------
+# Každý builder dostane step (dict) a vráti fn(img)->tmp (alebo None = krok nič nemení).
+# Všetko, čo nezávisí od obrazu (kernely, CLAHE, Gabor banka), sa postaví TU – raz.
+
+def _b_median(st):
+    k = max(1, _odd(int(st.get("k", 3))))
+    return lambda img: cv.medianBlur(img, k)
+
+def _b_gaussian(st):
+    k = max(1, _odd(int(st.get("k", 3))))
+    return lambda img: cv.GaussianBlur(img, (k, k), 0)
+
+def _b_bilateral(st):
+    d = max(1, int(st.get("d", 5))); sc = float(st.get("sigmaColor", 75.0)); ss = float(st.get("sigmaSpace", 75.0))
+    return lambda img: cv.bilateralFilter(img, d, sc, ss)
+
+def _b_clahe(st):
+    clip = max(0.1, float(st.get("clip", 2.0))); tile = max(1, int(st.get("tile", 8)))
+    # CLAHE objekt drží interné buffre -> jeden na vlákno (paralelný režim pipeline)
+    local = threading.local()
+    def fn(img):
+        clahe = getattr(local, "clahe", None)
+        if clahe is None:
+            clahe = local.clahe = cv.createCLAHE(clipLimit=clip, tileGridSize=(tile, tile))
+        return clahe.apply(img)
+    return fn
+
+def _b_morph(op_code):
+    def build(st, default_k):
+        k = _odd(int(st.get("k", default_k)))
+        se = cv.getStructuringElement(cv.MORPH_ELLIPSE, (k, k))
+        return lambda img: cv.morphologyEx(img, op_code, se)
+    return build
+
+def _b_unsharp(st):
+    amt = float(st.get("amount", 1.0)); rad = max(1, _odd(int(st.get("radius", 3))))
+    def fn(img):
+        blur = cv.GaussianBlur(img, (rad, rad), 0)
+        return cv.addWeighted(img, 1.0 + amt, blur, -amt, 0)
+    return fn
+
+def _b_normalize(st):
+    a = float(st.get("alpha", 0.0)); b = float(st.get("beta", 255.0))
+    return lambda img: cv.normalize(img, None, alpha=a, beta=b, norm_type=cv.NORM_MINMAX)
+
+def _b_morphgrad(st):
+    k = _odd(int(st.get("k", 3)))
+    se = cv.getStructuringElement(cv.MORPH_ELLIPSE, (k, k))
+    return lambda img: cv.subtract(cv.dilate(img, se), cv.erode(img, se))
+
+def _b_log(st):
+    k = _odd(int(st.get("k", 5)))
+    def fn(img):
+        blur = cv.GaussianBlur(img, (k, k), 0)
+        return cv.convertScaleAbs(cv.Laplacian(blur, cv.CV_16S, ksize=3))
+    return fn
+
+def _b_homo(st, with_gain=True):
+    sigma = max(0.1, float(st.get("sigma", 30.0)))
+    gain = float(st.get("gain", 1.0)) if with_gain else 1.0
+    def fn(img):
+        f = img.astype(np.float32) + 1.0
+        L = cv.GaussianBlur(f, (0, 0), sigmaX=sigma)
+        res = np.log(f) - np.log(L)
+        if with_gain:
+            res = res * gain
+        return cv.normalize(res, None, 0, 255, cv.NORM_MINMAX).astype(np.uint8)
+    return fn
+
+def _b_guided(st):
+    r = int(st.get("r", 5)); eps = float(st.get("eps", 1e-3))
+    ximg = getattr(cv, "ximgproc", None)
+    if ximg is not None and hasattr(ximg, "guidedFilter"):
+        def fn(img):
+            try:
+                return np.clip(ximg.guidedFilter(img, img, r, eps), 0, 255).astype(np.uint8)
+            except Exception:
+                return cv.bilateralFilter(img, d=max(1, r * 2 + 1), sigmaColor=40, sigmaSpace=40)
+        return fn
+    # vyžaduje cv.ximgproc (ak chýba, fallback)
+    return lambda img: cv.bilateralFilter(img, d=max(1, r * 2 + 1), sigmaColor=40, sigmaSpace=40)
+
+def _b_nlm(st):
+    h = float(st.get("h", 10.0))
+    return lambda img: cv.fastNlMeansDenoising(img, None, h=h, templateWindowSize=7, searchWindowSize=21)
+
+def _b_rollball(st):
+    r = _odd(int(st.get("r", 25)))
+    se = cv.getStructuringElement(cv.MORPH_ELLIPSE, (r, r))
+    return lambda img: cv.subtract(img, cv.morphologyEx(img, cv.MORPH_OPEN, se))
+
+def _b_sauvola(st):
+    win = _odd(int(st.get("win", 25))); k = float(st.get("k", 0.2)); R = 128.0
+    def fn(img):
+        f = img.astype(np.float32)
+        mean = cv.boxFilter(f, ddepth=-1, ksize=(win, win), normalize=True)
+        mean2 = cv.boxFilter(f * f, ddepth=-1, ksize=(win, win), normalize=True)
+        std = np.sqrt(np.clip(mean2 - mean * mean, 0, None))
+        th = mean * (1.0 + k * ((std / R) - 1.0))
+        return (f > th).astype(np.uint8) * 255
+    return fn
+
+def _b_zscore(st):
+    def fn(img):
+        f = img.astype(np.float32)
+        mu = float(f.mean()); sd = float(f.std()) if f.std() > 1e-6 else 1.0
+        return cv.normalize((f - mu) / sd, None, 0, 255, cv.NORM_MINMAX).astype(np.uint8)
+    return fn
+
+def _b_clip(st):
+    lo = max(0.0, min(100.0, float(st.get("lo", 5.0))))
+    hi = max(lo + 0.1, min(100.0, float(st.get("hi", 95.0))))
+    def fn(img):
+        p1, p2 = np.percentile(img, [lo, hi])
+        if p2 <= p1: p2 = p1 + 1.0
+        f = np.clip(img.astype(np.float32), p1, p2)
+        return ((f - p1) * (255.0 / (p2 - p1))).astype(np.uint8)
+    return fn
+
+def _b_equalize(st):
+    return lambda img: cv.equalizeHist(img)
+
+def _b_gabor(st):
+    # angles: zoznam stupňov; freq: cykly/pixel -> lambda = 1/freq
+    angles = st.get("angles", [0, 45, 90, 135])
+    freq = float(st.get("freq", 0.15))
+    if freq <= 0: freq = 0.15
+    lmbd = 1.0 / max(1e-6, freq)
+    ksize = _odd(int(st.get("ksize", 21)))
+    sigma = float(st.get("sigma", ksize / 6.0))
+    gamma = float(st.get("gamma", 0.5))
+    bank = []
+    for a in angles:
+        try:
+            bank.append(cv.getGaborKernel((ksize, ksize), sigma, np.deg2rad(float(a)), lmbd, gamma, 0, ktype=cv.CV_32F))
+        except Exception:
+            continue
+    def fn(img):
+        acc = None
+        for kern in bank:
+            try:
+                resp = cv.filter2D(img, cv.CV_32F, kern)
+                acc = resp if acc is None else np.maximum(acc, resp)
+            except Exception:
+                continue
+        if acc is None:
+            return None
+        return cv.normalize(acc, None, 0, 255, cv.NORM_MINMAX).astype(np.uint8)
+    return fn
+
+
+_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Callable[[np.ndarray], Optional[np.ndarray]]]] = {
+    "median": _b_median,
+    "gaussian": _b_gaussian,
+    "bilateral": _b_bilateral,
+    "clahe": _b_clahe,
+    "tophat": lambda st: _b_morph(cv.MORPH_TOPHAT)(st, 15),
+    "blackhat": lambda st: _b_morph(cv.MORPH_BLACKHAT)(st, 15),
+    "unsharp": _b_unsharp,
+    "normalize": _b_normalize,
+    "morphgrad": _b_morphgrad,
+    "log": _b_log,                                   # Laplacian of Gaussian
+    "homo": _b_homo,                                 # jednoduchý „homomorphic/SSR“
+    "retinex": lambda st: _b_homo(st, with_gain=False),  # SSR
+    "guided": _b_guided,
+    "nlm": _b_nlm,
+    "rollball": _b_rollball,                         # morfologické open = odhad pozadia
+    "sauvola": _b_sauvola,
+    "zscore": _b_zscore,
+    "clip": _b_clip,                                 # percentilový orez + rescale
+    "equalize": _b_equalize,
+    "gabor": _b_gabor,
+}
+
+
+# -------------------- plán --------------------
+
+class PreprocPlan:
+    """
+    ELI5: Skompilovaný preproc reťazec. Parametre sa prečítajú a kernely/CLAHE/Gabor banka
+    sa postavia raz; apply() už len púšťa pripravené kroky na ROI.
+    Neznámy op sa preskočí, chyba v kroku = krok sa preskočí (ako doteraz).
+    """
+
+    def __init__(self, chain: Optional[List[Dict[str, Any]]]):
+        self.steps: List[Tuple[str, Callable[[np.ndarray], Optional[np.ndarray]]]] = []
+        for st in (chain or []):
+            try:
+                op = str(st.get("op", "")).lower().strip()
+                builder = _BUILDERS.get(op)
+                if builder is None:
+                    continue  # neznámy op = preskoč
+                self.steps.append((op, builder(st)))
+            except Exception:
+                continue
+        self._stats: Dict[int, List[float]] = {}   # idx kroku -> [počet, súčet_ms]
+        self._stats_lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.steps)
+
+    def apply(self, roi_gray: np.ndarray, mask: Optional[np.ndarray] = None,
+              timings: Optional[List[Tuple[str, float]]] = None) -> np.ndarray:
+        """
+        Ak je 'mask' (255=analyzuj, 0=ignoruj), filter sa aplikuje len tam, inde ostanú pôvodné pixely.
+        timings: ak je zoznam, doplní sa (op, ms) pre každý krok (profilovanie).
+        """
+        if roi_gray is None or roi_gray.size == 0 or not self.steps:
+            return roi_gray
+
+        img = roi_gray.copy()
+        m = mask
+        if m is not None:
+            if m.ndim == 3:
+                m = cv.cvtColor(m, cv.COLOR_BGR2GRAY)
+            _, m = cv.threshold(m, 1, 255, cv.THRESH_BINARY)
+            m_sel = m[..., None] > 0
+
+        for i, (op, fn) in enumerate(self.steps):
+            t0 = time.perf_counter()
+            try:
+                tmp = fn(img)
+                if tmp is not None:
+                    if m is None:
+                        img = tmp
+                    else:
+                        # len kde m>0 nahradíme filtrovaným, inde necháme pôvodný
+                        img = np.where(m_sel, tmp if tmp.ndim == 3 else tmp[..., None],
+                                       img if img.ndim == 3 else img[..., None]).squeeze()
+            except Exception:
+                # robustnosť: ak sa niečo pokazí, ideme ďalej s pôvodným img
+                pass
+            ms = (time.perf_counter() - t0) * 1000.0
+            if timings is not None:
+                timings.append((op, ms))
+            with self._stats_lock:
+                s = self._stats.setdefault(i, [0, 0.0])
+                s[0] += 1; s[1] += ms
+        return img
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Kumulatívne časy po krokoch: [{op, count, total_ms, mean_ms}, ...]."""
+        out = []
+        with self._stats_lock:
+            for i, (op, _) in enumerate(self.steps):
+                n, tot = self._stats.get(i, [0, 0.0])
+                out.append({"op": op, "count": int(n), "total_ms": float(tot),
+                            "mean_ms": float(tot / n) if n else 0.0})
+        return out
+
+
+# -------------------- cache plánov (kľúč = parametre reťazca) --------------------
+
+_PLAN_CACHE: "OrderedDict[str, PreprocPlan]" = OrderedDict()
+_PLAN_CACHE_MAX = 256
+_PLAN_LOCK = threading.Lock()
+
+
+def chain_key(chain: Optional[List[Dict[str, Any]]]) -> str:
+    return json.dumps(chain or [], sort_keys=True, default=str)
+
+
+def compile_chain(chain: Optional[List[Dict[str, Any]]]) -> PreprocPlan:
+    """Vráti plán pre daný reťazec; nový sa postaví len keď sa zmenia parametre (napr. z Live tuning/Builder)."""
+    key = chain_key(chain)
+    with _PLAN_LOCK:
+        plan = _PLAN_CACHE.get(key)
+        if plan is not None:
+            _PLAN_CACHE.move_to_end(key)
+            return plan
+    plan = PreprocPlan(chain)
+    with _PLAN_LOCK:
+        plan = _PLAN_CACHE.setdefault(key, plan)
+        _PLAN_CACHE.move_to_end(key)
+        while len(_PLAN_CACHE) > _PLAN_CACHE_MAX:
+            _PLAN_CACHE.popitem(last=False)
+    return plan
+
+
+def plan_stats() -> Dict[str, List[Dict[str, Any]]]:
+    """Profil všetkých plánov v cache (kľúč = JSON reťazca)."""
+    with _PLAN_LOCK:
+        items = list(_PLAN_CACHE.items())
+    return {k: p.stats() for k, p in items}
@@ -3,6 +3,7 @@ import cv2 as cv
 import numpy as np
 from typing import Dict, Tuple, Optional, List
 from .base_tool import BaseTool, ToolResult
+from ..frame_context import FrameContext
 
 def _warp_roi(img: np.ndarray, H: Optional[np.ndarray], roi: Tuple[int,int,int,int]) -> np.ndarray:
     x, y, w, h = roi
@@ -26,30 +27,46 @@ def _mask_from_rects_ignore(full_shape: Tuple[int,int], rects: List[List[int]])
 class PresenceAbsenceTool(BaseTool):
     USES_MASKS = True
 
-    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray]) -> ToolResult:
+    def _ref_side(self, img_ref: np.ndarray, ctx: Optional[FrameContext] = None) -> dict:
+        """Šablóna (params['template'] alebo ROI referencie) po preproc + maska – z cache."""
+        params = self.params or {}
+        chain = params.get("preproc", []) or []
+        mask_rects = params.get("mask_rects", []) or []
+        key = self._params_key(self.roi_xywh, chain, mask_rects, params.get("template", None))
+
+        def build():
+            c = ctx if ctx is not None else FrameContext(img_ref, img_ref)
+            x, y, w, h = [int(v) for v in self.roi_xywh]
+            roi_ref = c.crop_ref((x, y, w, h), kind="gray")
+            # šablóna – z params alebo z ROI referencie
+            tpl = params.get("template", None)
+            tpl = roi_ref.copy() if tpl is None else np.array(tpl, copy=True)
+            if tpl.ndim == 3:
+                tpl = cv.cvtColor(tpl, cv.COLOR_BGR2GRAY)
+            # masky (ignorovať časti) – ROI cur aj ref majú po orezaní rovnaký tvar
+            full_mask = self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape=roi_ref.shape) if mask_rects else None
+            if chain:
+                tpl = self._apply_preproc_chain(tpl, chain, mask=full_mask)
+            return {"tpl": self._readonly(tpl), "mask": self._readonly(full_mask)}
+
+        return self._ref_cached(img_ref, key, build)
+
+    def prepare(self, img_ref: np.ndarray) -> None:
+        self._ref_side(img_ref)
+
+    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray],
+            ctx: Optional[FrameContext] = None) -> ToolResult:
         x, y, w, h = [int(v) for v in self.roi_xywh]
 
-        # zarovnanie jednotne cez BaseTool helper
-        cur_aligned = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
+        # zarovnanie + gray raz za cyklus (zdieľaný FrameContext)
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
 
-
-        roi_cur = cur_aligned[y:y+h, x:x+w]
-        if roi_cur.ndim == 3:
-            roi_cur = cv.cvtColor(roi_cur, cv.COLOR_BGR2GRAY)
-        # šablóna – z params alebo z ROI referencie
-        tpl = self.params.get("template", None)
-        if tpl is None:
-            roi_ref = img_ref[y:y+h, x:x+w]
-            if roi_ref.ndim == 3:
-                roi_ref = cv.cvtColor(roi_ref, cv.COLOR_BGR2GRAY)
-            tpl = roi_ref.copy()
-        if tpl.ndim == 3:
-            tpl = cv.cvtColor(tpl, cv.COLOR_BGR2GRAY)
-
-        # masky (ignorovať časti)
+        roi_cur = ctx.crop((x, y, w, h), kind="gray")
+        # šablóna + maska z referencie sa počas RUN nemenia -> cache
+        ref_side = self._ref_side(img_ref, ctx)
+        tpl = ref_side["tpl"]
+        full_mask = ref_side["mask"]
         mask_rects = (self.params or {}).get("mask_rects", []) or []
-        full_mask = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=roi_cur.shape) if mask_rects else None
-
 
         # predspracovanie (rovnako na tpl aj cur), rešpektuj masku
         pre_desc = "—"
@@ -57,7 +74,6 @@ class PresenceAbsenceTool(BaseTool):
         chain = (self.params or {}).get("preproc", []) or []
         if chain:
             roi_cur = self._apply_preproc_chain(roi_cur, chain, mask=full_mask)
-            tpl     = self._apply_preproc_chain(tpl,     chain, mask=full_mask)
             pre_desc = self._preproc_desc(chain)
             pre_preview = cv.cvtColor(roi_cur, cv.COLOR_GRAY2BGR)
 
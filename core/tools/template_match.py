@@ -55,6 +55,75 @@ def _apply_preproc_chain(gray_roi: np.ndarray, chain: list, mask: np.ndarray=Non
             continue
     return img
 
+def _score_peaks(res: np.ndarray, min_score: float, max_candidates: int):
+    """
+    Lokálne maximá NCC mapy nad min_score (dilate-compare 3x3) namiesto všetkých pixelov nad prahom.
+    Vráti (xs, ys, scores) najviac max_candidates najlepších peakov.
+    """
+    if res.size == 0:
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32)
+    peaks = (res >= cv.dilate(res, np.ones((3, 3), np.uint8))) & (res >= min_score)
+    ys, xs = np.nonzero(peaks)
+    sc = res[ys, xs]
+    if len(sc) > max_candidates:
+        top = np.argpartition(-sc, max_candidates - 1)[:max_candidates]
+        xs, ys, sc = xs[top], ys[top], sc[top]
+    return xs, ys, sc
+
+
+def _nms_points(xs: np.ndarray, ys: np.ndarray, scores: np.ndarray, min_dist: int, max_matches: int):
+    """
+    Greedy NMS (najlepší prvý, ďalší len ak je >= min_dist od ponechaných), vektorovo:
+    matica vzdialeností kandidátov raz, slučka len cez ponechané (max max_matches krokov).
+    """
+    if len(scores) == 0 or max_matches <= 0:
+        return []
+    order = np.argsort(-scores, kind="stable")
+    xs, ys, scores = xs[order].astype(np.int64), ys[order].astype(np.int64), scores[order]
+    close = (xs[:, None] - xs[None, :]) ** 2 + (ys[:, None] - ys[None, :]) ** 2 < int(min_dist) ** 2
+    alive = np.ones(len(scores), dtype=bool)
+    kept = []
+    i = 0
+    while len(kept) < max_matches:
+        rest = np.flatnonzero(alive[i:])
+        if rest.size == 0:
+            break
+        i += int(rest[0])
+        kept.append((int(xs[i]), int(ys[i]), float(scores[i])))
+        alive &= ~close[i]
+        i += 1
+    return kept
+
+
+def _coarse_to_fine(img: np.ndarray, tpl: np.ndarray, levels: int, min_score: float,
+                    max_candidates: int, coarse_margin: float = 0.1):
+    """
+    Pyramída: NCC na zmenšenom obraze, peaky (s rezervou coarse_margin pod min_score) sa
+    doladia na plnom rozlíšení v malom okne. Vráti (xs, ys, scores, best) – best = najlepšie skóre vôbec.
+    """
+    small_img, small_tpl = img, tpl
+    for _ in range(levels):
+        small_img, small_tpl = cv.pyrDown(small_img), cv.pyrDown(small_tpl)
+    res_c = cv.matchTemplate(small_img, small_tpl, cv.TM_CCOEFF_NORMED)
+    cxs, cys, _ = _score_peaks(res_c, min_score - coarse_margin, max_candidates)
+
+    f = 1 << levels
+    r = f + 1
+    hh, ww = tpl.shape[:2]
+    H, W = img.shape[:2]
+    xs, ys, sc = [], [], []
+    for cx, cy in zip(cxs.tolist(), cys.tolist()):
+        x1, y1 = max(0, cx * f - r), max(0, cy * f - r)
+        x2, y2 = min(W, cx * f + r + ww), min(H, cy * f + r + hh)
+        if x2 - x1 < ww or y2 - y1 < hh:
+            continue
+        _, mx, _, loc = cv.minMaxLoc(cv.matchTemplate(img[y1:y2, x1:x2], tpl, cv.TM_CCOEFF_NORMED))
+        xs.append(x1 + loc[0]); ys.append(y1 + loc[1]); sc.append(mx)
+    xs, ys, sc = np.array(xs, np.int32), np.array(ys, np.int32), np.array(sc, np.float32)
+    best = float(sc.max()) if sc.size else (float(res_c.max()) if res_c.size else 0.0)
+    keep = sc >= min_score
+    return xs[keep], ys[keep], sc[keep], best
+
 class TemplateMatchTool(BaseTool):
     """
     Template Match (NCC):
@@ -64,6 +133,8 @@ class TemplateMatchTool(BaseTool):
         - min_score:   0..1 (default 0.7)
         - max_matches: max počet nálezov (default 5)
         - min_distance: NMS vzdialenosť (px) medzi nálezmi (default 12)
+        - max_candidates: max počet peakov do NMS (default 1024)
+        - pyramid_levels: 0 = plné rozlíšenie; >0 = hrubé hľadanie na pyramíde + doladenie (default 0)
         - mode: "best" | "count"  (meraná hodnota = najlepšie skóre alebo počet nálezov)
         - preproc: []  (reťazec operácií)
         - mask_rects: []
@@ -72,38 +143,57 @@ class TemplateMatchTool(BaseTool):
       - overlay:  ROI s nálezmi + skóre
       - details:  roi_xywh, mask_rects, preproc_desc, preproc_preview, ...
     """
-    def run(self, img_ref, img_cur, fixture_transform=None):
+    def _clamped_roi(self, ref_shape):
+        """Bezpečné orezy v referenčných rozmeroch."""
         x, y, w, h = [int(v) for v in self.roi_xywh]
-
-        # dorovnaj current na referenciu (fixture H alebo resize)
-        img_cur = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
-
-        # bezpečné orezy v referenčných rozmeroch
-        Hc, Wc = img_ref.shape[:2]
+        Hc, Wc = ref_shape[:2]
         x = max(0, min(x, Wc - 1)); y = max(0, min(y, Hc - 1))
         w = max(1, min(w, Wc - x));  h = max(1, min(h, Hc - y))
+        return x, y, w, h
+
+    def _ref_side(self, img_ref):
+        """Šablóna (ROI z referencie po preproc) + maska – počíta sa raz, kým sa nezmenia params/referencia."""
+        p = self.params or {}
+        chain = p.get("preproc", []) or []
+        mask_rects = p.get("mask_rects", []) or []
+        key = self._params_key(self.roi_xywh, chain, mask_rects)
+
+        def build():
+            x, y, w, h = self._clamped_roi(img_ref.shape)
+            roi_ref = img_ref[y:y+h, x:x+w]
+            m = self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape=roi_ref.shape) if mask_rects else None
+            # template = celá ROI z referencie (po preproc)
+            tpl = self._apply_preproc_chain(roi_ref, chain, mask=m).copy()
+            return {"tpl": self._readonly(tpl), "mask": self._readonly(m)}
+
+        return self._ref_cached(img_ref, key, build)
+
+    def prepare(self, img_ref):
+        self._ref_side(img_ref)
+
+    def run(self, img_ref, img_cur, fixture_transform=None, ctx=None):
+        # dorovnaj current na referenciu (fixture H alebo resize) – raz za cyklus cez FrameContext
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
+        x, y, w, h = self._clamped_roi(img_ref.shape)
 
 
         p = dict(self.params or {})
         min_score   = float(p.get("min_score", 0.70))
         max_matches = int(p.get("max_matches", 5))
         min_dist    = int(p.get("min_distance", 12))
+        max_cand    = max(1, int(p.get("max_candidates", 1024)))
+        levels      = max(0, int(p.get("pyramid_levels", 0)))
         mode        = str(p.get("mode", "best")).lower()
         chain       = p.get("preproc", []) or []
         mask_rects  = p.get("mask_rects", []) or []
 
-        # ROI
-        roi_ref = img_ref[y:y+h, x:x+w]
-        roi_cur = img_cur[y:y+h, x:x+w]
-
-        # maska prienikom
-        m = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=roi_ref.shape) if mask_rects else None
-        roi_ref_p = self._apply_preproc_chain(roi_ref, chain, mask=m)
+        # ROI + maska prienikom; šablóna z referencie je predspracovaná v cache
+        roi_cur = ctx.crop((x, y, w, h))
+        ref_side = self._ref_side(img_ref)
+        tpl = ref_side["tpl"]
+        m = ref_side["mask"]
         roi_cur_p = self._apply_preproc_chain(roi_cur, chain, mask=m)
 
-
-        # template = celá ROI z referencie (po preproc)
-        tpl = roi_ref_p.copy()
         hh, ww = tpl.shape[:2]
         if hh < 3 or ww < 3:
             overlay = cv.cvtColor(roi_cur_p, cv.COLOR_GRAY2BGR)
@@ -125,27 +215,15 @@ class TemplateMatchTool(BaseTool):
 
 
 
-        # NCC mapa
-        res = cv.matchTemplate(roi_cur_p, tpl, cv.TM_CCOEFF_NORMED)
-
-        # maxima nad min_score + NMS podľa eukl. vzdialenosti
-        loc = np.where(res >= min_score)
-        pts = list(zip(loc[1].tolist(), loc[0].tolist()))  # (x,y) v ROI
-        scores = [float(res[pt[1], pt[0]]) for pt in pts]
-
-        order = np.argsort(scores)[::-1].tolist()
-        kept = []
-        for idx in order:
-            px, py = pts[idx]; sc = scores[idx]
-            # NMS
-            ok_keep = True
-            for (kx, ky, ks) in kept:
-                if (px - kx)**2 + (py - ky)**2 < (min_dist**2):
-                    ok_keep = False; break
-            if ok_keep:
-                kept.append((px, py, sc))
-            if len(kept) >= max_matches:
-                break
+        # NCC mapa -> lokálne maximá nad min_score -> NMS (min_distance, max_matches)
+        small = min(roi_cur_p.shape[0], roi_cur_p.shape[1], hh, ww) >> levels
+        if levels > 0 and small >= 8 and roi_cur_p.shape[:2] != tpl.shape[:2]:
+            xs, ys, scores, best_any = _coarse_to_fine(roi_cur_p, tpl, levels, min_score, max_cand)
+        else:
+            res = cv.matchTemplate(roi_cur_p, tpl, cv.TM_CCOEFF_NORMED)
+            xs, ys, scores = _score_peaks(res, min_score, max_cand)
+            best_any = float(res.max()) if res.size else 0.0
+        kept = _nms_points(xs, ys, scores, min_dist, max_matches)
 
         # overlay do ROI
         overlay = cv.cvtColor(roi_cur_p, cv.COLOR_GRAY2BGR)
@@ -155,7 +233,7 @@ class TemplateMatchTool(BaseTool):
                        cv.FONT_HERSHEY_SIMPLEX, 0.4, (0, 200, 0), 1, cv.LINE_AA)
 
         # metrika
-        best = max([k[2] for k in kept], default=float(res.max()) if res.size else 0.0)
+        best = max([k[2] for k in kept], default=best_any)
         count = len(kept)
         measured = float(count) if (mode == "count") else float(best)
 
@@ -174,6 +252,7 @@ class TemplateMatchTool(BaseTool):
             "min_score": min_score,
             "max_matches": max_matches,
             "min_distance": min_dist,
+            "pyramid_levels": levels,
             "count": count,
             "best_score": best
         }
@@ -1,14 +1,99 @@
 # core/tools/yolo_roi.py
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2 as cv
 from typing import Dict, Tuple, Optional, List, Any
 from .base_tool import BaseTool, ToolResult
+from .model_registry import get_registry
+from ..frame_context import FrameContext
 
 try:
     import onnxruntime as ort
 except Exception:
     ort = None  # umožní import projektu bez ORT (na dev PC doplníš pip)
 
+# -------------------- ENGINE (ONNX Runtime session) --------------------
+# Globálne defaulty (Nastavenia -> configure_engine), recept "yolo_engine" a tool params["engine"] ich prepíšu.
+#   providers: "auto" (dostupné z TRT/CUDA/CPU) | "cpu" | zoznam providerov
+#   intra_op_threads / inter_op_threads: 0 = nechaj na ORT
+#   execution_mode: "sequential" | "parallel"
+#   graph_opt: "disable" | "basic" | "extended" | "all"
+#   optimized_model_path: priečinok na optimalizované grafy ("" = neukladať); každý model má vlastný súbor
+#                         <stem .onnx>.<hash zdroja/providerov/graph_opt>.opt.onnx – ak je novší než .onnx,
+#                         načíta sa priamo (iný model ani iný execution provider ho nikdy nedostane)
+#   warmup: počet dummy inferencií pri stavbe pipeline (prvý cyklus nie je pomalší)
+#   io_binding: predalokovaný vstupný tenzor cez IO binding (žiadna alokácia vstupu každý cyklus)
+#   layout: "auto" | "v5" (1,N,5+C) | "v8" (1,4+C,N) – tvar výstupu modelu
+ENGINE_DEFAULTS: Dict[str, Any] = {
+    "providers": "auto",
+    "intra_op_threads": 0,
+    "inter_op_threads": 0,
+    "execution_mode": "sequential",
+    "graph_opt": "all",
+    "optimized_model_path": "",
+    "warmup": 1,
+    "io_binding": True,
+    "layout": "auto",
+}
+
+def configure_engine(opts: Optional[Dict[str, Any]]) -> None:
+    """Prepíše globálne defaulty engine (napr. zo settings.json pri štarte appky)."""
+    for k, v in (opts or {}).items():
+        if k in ENGINE_DEFAULTS:
+            ENGINE_DEFAULTS[k] = v
+
+def engine_options(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    eng = dict(ENGINE_DEFAULTS)
+    eng.update({k: v for k, v in (overrides or {}).items() if k in ENGINE_DEFAULTS})
+    return eng
+
+def _resolve_providers(spec) -> List[str]:
+    if isinstance(spec, (list, tuple)) and spec:
+        return list(spec)
+    if str(spec).lower() == "cpu":
+        return ['CPUExecutionProvider']
+    # "auto": len tie, ktoré daný build ORT naozaj má (na CPU PC bez varovaní o TRT/CUDA)
+    wanted = ['TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider']
+    avail = set(ort.get_available_providers()) if ort is not None else set()
+    return [p for p in wanted if p in avail] or ['CPUExecutionProvider']
+
+def _session_options(eng: Dict[str, Any]):
+    so = ort.SessionOptions()
+    if int(eng.get("intra_op_threads") or 0) > 0:
+        so.intra_op_num_threads = int(eng["intra_op_threads"])
+    if int(eng.get("inter_op_threads") or 0) > 0:
+        so.inter_op_num_threads = int(eng["inter_op_threads"])
+    so.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if str(eng.get("execution_mode")).lower() == "parallel"
+                         else ort.ExecutionMode.ORT_SEQUENTIAL)
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    so.graph_optimization_level = levels.get(str(eng.get("graph_opt", "all")).lower(),
+                                             ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+    return so
+
+def _optimized_model_file(opt_dir: str, onnx_path: str, eng: Dict[str, Any], providers: List[str]) -> str:
+    """
+    Cesta k uloženému optimalizovanému grafu pre TENTO model a TIETO providery: graf uložený pre CUDA/TRT
+    nemusí ísť na CPU (a naopak) a dva modely nesmú zdieľať jeden súbor.
+    Staršie nastavenie s cestou k súboru (*.onnx) sa berie ako jeho priečinok.
+    """
+    d = opt_dir
+    if d.lower().endswith(".onnx"):
+        d = os.path.dirname(d) or "."
+    key = json.dumps({"src": os.path.abspath(onnx_path), "providers": list(providers),
+                      "graph_opt": str(eng.get("graph_opt", "all")).lower(),
+                      "ort": getattr(ort, "__version__", "")}, sort_keys=True)
+    stem = os.path.splitext(os.path.basename(onnx_path))[0]
+    return os.path.join(d, f"{stem}.{hashlib.sha1(key.encode()).hexdigest()[:12]}.opt.onnx")
+
 def _warp_roi(img: np.ndarray, H: Optional[np.ndarray], roi: Tuple[int,int,int,int]) -> np.ndarray:
     x, y, w, h = roi
     if H is not None:
@@ -35,13 +120,102 @@ def _letterbox(im, new_shape=(640, 640), stride=32):
     im = cv.copyMakeBorder(im, top, bottom, left, right, cv.BORDER_CONSTANT, value=(114,114,114))
     return im, r, (dw, dh)
 
-def _nms(boxes, scores, iou_th=0.45):
+def letterbox_into(im: np.ndarray, dst_chw: np.ndarray, canvas: np.ndarray):
+    """
+    Letterbox bez dočasných polí: resize ide priamo do výrezu perzistentného uint8 plátna (H,W,3),
+    okraje (114) sa doplnia len v pásoch a BGR->RGB + /255 + HWC->CHW sa zapíše rovno do dst_chw
+    (napr. riadok predalokovaného vstupu modelu). Výsledok je rovnaký ako _letterbox + astype/255/transpose.
+    Vracia (gain, (dw, dh)) na spätný prepočet boxov.
+    """
+    H, W = canvas.shape[:2]
+    shape = im.shape[:2]
+    r = min(H / shape[0], W / shape[1])
+    nw, nh = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = (W - nw) / 2, (H - nh) / 2
+    top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+
+    view = canvas[top:top + nh, left:left + nw]
+    if (shape[1], shape[0]) != (nw, nh):
+        cv.resize(im, (nw, nh), dst=view, interpolation=cv.INTER_LINEAR)
+    else:
+        view[...] = im
+    if top > 0: canvas[:top] = 114
+    if top + nh < H: canvas[top + nh:] = 114
+    if left > 0: canvas[top:top + nh, :left] = 114
+    if left + nw < W: canvas[top:top + nh, left + nw:] = 114
+
+    for c in range(3):  # RGB poradie = BGR kanály 2,1,0
+        np.divide(canvas[:, :, 2 - c], np.float32(255.0), out=dst_chw[c], dtype=np.float32, casting="same_kind")
+    return r, (dw, dh)
+
+def decode_predictions(preds: np.ndarray, conf_th: float = 0.0, layout: str = "auto"):
+    """
+    Surový výstup jedného obrázka -> (xyxy, cls_ids, cls_scores) len pre riadky nad conf_th.
+      "v5": (N, 5+C) [x,y,w,h,obj,cls...]  – najprv filter na objectness (skóre = obj*cls <= obj),
+            argmax tried sa počíta len pre preživších
+      "v8": (4+C, N) [x,y,w,h,cls...]      – bez objectness, skóre = max trieda
+      "auto": v8, ak je kanálov menej ako anchorov (tvar (4+C, N)), inak v5
+    """
+    preds = np.asarray(preds)
+    if layout == "auto":
+        layout = "v8" if preds.shape[0] < preds.shape[1] else "v5"
+    if layout == "v8":
+        p = preds.T  # (N, 4+C) – view, bez kópie
+        cls_probs = p[:, 4:]
+        cls_ids = np.argmax(cls_probs, axis=1)
+        cls_scores = cls_probs[np.arange(p.shape[0]), cls_ids]
+        keep = cls_scores >= conf_th
+        boxes_xywh, cls_ids, cls_scores = p[keep, :4], cls_ids[keep], cls_scores[keep]
+    else:
+        keep = preds[:, 4] >= conf_th
+        p = preds[keep]
+        cls_probs = p[:, 5:]
+        cls_ids = np.argmax(cls_probs, axis=1)
+        cls_scores = p[:, 4] * cls_probs[np.arange(p.shape[0]), cls_ids]
+        keep = cls_scores >= conf_th
+        boxes_xywh, cls_ids, cls_scores = p[keep, :4], cls_ids[keep], cls_scores[keep]
+
+    # xywh -> xyxy
+    xy = boxes_xywh[:, :2]
+    wh = boxes_xywh[:, 2:4]
+    xyxy = np.concatenate([xy - wh/2, xy + wh/2], axis=1)
+    return xyxy, cls_ids, cls_scores
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, cls_ids: np.ndarray, iou_th: float = 0.45,
+                agnostic: bool = False, max_candidates: int = 30000, max_det: int = 300) -> np.ndarray:
+    """
+    NMS pre všetky triedy naraz: boxy sa posunú do >= 0 (okrajové boxy po undo letterboxu môžu byť záporné)
+    a potom o class_id * (rozsah súradníc + 1), takže sa rôzne triedy nikdy neprekrývajú, a pobeží jedno NMS. Pred NMS top-k (max_candidates), po ňom max_det.
+    Vracia indexy ponechaných (zoradené podľa skóre).
+    """
+    if boxes.shape[0] == 0:
+        return np.zeros((0,), dtype=np.int64)
+    idx = np.arange(boxes.shape[0])
+    if boxes.shape[0] > max_candidates:
+        idx = np.argpartition(-scores, max_candidates - 1)[:max_candidates]
+    b = boxes[idx].astype(np.float32)
+    if not agnostic:
+        lo = float(b.min())  # posun nemení IoU
+        b = (b - lo) + (cls_ids[idx].astype(np.float32) * (float(b.max()) - lo + 1.0))[:, None]
+    keep = _nms_fast(b, scores[idx], iou_th, max_det)
+    return idx[np.asarray(keep[:max_det], dtype=np.int64)]
+
+def _nms_fast(boxes, scores, iou_th=0.45, max_keep=None):
+    """Greedy NMS cez OpenCV (C++ slučka, rovnaký výsledok ako _nms); bez cv.dnn -> _nms."""
+    try:
+        xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1).astype(np.float64)
+        keep = cv.dnn.NMSBoxes(xywh.tolist(), scores.astype(np.float64).tolist(), -1.0, float(iou_th))
+        return [int(k) for k in np.asarray(keep).reshape(-1)]
+    except (AttributeError, cv.error):
+        return _nms(boxes, scores, iou_th=iou_th, max_keep=max_keep)
+
+def _nms(boxes, scores, iou_th=0.45, max_keep=None):
     idxs = scores.argsort()[::-1]
     keep = []
     while idxs.size > 0:
         i = idxs[0]
         keep.append(i)
-        if idxs.size == 1:
+        if idxs.size == 1 or (max_keep is not None and len(keep) >= max_keep):
             break
         xx1 = np.maximum(boxes[i,0], boxes[idxs[1:],0])
         yy1 = np.maximum(boxes[i,1], boxes[idxs[1:],1])
@@ -56,51 +230,208 @@ def _nms(boxes, scores, iou_th=0.45):
         idxs = idxs[1:][iou <= iou_th]
     return keep
 
+def tile_grid(w: int, h: int, tile: int, overlap: float = 0.2, max_tiles: int = 16) -> List[Tuple[int, int, int, int]]:
+    """
+    Prekrývajúce sa dlaždice (x, y, tw, th) cez ROI w x h v natívnom rozlíšení.
+    overlap: < 1 = podiel dlaždice, >= 1 = pixely. Dlaždice sú rozložené rovnomerne od okraja po okraj.
+    Ak by ich bolo viac ako max_tiles, dlaždica sa zväčší (model ju potom letterboxom zmenší).
+    """
+    tile = max(32, int(tile))
+    while True:
+        ov = int(overlap * tile) if overlap < 1 else int(overlap)
+        stride = max(1, tile - max(0, min(ov, tile - 1)))
+        nx = 1 if w <= tile else int(np.ceil((w - tile) / stride)) + 1
+        ny = 1 if h <= tile else int(np.ceil((h - tile) / stride)) + 1
+        if nx * ny <= max(1, int(max_tiles)) or tile >= max(w, h):
+            break
+        tile = int(np.ceil(tile * 1.25))
+    tw, th = min(tile, w), min(tile, h)
+    xs = [int(round(i * (w - tw) / (nx - 1))) for i in range(nx)] if nx > 1 else [0]
+    ys = [int(round(j * (h - th) / (ny - 1))) for j in range(ny)] if ny > 1 else [0]
+    return [(x, y, tw, th) for y in ys for x in xs]
+
+# dlaždice na thread poole (tile_workers > 0): vlastný pool, nie pool pipeline –
+# tool už môže bežať na worker-i pipeline a čakanie na ten istý pool by ho mohlo zablokovať
+_TILE_POOL = None
+_TILE_POOL_SIZE = 0
+_TILE_POOL_LOCK = threading.Lock()
+
+def _tile_pool(workers: int):
+    global _TILE_POOL, _TILE_POOL_SIZE
+    with _TILE_POOL_LOCK:
+        if _TILE_POOL is None or _TILE_POOL_SIZE < workers:
+            old = _TILE_POOL
+            _TILE_POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qc-yolo-tile")
+            _TILE_POOL_SIZE = workers
+            if old is not None:
+                old.shutdown(wait=False)
+        return _TILE_POOL
+
 class YOLOModel:
-    def __init__(self, onnx_path: str, providers: Optional[List[str]] = None):
+    def __init__(self, onnx_path: str, providers: Optional[List[str]] = None, engine: Optional[Dict[str, Any]] = None):
         if ort is None:
             raise ImportError("onnxruntime nie je nainštalované. pip install onnxruntime-gpu (alebo onnxruntime)")
-        prov = providers or (['TensorrtExecutionProvider','CUDAExecutionProvider','CPUExecutionProvider'])
-        self.session = ort.InferenceSession(onnx_path, providers=prov)
+        self.engine = engine_options(engine)
+        prov = providers or _resolve_providers(self.engine.get("providers", "auto"))
+        so = _session_options(self.engine)
+        load_path = onnx_path
+        opt_dir = str(self.engine.get("optimized_model_path") or "")
+        if opt_dir:
+            opt_path = _optimized_model_file(opt_dir, onnx_path, self.engine, prov)
+            if os.path.exists(opt_path) and os.path.getmtime(opt_path) >= os.path.getmtime(onnx_path):
+                # už optimalizovaný graf tohto modelu pre tieto providery – načítaj priamo
+                load_path = opt_path
+                so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            else:
+                os.makedirs(os.path.dirname(opt_path) or ".", exist_ok=True)
+                so.optimized_model_filepath = opt_path
+        self.session = ort.InferenceSession(load_path, sess_options=so, providers=prov)
         inp = self.session.get_inputs()[0]
         self.input_name = inp.name
         self.input_shape = tuple(inp.shape)  # (N, 3, H, W)
         _, _, self.in_h, self.in_w = self.input_shape
         self.out_names = [o.name for o in self.session.get_outputs()]
-
-    def infer(self, img_bgr: np.ndarray) -> np.ndarray:
-        # očakáva BGR ROI (H,W,3)
-        im = img_bgr
-        im_lb, r, (dw, dh) = _letterbox(im, new_shape=(self.in_w, self.in_h))
-        im_lb = im_lb[:, :, ::-1]  # BGR->RGB
-        im_lb = im_lb.astype(np.float32) / 255.0
-        im_lb = np.transpose(im_lb, (2, 0, 1))[None, ...]  # (1,3,H,W)
-
-        outputs = self.session.run(self.out_names, {self.input_name: im_lb})
-        # predpoklad: výstup tvar (1, N, 85) [x,y,w,h,conf,cls...]
-        preds = outputs[0]
-        if isinstance(preds, list): preds = preds[0]
-        preds = np.squeeze(preds, axis=0)
-
-        boxes_xywh = preds[:, :4]
-        scores = preds[:, 4]
-        cls_probs = preds[:, 5:]
-        cls_ids = np.argmax(cls_probs, axis=1)
-        cls_scores = scores * cls_probs[np.arange(cls_probs.shape[0]), cls_ids]
-
-        # prepočet späť na ROI koordináty
-        # xywh -> xyxy
-        xy = boxes_xywh[:, :2]
-        wh = boxes_xywh[:, 2:4]
-        xyxy = np.concatenate([xy - wh/2, xy + wh/2], axis=1)
-
+        # dynamická dávka (N = "batch"/None/-1) => viac ROI v jednom session.run; pevná 1 => po jednom
+        n = self.input_shape[0]
+        self.max_batch = 0 if not isinstance(n, int) or n <= 0 else n
+        self.in_dtype = np.float16 if "float16" in str(inp.type) else np.float32
+        self.use_io_binding = bool(self.engine.get("io_binding", True))
+        self._inputs: Dict[int, np.ndarray] = {}  # predalokované vstupy podľa veľkosti dávky
+        self._canvas = np.full((self.in_h, self.in_w, 3), 114, np.uint8)  # letterbox plátno (uint8, HWC)
+        self._lock = threading.Lock()  # vstupný buffer je zdieľaný -> jedna inferencia naraz
+        self.warmed = False
+        self.layout = str(self.engine.get("layout", "auto")).lower()
+
+    def _bind_batch(self, n: int) -> int:
+        """Veľkosť tenzora pre n obrázkov: model s pevnou dávkou N berie vždy presne N (ORT iný tvar odmietne)."""
+        return self.max_batch if self.max_batch > 0 else max(1, n)
+
+    def _pad_rows(self, buf: np.ndarray, used: int) -> None:
+        """Nevyužité riadky pevnej dávky = prázdny letterbox (114); ich predikcie sa nedekódujú."""
+        if used < buf.shape[0]:
+            buf[used:].fill(114.0 / 255.0)
+
+    def _input_buffer(self, batch: int) -> np.ndarray:
+        buf = self._inputs.get(batch)
+        if buf is None:
+            buf = np.zeros((batch, 3, self.in_h, self.in_w), dtype=self.in_dtype)
+            self._inputs[batch] = buf
+        return buf
+
+    def warmup(self, runs: Optional[int] = None) -> None:
+        """Dummy inferencie pri stavbe pipeline: alokácie/JIT ORT zaplatíme teraz, nie v prvom cykle."""
+        runs = int(self.engine.get("warmup", 1) if runs is None else runs)
+        with self._lock:
+            for _ in range(max(0, runs)):
+                buf = self._input_buffer(self._bind_batch(1))  # pevná dávka N => warmup tiež (N,3,H,W)
+                buf.fill(114.0 / 255.0)
+                self._run(buf)
+            self.warmed = True
+
+    def _preprocess_into(self, img_bgr: np.ndarray, dst_chw: np.ndarray) -> Tuple[float, float, float]:
+        """BGR ROI (H,W,3) -> priamo do riadku vstupného buffera (3,H,W); vráti (gain, dw, dh)."""
+        gain, (dw, dh) = letterbox_into(img_bgr, dst_chw, self._canvas)
+        return gain, dw, dh
+
+    def _decode(self, preds: np.ndarray, meta: Tuple[float, float, float], conf_th: float = 0.0):
+        """Predikcie jedného obrázka -> kandidáti nad conf_th (xyxy v ROI, cls_ids, cls_scores)."""
+        gain, dw, dh = meta
+        xyxy, cls_ids, cls_scores = decode_predictions(preds, conf_th, layout=self.layout)
         # undo letterbox scaling
-        gain = min(self.in_w / im.shape[1], self.in_h / im.shape[0])
-        pad = np.array([dw, dh, dw, dh])
-        xyxy -= pad
+        xyxy -= np.array([dw, dh, dw, dh], dtype=xyxy.dtype)
         xyxy /= gain
         return xyxy, cls_ids, cls_scores
 
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        if self.use_io_binding:
+            # vstup = náš predalokovaný buffer (bez kópie do nového OrtValue), výstupy alokuje ORT
+            io = self.session.io_binding()
+            io.bind_cpu_input(self.input_name, blob)
+            for name in self.out_names:
+                io.bind_output(name)
+            self.session.run_with_iobinding(io)
+            outputs = io.copy_outputs_to_cpu()
+        else:
+            outputs = self.session.run(self.out_names, {self.input_name: blob})
+        preds = outputs[0]
+        if isinstance(preds, list): preds = preds[0]
+        return preds  # (B, N, 85)
+
+    def infer_single(self, img_bgr: np.ndarray, conf_th: float = 0.0):
+        """
+        Ako infer, ale s vlastným vstupom a plátnom (bez zámku) – viac volaní môže bežať súbežne
+        na thread poole (ORT session.run je thread-safe). Za to platí alokáciu vstupu každé volanie.
+        """
+        blob = np.empty((self._bind_batch(1), 3, self.in_h, self.in_w), dtype=self.in_dtype)
+        canvas = np.empty((self.in_h, self.in_w, 3), np.uint8)  # letterbox_into vyplní celé plátno
+        gain, (dw, dh) = letterbox_into(img_bgr, blob[0], canvas)
+        self._pad_rows(blob, 1)
+        return self._decode(self._run(blob)[0], (gain, dw, dh), conf_th)
+
+    def infer(self, img_bgr: np.ndarray, conf_th: float = 0.0):
+        # očakáva BGR ROI (H,W,3)
+        return self.infer_batch([img_bgr], conf_th=conf_th)[0]
+
+    def infer_batch(self, imgs: List[np.ndarray], conf_th: float = 0.0) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Viac ROI naraz: jeden tenzor (B,3,H,W) a jeden session.run (po kúskoch max_batch).
+        Model exportovaný s pevnou dávkou 1 => sekvenčne, výsledok je rovnaký. Pevná dávka N > 1: tenzor je
+        vždy (N,3,H,W), posledný neúplný kúsok sa doplní prázdnymi riadkami a dekóduje sa len len(chunk) riadkov.
+        conf_th: kandidáti pod prahom sa zahodia už pri dekódovaní (nedekóduje sa každý anchor).
+        """
+        step = max(1, self.max_batch or len(imgs))
+        out = []
+        for i in range(0, len(imgs), step):
+            chunk = imgs[i:i + step]
+            with self._lock:
+                # letterbox ide rovno do predalokovaného vstupu (žiadne medzipolia per inferencia)
+                buf = self._input_buffer(self._bind_batch(len(chunk)))
+                metas = [self._preprocess_into(im, buf[j]) for j, im in enumerate(chunk)]
+                self._pad_rows(buf, len(chunk))
+                preds = self._run(buf)
+            for j, meta in enumerate(metas):
+                out.append(self._decode(preds[j], meta, conf_th))
+        return out
+
+def yolo_model_key(onnx_path: Optional[str], engine: Optional[Dict[str, Any]] = None) -> str:
+    """Rovnaký model = rovnaký onnx_path aj nastavenia engine (iné nastavenia = iná session)."""
+    eng = {k: v for k, v in engine_options(engine).items() if k != "warmup"}
+    return json.dumps([onnx_path, eng], sort_keys=True, default=str)
+
+def recipe_yolo_params(recipe: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """params YOLO tools receptu; recept "yolo_engine" sa doplní ako "engine", ak ho tool nemá vlastný."""
+    out = []
+    for t in recipe.get("tools", []) or []:
+        if (t.get("type", "") or "").lower() != "yolo_roi":
+            continue
+        yparams = dict(t.get("params", {}) or {})
+        if recipe.get("yolo_engine") and "engine" not in yparams:
+            yparams["engine"] = recipe["yolo_engine"]
+        out.append(yparams)
+    return out
+
+def preload_yolo_models(params_list: List[Dict[str, Any]]):
+    """
+    Recept ešte len príde (PLC ID / kód): session jeho YOLO modelov sa postavia a zahrejú na pozadí
+    v spoločnom registri modelov. params_list = params YOLO tools (s "engine" z receptu, ak je).
+    """
+    jobs, seen = [], set()
+    for p in params_list:
+        path = (p or {}).get("onnx_path")
+        if not path:
+            continue
+        key = yolo_model_key(path, p.get("engine"))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        def build(path=path, eng=p.get("engine")):
+            m = YOLOModel(path, engine=eng)
+            m.warmup()
+            return m
+        jobs.append((key, build, path))
+    return get_registry().preload(jobs)
+
 class YOLOInROITool(BaseTool):
     USES_MASKS = True  
     """
@@ -110,37 +441,57 @@ class YOLOInROITool(BaseTool):
       - iou_th: float (napr. 0.45)
       - measure: "count"|"max_conf"|"mean_conf"
       - class_whitelist: Optional[List[int]] (ak chceš filtrovať triedy)
+      - agnostic_nms: bool (default False = NMS zvlášť pre každú triedu)
+      - max_det: int (default 300) – max. detekcií po NMS
+      - tiled: bool (default False) – veľké ROI po dlaždiciach v natívnom rozlíšení namiesto zmenšenia celého ROI
+      - tile_size: int px (chýba/0/None = vstup modelu, napr. 640 či 1280)
+      - tile_overlap: float (< 1 = podiel dlaždice, >= 1 = px; default 0.2)
+      - max_tiles: int (default 16) – rozpočet; pri prekročení sa dlaždice zväčšia
+      - tile_workers: int (default 0 = dávkovo cez infer_batch; > 0 = súbežne na thread poole)
     """
-    _model_cache: Dict[str, YOLOModel] = {}
+    # session sú v spoločnom registri modelov (core/tools/model_registry.py): rozpočet pamäte + LRU;
+    # model aktívnej pipeline je pripnutý (prepare -> acquire, Pipeline.release -> release)
+    _pinned_key: Optional[str] = None
 
-    def _get_model(self, onnx_path: str) -> YOLOModel:
-        if onnx_path not in self._model_cache:
-            self._model_cache[onnx_path] = YOLOModel(onnx_path)
-        return self._model_cache[onnx_path]
+    def _engine(self) -> Dict[str, Any]:
+        return engine_options((self.params or {}).get("engine"))
 
-    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray]) -> ToolResult:
-        onnx_path = self.params["onnx_path"]
-        conf_th = float(self.params.get("conf_thres", self.params.get("conf_th", 0.25)))
-        iou_th  = float(self.params.get("iou_thres",  self.params.get("iou_th",  0.45)))
-
-        measure_mode = self.params.get("measure", "count")
-        class_whitelist = self.params.get("class_whitelist", None)
+    def _model_key(self, onnx_path: Optional[str] = None) -> str:
+        return yolo_model_key(onnx_path or (self.params or {}).get("onnx_path"), self._engine())
 
+    def _get_model(self, onnx_path: str) -> YOLOModel:
+        return get_registry().get(self._model_key(onnx_path),
+                                  lambda: YOLOModel(onnx_path, engine=self._engine()), onnx_path)
+
+    def prepare(self, img_ref: np.ndarray) -> None:
+        """Pri stavbe pipeline: session sa vytvorí (alebo vezme z preloadu), pripne a zahreje (warmup)."""
+        path = (self.params or {}).get("onnx_path")
+        if not path:
+            return
+        key = self._model_key(path)
+        if self._pinned_key != key:
+            self.release()
+            get_registry().acquire(key, lambda: YOLOModel(path, engine=self._engine()), path)
+            self._pinned_key = key
+        model = self._get_model(path)
+        if not model.warmed:
+            model.warmup()
+
+    def release(self) -> None:
+        """Pipeline končí (prepnutie receptu): model už nie je pripnutý, LRU ho môže vyhodiť."""
+        if self._pinned_key is not None:
+            get_registry().release(self._pinned_key)
+            self._pinned_key = None
+
+    def _prepare_roi(self, ctx: FrameContext) -> Dict[str, Any]:
+        """ROI z kontextu (BGR) + maska + bezpečný preproc na Y-kanáli – vstup pre model."""
         x, y, w, h = [int(v) for v in self.roi_xywh]
-
-        # zarovnanie jednotne cez BaseTool helper
-        cur_aligned = self.align_current_to_ref(img_ref, img_cur, fixture_transform)
-
-
-        # až teraz vyrež ROI v referenčných súradniciach
-        roi = cur_aligned[y:y+h, x:x+w]
-        if roi.ndim == 2:
-            roi = cv.cvtColor(roi, cv.COLOR_GRAY2BGR)
+        roi = ctx.crop((x, y, w, h), kind="bgr")
 
 
         # -------------------- MASKA v ROI (255 = analyzuj, 0 = ignoruj) --------------------
         mask_rects = (self.params or {}).get("mask_rects", []) or []
-        full_mask = self.roi_mask_intersection(x, y, w, h, mask_rects, roi_shape=roi.shape) if mask_rects else None
+        full_mask = self.cached_roi_mask(x, y, w, h, mask_rects, roi_shape=roi.shape) if mask_rects else None
 
 
 
@@ -165,35 +516,109 @@ class YOLOInROITool(BaseTool):
                 pre_preview = cv.cvtColor(cv.cvtColor(roi, cv.COLOR_BGR2GRAY), cv.COLOR_GRAY2BGR)
             except Exception:
                 pass
+        return {"roi": roi, "mask_rects": mask_rects, "pre_desc": pre_desc, "pre_preview": pre_preview}
+
+    def _tiled(self) -> bool:
+        return bool((self.params or {}).get("tiled", False))
+
+    def _infer_tiled(self, model: YOLOModel, roi: np.ndarray, conf_th: float):
+        """
+        Dlaždice cez ROI -> detekcie v súradniciach ROI (posun o roh dlaždice). Spojenie cez
+        globálne NMS robí až run() (rovnako ako pri jednom ROI). Vracia (xyxy, cls_ids, scores, počet dlaždíc).
+        """
+        p = self.params or {}
+        h, w = roi.shape[:2]
+        tiles = tile_grid(w, h, int(p.get("tile_size") or max(model.in_w, model.in_h)),
+                          float(p.get("tile_overlap", 0.2)), int(p.get("max_tiles", 16)))
+        crops = [roi[ty:ty + th, tx:tx + tw] for (tx, ty, tw, th) in tiles]
+        workers = int(p.get("tile_workers", 0) or 0)
+        if workers > 0 and len(crops) > 1:
+            pool = _tile_pool(workers)
+            dets = list(pool.map(lambda c: model.infer_single(c, conf_th=conf_th), crops))
+        else:
+            dets = model.infer_batch(crops, conf_th=conf_th)
+
+        boxes, cls_ids, scores = [], [], []
+        for (tx, ty, _, _), (b, c, sc) in zip(tiles, dets):
+            boxes.append(b + np.array([tx, ty, tx, ty], dtype=b.dtype))
+            cls_ids.append(c); scores.append(sc)
+        return np.concatenate(boxes), np.concatenate(cls_ids), np.concatenate(scores), len(tiles)
+
+    def _conf_th(self) -> float:
+        return float(self.params.get("conf_thres", self.params.get("conf_th", 0.25)))
+
+    def _batch_slot(self) -> str:
+        return f"yolo_batch:{id(self)}"
+
+    @classmethod
+    def run_batch(cls, tools: List["YOLOInROITool"], ctx: FrameContext) -> None:
+        """
+        Pipeline pre-pass: ROI všetkých YOLO tools s rovnakým onnx_path -> jeden infer_batch
+        (jeden session.run). Detekcie sa rozdelia späť a každý tool si ich v run() vyzdvihne z ctx.
+        """
+        by_model: Dict[str, List["YOLOInROITool"]] = {}
+        for t in tools:
+            # dlaždicový tool má vlastnú dávku (dlaždice), do spoločnej nejde
+            if (t.params or {}).get("onnx_path") and not t._tiled():
+                by_model.setdefault(t._model_key(), []).append(t)
+        for group in by_model.values():
+            path = group[0].params["onnx_path"]
+            if len(group) < 2:
+                continue
+            preps = [t._prepare_roi(ctx) for t in group]
+            # prázdne ROI nechaj na samostatný run (vráti rovnakú chybu ako doteraz)
+            pairs = [(t, p) for t, p in zip(group, preps) if p["roi"].size > 0]
+            if len(pairs) < 2:
+                continue
+            model = pairs[0][0]._get_model(path)
+            conf = min(t._conf_th() for t, _ in pairs)  # každý tool si potom dofiltruje svoj prah
+            dets = model.infer_batch([p["roi"] for _, p in pairs], conf_th=conf)
+            for (t, p), d in zip(pairs, dets):
+                ctx.put(t._batch_slot(), (p, d))
+
+    def run(self, img_ref: np.ndarray, img_cur: np.ndarray, fixture_transform: Optional[np.ndarray],
+            ctx: Optional[FrameContext] = None) -> ToolResult:
+        onnx_path = self.params["onnx_path"]
+        conf_th = self._conf_th()
+        iou_th  = float(self.params.get("iou_thres",  self.params.get("iou_th",  0.45)))
+
+        measure_mode = self.params.get("measure", "count")
+        class_whitelist = self.params.get("class_whitelist", None)
+
+        x, y, w, h = [int(v) for v in self.roi_xywh]
+
+        # zarovnanie raz za cyklus (zdieľaný FrameContext), ROI v referenčných súradniciach ako BGR
+        ctx = self._frame_ctx(img_ref, img_cur, fixture_transform, ctx)
 
-        # -------------------- INFER YOLO v ROI --------------------
-        model = self._get_model(onnx_path)
-        xyxy, cls_ids, cls_scores = model.infer(roi)
-
-        # filter podľa confidence + class whitelist
-        keep = np.where(cls_scores >= float(conf_th))[0]
-        if keep.size > 0 and class_whitelist:
-            keep = np.array([i for i in keep if int(cls_ids[i]) in set(class_whitelist)], dtype=int)
-        if keep.size > 0:
-            boxes = xyxy[keep]
-            cls_ids = cls_ids[keep]
-            cls_scores = cls_scores[keep]
+        # -------------------- INFER YOLO v ROI (alebo hotový výsledok z dávky Pipeline) --------------------
+        batched = ctx.get(self._batch_slot())
+        n_tiles = 0
+        if batched is not None:
+            prep, (xyxy, cls_ids, cls_scores) = batched
         else:
-            boxes = np.zeros((0, 4), dtype=np.float32)
-            cls_ids = np.zeros((0,), dtype=np.int32)
-            cls_scores = np.zeros((0,), dtype=np.float32)
-
-        # NMS
-        if boxes.shape[0] > 0:
-            keep_idx = _nms(boxes, cls_scores, iou_th=iou_th)
-            if len(keep_idx) > 0:
-                boxes = boxes[keep_idx]
-                cls_ids = cls_ids[keep_idx]
-                cls_scores = cls_scores[keep_idx]
+            prep = self._prepare_roi(ctx)
+            model = self._get_model(onnx_path)
+            if self._tiled() and prep["roi"].size > 0:
+                xyxy, cls_ids, cls_scores, n_tiles = self._infer_tiled(model, prep["roi"], conf_th)
             else:
-                boxes = np.zeros((0, 4), dtype=np.float32)
-                cls_ids = np.zeros((0,), dtype=np.int32)
-                cls_scores = np.zeros((0,), dtype=np.float32)
+                xyxy, cls_ids, cls_scores = model.infer(prep["roi"], conf_th=conf_th)
+        roi = prep["roi"]
+        mask_rects = prep["mask_rects"]
+        pre_desc = prep["pre_desc"]
+        pre_preview = prep["pre_preview"]
+
+        # filter podľa confidence + class whitelist (vektorovo), potom NMS po triedach naraz
+        keep = cls_scores >= float(conf_th)
+        if class_whitelist:
+            keep &= np.isin(cls_ids, np.asarray(list(class_whitelist), dtype=np.int64))
+        boxes = xyxy[keep].astype(np.float32, copy=False)
+        cls_ids = cls_ids[keep].astype(np.int32, copy=False)
+        cls_scores = cls_scores[keep].astype(np.float32, copy=False)
+
+        keep_idx = batched_nms(boxes, cls_scores, cls_ids, iou_th=iou_th,
+                               agnostic=bool(self.params.get("agnostic_nms", False)),
+                               max_det=int(self.params.get("max_det", 300)))
+        boxes, cls_ids, cls_scores = boxes[keep_idx], cls_ids[keep_idx], cls_scores[keep_idx]
 
         # -------------------- METRIKA --------------------
         if boxes.shape[0] == 0:
@@ -228,6 +653,8 @@ class YOLOInROITool(BaseTool):
             "scores": cls_scores.tolist() if boxes.shape[0] else [],
             "preproc_desc": pre_desc
         }
+        if n_tiles:
+            details["tiles"] = n_tiles
 
         if pre_preview is not None:
             details["preproc_preview"] = pre_preview
@@ -1,9 +1,134 @@
+import time
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Callable, Tuple, Protocol, runtime_checkable
+from collections import deque
+from typing import Any, Dict, Optional, Callable, NamedTuple, Tuple, Protocol, runtime_checkable
 import numpy as np
 
 Frame = np.ndarray  # HxWxC (uint8) alebo HxW (mono)
 
+class FramePacket(NamedTuple):
+    seq: int      # poradové číslo snímky (rastie o 1 s každou novou)
+    ts: Optional[float]  # monotónny čas zachytenia (time.monotonic); None = kamera ho nepozná
+    frame: Frame  # read-only view (kamery s ringom: bez kópie, slot sa neprepíše, kým ho niekto drží)
+
+class CaptureStats:
+    """
+    ELI5: Telemetria snímania – aby bolo vidno, či pomalý cyklus spôsobila kamera, dekodér alebo pipeline.
+      frames      počet zachytených snímok
+      fps         efektívne fps (z časov posledných ~2 s snímok)
+      read_ms     trvanie read()/dekódu poslednej snímky (+ priemer a max)
+      last_ts     monotónny čas poslednej snímky; age_ms = koľko je stará teraz
+      reconnects  koľkokrát sa stream znovu otváral
+      dropped     snímky prepísané skôr, než si ich niekto vyzdvihol
+      skipped     staré snímky preskočené v dekóderi (low-latency režim ich ani nekonvertuje)
+      lag_ms      o koľko snímka prišla neskôr, než by mala podľa PTS streamu (voči najlepšiemu
+                  videnému stavu) = latencia pridaná bufferovaním; rastie, keď sa snímky hromadia
+      trig_ms     trigger -> prvá snímka zachytená po ňom (get_frame_after_trigger; + priemer a max),
+                  trig_timeouts = triggery, po ktorých snímka neprišla do timeoutu
+    """
+
+    def __init__(self, window: int = 120):
+        self._lock = threading.Lock()
+        self._times = deque(maxlen=max(2, int(window)))
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._times.clear()
+            self.frames = 0
+            self.last_ts = None
+            self.read_ms = 0.0
+            self.read_ms_avg = 0.0
+            self.read_ms_max = 0.0
+            self.reconnects = 0
+            self.dropped = 0
+            self.skipped = 0
+            self.lag_ms = None
+            self.lag_ms_max = 0.0
+            self._pts_off = None
+            self.triggers = 0
+            self.trig_ms = None
+            self.trig_ms_avg = 0.0
+            self.trig_ms_max = 0.0
+            self.trig_timeouts = 0
+
+    def on_frame(self, t_start: float, t_end: Optional[float] = None) -> float:
+        """Snímka prečítaná: t_start/t_end = time.monotonic() pred/po read(). Vráti capture timestamp."""
+        t_end = time.monotonic() if t_end is None else t_end
+        ms = (t_end - t_start) * 1000.0
+        with self._lock:
+            self.frames += 1
+            self.last_ts = t_end
+            self._times.append(t_end)
+            self.read_ms = ms
+            self.read_ms_avg = ms if self.frames == 1 else 0.9 * self.read_ms_avg + 0.1 * ms
+            self.read_ms_max = max(self.read_ms_max, ms)
+        return t_end
+
+    def on_reconnect(self) -> None:
+        with self._lock:
+            self.reconnects += 1
+            self._pts_off = None  # nový stream = nové PTS
+
+    def on_skipped(self, n: int = 1) -> None:
+        with self._lock:
+            self.skipped += int(n)
+
+    def on_pts(self, ts: float, pts_ms: float) -> None:
+        """
+        Príchod snímky (ts, monotonic) vs. jej PTS zo streamu: najmenší rozdiel = základná latencia
+        (sieť + dekód); o koľko je aktuálny rozdiel väčší, o toľko snímka čakala v bufferoch.
+        """
+        if not pts_ms or pts_ms <= 0:
+            return
+        off = ts - pts_ms / 1000.0
+        with self._lock:
+            if self._pts_off is None or off < self._pts_off:
+                self._pts_off = off
+            self.lag_ms = (off - self._pts_off) * 1000.0
+            self.lag_ms_max = max(self.lag_ms_max, self.lag_ms)
+
+    def on_trigger(self, latency_ms: Optional[float]) -> None:
+        """Výsledok čakania na snímku po triggeri: latencia v ms, None = timeout."""
+        with self._lock:
+            if latency_ms is None:
+                self.trig_timeouts += 1
+                return
+            self.triggers += 1
+            self.trig_ms = float(latency_ms)
+            self.trig_ms_avg = self.trig_ms if self.triggers == 1 else 0.9 * self.trig_ms_avg + 0.1 * self.trig_ms
+            self.trig_ms_max = max(self.trig_ms_max, self.trig_ms)
+
+    def on_dropped(self, n: int = 1) -> None:
+        with self._lock:
+            self.dropped += int(n)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            ts = [t for t in self._times if now - t <= 2.0]
+            fps = (len(ts) - 1) / (ts[-1] - ts[0]) if len(ts) >= 2 and ts[-1] > ts[0] else 0.0
+            return {
+                "frames": self.frames,
+                "fps": fps,
+                "read_ms": self.read_ms,
+                "read_ms_avg": self.read_ms_avg,
+                "read_ms_max": self.read_ms_max,
+                "last_ts": self.last_ts,
+                "age_ms": None if self.last_ts is None else (now - self.last_ts) * 1000.0,
+                "reconnects": self.reconnects,
+                "dropped": self.dropped,
+                "skipped": self.skipped,
+                "lag_ms": self.lag_ms,
+                "lag_ms_max": self.lag_ms_max,
+                "triggers": self.triggers,
+                "trig_ms": self.trig_ms,
+                "trig_ms_avg": self.trig_ms_avg,
+                "trig_ms_max": self.trig_ms_max,
+                "trig_timeouts": self.trig_timeouts,
+            }
+
 class ICamera(ABC):
     """Jednoduché rozhranie kamery pre pipeline."""
 
@@ -20,14 +145,74 @@ class ICamera(ABC):
     @abstractmethod
     def stop(self) -> None: ...
 
-    @abstractmethod
-    def trigger(self) -> None:
-        """HW/SW trigger (ak kamera podporuje)."""
+    def trigger(self) -> float:
+        """
+        Trigger (diel je na mieste): zapamätá čas; get_frame_after_trigger() potom vráti až snímku
+        zachytenú po ňom. Kamera s HW triggerom ho navyše pošle do kamery a zavolá super().trigger().
+        """
+        self._trigger_ts = time.monotonic()
+        return self._trigger_ts
 
     @abstractmethod
     def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
         """Vráti posledný snímok (blocking do timeout)."""
 
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100) -> Optional[FramePacket]:
+        """
+        Najnovšia snímka so seq > seq (čaká do timeoutu, inak None) – čitateľ tak nespracuje
+        tú istú snímku dvakrát. Default pre kamery bez ringu: get_frame() + nové seq, ale ts=None –
+        čas zachytenia nepoznáme (get_frame môže vrátiť snímku uloženú dávno pred volaním).
+        Kamera, ktorá čas zachytenia pozná, má túto metódu prepísať.
+        """
+        frm = self.get_frame(timeout_ms=timeout_ms)
+        if frm is None:
+            return None
+        self._fallback_seq = max(getattr(self, "_fallback_seq", -1), seq) + 1
+        return FramePacket(self._fallback_seq, None, frm)
+
+    def get_frame_after_trigger(self, timeout_ms: int = 500,
+                                trigger_ts: Optional[float] = None) -> Optional[FramePacket]:
+        """
+        Prvá snímka s capture časom po triggeri (trigger_ts, inak posledný trigger(); bez triggeru = teraz).
+        Staršie snímky (zachytené ešte pred dielom) sa preskočia; čaká sa na ďalšiu cez get_frame_after,
+        teda na signál z ringu kamery, nie pevným sleepom. Latencia trigger -> snímka ide do stats().
+        Kamera bez capture času (ts=None): snímka dostupná pri prvom pohľade mohla vzniknúť pred triggerom,
+        preto sa berie až ďalšia naozaj nová (iný buffer) – tá vznikla určite po ňom; latencia = kedy sme
+        ju uvideli. Také kamery nemajú na čo čakať, skúša sa po 2 ms.
+        None = do timeoutu neprišla.
+        """
+        t_trig = trigger_ts if trigger_ts is not None else getattr(self, "_trigger_ts", None)
+        if t_trig is None:
+            t_trig = self.trigger()
+        deadline = time.monotonic() + max(0.0, timeout_ms) / 1000.0
+        seq = -1
+        seen = None  # buffer snímky bez ts, ktorú sme videli ako prvú (môže byť spred triggeru)
+        st = getattr(self, "_stats", None)
+        while True:
+            left_ms = (deadline - time.monotonic()) * 1000.0
+            if left_ms <= 0:
+                if st is not None:
+                    st.on_trigger(None)
+                return None
+            pkt = self.get_frame_after(seq, timeout_ms=left_ms)
+            if pkt is None:
+                continue
+            seq = pkt.seq
+            if pkt.ts is None:
+                buf = pkt.frame.__array_interface__["data"][0]
+                if seen is None or buf == seen:
+                    seen = buf
+                    time.sleep(0.002)
+                    continue
+                ts = time.monotonic()
+            elif pkt.ts >= t_trig:
+                ts = pkt.ts
+            else:
+                continue  # snímka spred triggeru -> čakaj na novšiu
+            if st is not None:
+                st.on_trigger((ts - t_trig) * 1000.0)
+            return pkt
+
     @abstractmethod
     def set_exposure(self, exposure_ms: float) -> None: ...
 
@@ -37,6 +222,11 @@ class ICamera(ABC):
     @abstractmethod
     def set_trigger_mode(self, enabled: bool) -> None: ...
 
+    def stats(self) -> Dict[str, Any]:
+        """Telemetria snímania (CaptureStats.snapshot); kamera bez telemetrie vráti prázdny dict."""
+        st = getattr(self, "_stats", None)
+        return st.snapshot() if st is not None else {}
+
     def on_new_frame(self, cb: Callable[[Frame], None]) -> None:
         """Voliteľné: callback na prichádzajúce snímky (live náhľad)."""
         self._on_new_frame = cb
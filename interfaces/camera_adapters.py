@@ -1,40 +1,83 @@
 # interfaces/camera_adapters.py
-from typing import Optional
+import time
+from typing import Any, Dict, Optional
 import numpy as np
-from interfaces.camera import ICamera, Frame
+from interfaces.camera import ICamera, Frame, FramePacket
+
+# Obaly starších kamier (legacy/ip_camera.IPCamera, qcio/cameras/usb_camera.USBCamera) do rozhrania ICamera.
+# Tie kamery nemajú open()/trigger()/get_frame(): stream beží cez start_stream(...), posledná snímka
+# cez get_current_frame(). trigger() je len SW (ICamera.trigger zapamätá čas).
+
+def _wait_frame(get, timeout_ms: int):
+    """get() -> snímka/None; skúša do timeoutu (staré kamery nemajú na čo čakať inak)."""
+    deadline = time.monotonic() + max(0, timeout_ms) / 1000.0
+    while True:
+        frm = get()
+        if frm is not None or time.monotonic() >= deadline:
+            return frm
+        time.sleep(0.005)
 
-# POZOR:
-# Tu zabaľ tvoje existujúce implementácie (io/cameras/ip_camera.py, usb_camera.py)
-# do rozhrania ICamera. Neviem ich presnú API, preto sú tu skeletony.
 
 class IPCameraAdapter(ICamera):
-    def __init__(self, low_level_cam):
+    """legacy IPCamera (VideoThread): snímky bez capture timestampu -> get_frame_after má ts=None."""
+    def __init__(self, low_level_cam, url: str):
         self.cam = low_level_cam
+        self.url = url
+        self._on_new_frame = None
+
+    def open(self):  pass
+    def close(self): self.cam.stop_stream()
+    def start(self): self.cam.start_stream(self.url, self._forward)
+    def stop(self):  self.cam.stop_stream()
+    def set_exposure(self, ms: float): pass
+    def set_gain(self, db: float): pass
+    def set_trigger_mode(self, enabled: bool): pass
 
-    def open(self):  self.cam.open()
-    def close(self): self.cam.close()
-    def start(self): self.cam.start()
-    def stop(self):  self.cam.stop()
-    def trigger(self): self.cam.trigger()
-    def set_exposure(self, ms: float): self.cam.set_exposure(ms)
-    def set_gain(self, db: float): self.cam.set_gain(db)
-    def set_trigger_mode(self, enabled: bool): self.cam.set_trigger_mode(enabled)
+    def _forward(self, frame):
+        if self._on_new_frame:
+            self._on_new_frame(frame)
 
     def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
-        # mapni na tvoju metódu (napr. read()/get_last_frame())
-        return self.cam.get_frame(timeout_ms)
+        return _wait_frame(self.cam.get_current_frame, timeout_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cam.stats() if hasattr(self.cam, "stats") else {}
+
 
 class USBCameraAdapter(ICamera):
-    def __init__(self, low_level_cam):
+    """USBCamera (vlákno + cv2.VideoCapture): snímky so seq + monotónnym capture timestampom."""
+    def __init__(self, low_level_cam, device_index: int = 0, settings: Optional[dict] = None, backend=None):
         self.cam = low_level_cam
-    # rovnaké forwardy ako hore...
-    def open(self):  self.cam.open()
-    def close(self): self.cam.close()
-    def start(self): self.cam.start()
-    def stop(self):  self.cam.stop()
-    def trigger(self): self.cam.trigger()
-    def set_exposure(self, ms: float): self.cam.set_exposure(ms)
-    def set_gain(self, db: float): self.cam.set_gain(db)
-    def set_trigger_mode(self, enabled: bool): self.cam.set_trigger_mode(enabled)
+        self.device_index = int(device_index)
+        self.settings = dict(settings or {})
+        self.backend = backend
+        self._on_new_frame = None
+        self._stats = getattr(low_level_cam, "_stats", None)  # latencia triggeru ide do telemetrie kamery
+
+    def open(self):  pass
+    def close(self): self.cam.stop_stream()
+    def start(self): self.cam.start_stream(self.device_index, self._forward, self.settings, self.backend)
+    def stop(self):  self.cam.stop_stream()
+    def set_trigger_mode(self, enabled: bool): pass
+
+    def set_exposure(self, ms: float):
+        self.settings.update(auto_exposure=False, exposure=float(ms))
+        self.cam.apply_settings(self.settings)
+
+    def set_gain(self, db: float):
+        self.settings["gain"] = float(db)
+        self.cam.apply_settings(self.settings)
+
+    def _forward(self, frame):
+        if self._on_new_frame:
+            self._on_new_frame(frame)
+
     def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
-        return self.cam.get_frame(timeout_ms)
+        pkt = self.cam.get_frame_after(-1, timeout_ms)
+        return pkt.frame if pkt is not None else None
+
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100) -> Optional[FramePacket]:
+        return self.cam.get_frame_after(seq, timeout_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cam.stats() if hasattr(self.cam, "stats") else {}
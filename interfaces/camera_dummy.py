@@ -1,17 +1,20 @@
 # interfaces/camera_dummy.py
+import time
 import cv2 as cv
 import numpy as np
 from typing import Optional, Callable
-from interfaces.camera import ICamera, Frame
+from interfaces.camera import ICamera, Frame, FramePacket, CaptureStats
 
 class DummyCamera(ICamera):
     """
     ELI5: Pre dev. číta opakovane samples/cur.png (alebo posledný zachytený),
-    trigger iba „oznámi“ že ďalší frame je pripravený.
+    trigger iba zapamätá čas – snímka sa číta až na požiadanie, takže je vždy „po triggeri“.
     """
     def __init__(self, img_path: str = "samples/cur.png"):
         self.img_path = img_path
         self._on_new_frame = None
+        self._stats = CaptureStats()  # read_ms = imread z disku
+        self._seq = -1
 
     def open(self) -> None: pass
     def close(self) -> None: pass
@@ -21,10 +24,18 @@ class DummyCamera(ICamera):
     def set_gain(self, gain_db: float) -> None: pass
     def set_trigger_mode(self, enabled: bool) -> None: pass
 
-    def trigger(self) -> None:
-        # nič, snímka sa načíta na požiadanie
-        pass
-
     def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
+        t0 = time.monotonic()
         img = cv.imread(self.img_path, cv.IMREAD_GRAYSCALE)
+        if img is not None:
+            self._stats.on_frame(t0)
         return img
+
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100) -> Optional[FramePacket]:
+        # snímka sa číta až teraz => čas zachytenia je známy (a je po každom skoršom trigger())
+        t0 = time.monotonic()
+        img = cv.imread(self.img_path, cv.IMREAD_GRAYSCALE)
+        if img is None:
+            return None
+        self._seq = max(self._seq, seq) + 1
+        return FramePacket(self._seq, self._stats.on_frame(t0), img)
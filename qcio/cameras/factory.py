@@ -0,0 +1,45 @@
+# qcio/cameras/factory.py
+from typing import List
+
+from interfaces.camera import ICamera
+from interfaces.camera_dummy import DummyCamera
+from qcio.cameras.rtsp_camera import RTSPCamera
+from qcio.cameras.replay_camera import ReplayCamera
+try:
+    from qcio.cameras.rtsp_gst_camera import RTSPGstCamera
+except Exception:
+    RTSPGstCamera = None
+
+# ELI5: Typ kamery ako text (combobox v Nastaveniach, "type" v profile, stanice v settings.json) -> ICamera.
+CAM_DUMMY = "DummyCamera"
+CAM_RTSP = "RTSP (OpenCV/FFmpeg)"
+CAM_RTSP_LOW_LATENCY = "RTSP low-latency (OpenCV/FFmpeg)"
+CAM_RTSP_GST = "RTSP (GStreamer HW)"
+CAM_REPLAY = "Replay (priečinok/video)"
+
+
+def camera_types() -> List[str]:
+    """Typy kamier dostupné v tomto builde (GStreamer len ak je)."""
+    items = [CAM_DUMMY, CAM_RTSP, CAM_RTSP_LOW_LATENCY]
+    if RTSPGstCamera is not None:
+        items.append(CAM_RTSP_GST)
+    items.append(CAM_REPLAY)
+    return items
+
+
+def make_camera(cam_type: str, url: str = "") -> ICamera:
+    """Nová (ešte neotvorená) kamera podľa typu; url = RTSP URL / cesta podľa typu."""
+    url = (url or "").strip()
+    if cam_type == CAM_DUMMY:
+        return DummyCamera()
+    if cam_type == CAM_RTSP:
+        return RTSPCamera(url)
+    if cam_type == CAM_RTSP_LOW_LATENCY:
+        return RTSPCamera(url, low_latency=True)  # vždy najnovšia snímka, staré z bufferu sa preskočia
+    if cam_type == CAM_RTSP_GST:
+        if RTSPGstCamera is None:
+            raise RuntimeError("GStreamer nie je k dispozícii")
+        return RTSPGstCamera(url, latency_ms=0)
+    if cam_type == CAM_REPLAY:
+        return ReplayCamera.from_url(url)  # url = "cesta[?fps=..&loop=..&preload=..]"
+    raise ValueError(f"Neznámy typ kamery: {cam_type}")
@@ -0,0 +1,110 @@
+# qcio/cameras/frame_ring.py
+import sys
+import time
+import threading
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from interfaces.camera import FramePacket
+
+
+class FrameRing:
+    """
+    ELI5: Malý kruhový zásobník snímok (napr. 4 sloty) medzi vláknom kamery a čitateľmi.
+      - každá snímka má seq + timestamp => čitateľ vie, či je nová (get_after(seq)),
+      - čitateľ dostane read-only view do slotu, nič sa nekopíruje,
+      - kým niekto drží view (alebo hocijaký výrez z neho), slot sa neprepíše:
+        numpy view drží referenciu na buffer, takže refcount bufferu prezradí, či je voľný,
+      - dekodér zapisuje rovno do voľného slotu (cap.read(buf)), buffery sa recyklujú,
+      - on_drop: zavolá sa pre každú snímku prepísanú skôr, než si ju niekto vyzdvihol.
+    """
+
+    def __init__(self, size: int = 4, on_drop: Optional[Callable[[int], None]] = None):
+        self.size = max(2, int(size))
+        self._bufs: List[Optional[np.ndarray]] = [None] * self.size
+        self._seq: List[int] = [-1] * self.size
+        self._ts: List[float] = [0.0] * self.size
+        self._head = -1          # slot s najnovšou snímkou
+        self._next_seq = 0
+        self._taken: List[bool] = [False] * self.size  # snímku v slote si už niekto vyzdvihol
+        self._on_drop = on_drop
+        self._cond = threading.Condition()
+
+    # -------------------- writer (vlákno kamery) --------------------
+
+    def _held(self, i: int) -> bool:
+        # 2 referencie = zoznam _bufs + argument getrefcount; viac = niekto drží view
+        return self._bufs[i] is not None and sys.getrefcount(self._bufs[i]) > 2
+
+    def writable(self) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Slot na zápis ďalšej snímky: najstarší, ktorý nie je najnovší a nikto ho nedrží.
+        Ak sú všetky držané, slot sa "odpojí" (čitateľom ostane ich pole) a zapíše sa do nového poľa.
+        Vracia (index, buffer alebo None = nechaj dekodér alokovať).
+        """
+        with self._cond:
+            order = [(self._head + k) % self.size for k in range(1, self.size + 1)]
+            cand = [i for i in order if i != self._head]
+            for i in cand:
+                if not self._held(i):
+                    self._drop(i)
+                    return i, self._bufs[i]
+            i = cand[0]
+            self._drop(i)
+            self._bufs[i] = None
+            return i, None
+
+    def _drop(self, i: int) -> None:
+        """Slot ide na zápis (kým sa píše, nie je čitateľný); nevyzdvihnutá snímka v ňom = drop."""
+        if self._seq[i] >= 0 and not self._taken[i] and self._on_drop is not None:
+            try: self._on_drop(1)
+            except Exception: pass
+        self._seq[i] = -1
+
+    def commit(self, i: int, frame: np.ndarray, ts: Optional[float] = None) -> int:
+        """Zverejní snímku v slote i (frame = buffer zo writable(), alebo nové pole z dekodéra)."""
+        with self._cond:
+            self._bufs[i] = frame
+            seq = self._next_seq
+            self._next_seq += 1
+            self._seq[i] = seq
+            self._taken[i] = False
+            self._ts[i] = time.monotonic() if ts is None else float(ts)
+            self._head = i
+            self._cond.notify_all()
+            return seq
+
+    # -------------------- readers --------------------
+
+    def _packet(self, i: int) -> FramePacket:
+        v = self._bufs[i].view()
+        v.setflags(write=False)
+        self._taken[i] = True
+        return FramePacket(self._seq[i], self._ts[i], v)
+
+    @property
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._seq[self._head] if self._head >= 0 else -1
+
+    def latest(self) -> Optional[FramePacket]:
+        with self._cond:
+            return self._packet(self._head) if self._head >= 0 and self._seq[self._head] >= 0 else None
+
+    def get_after(self, seq: int, timeout: float) -> Optional[FramePacket]:
+        """Najnovšia snímka so seq > seq; čaká max timeout sekúnd, inak None."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while True:
+                h = self._head
+                if h >= 0 and self._seq[h] > seq:
+                    return self._packet(h)
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._bufs = [None] * self.size
+            self._seq = [-1] * self.size
+            self._head = -1
@@ -0,0 +1,332 @@
+# qcio/cameras/replay_camera.py
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+from urllib.parse import parse_qs
+
+import cv2 as cv
+import numpy as np
+
+from interfaces.camera import ICamera, Frame, FramePacket, CaptureStats
+from qcio.cameras.frame_ring import FrameRing
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+PRELOAD_NONE = "none"      # dekód z disku počas prehrávania (realistické, ale meria aj disk/dekód)
+PRELOAD_MEMORY = "memory"  # všetky snímky dekódované do RAM pri open()
+PRELOAD_MEMMAP = "memmap"  # dekód raz do .npy cache vedľa zdroja, potom len memory-mapped čítanie
+
+
+class ReplayCamera(ICamera):
+    """
+    ELI5: "Kamera", ktorá prehráva priečinok obrázkov alebo video – deterministický vstup pre benchmarky.
+      fps > 0: snímky prichádzajú v reálnom čase (vlákno + ring ako RTSP kamera; pomalý konzument ich stráca),
+      fps = 0: "čo najrýchlejšie" – každý get_frame_after() dostane hneď ďalšiu snímku, žiadna sa nestratí
+               (priepustnosť meria len konzumenta),
+      loop: po poslednej snímke znova od prvej (inak koniec: get_frame vráti None, finished = True),
+      preload: none | memory | memmap – pri memory/memmap je dekód z disku mimo merania
+               a snímka je read-only view do zásobníka (bez kópie).
+    Snímky iného rozmeru než prvá sa zmenšia/zväčšia na jej rozmer (zásobník má jeden tvar).
+    """
+
+    def __init__(self, source: str, fps: float = 30.0, loop: bool = True, preload: str = PRELOAD_MEMORY,
+                 gray: bool = False, max_frames: int = 0, cache_dir: Optional[str] = None, ring_size: int = 4):
+        self.source = str(source)
+        self.fps = max(0.0, float(fps))
+        self.loop = bool(loop)
+        self.preload = (preload or PRELOAD_NONE).lower()
+        if self.preload not in (PRELOAD_NONE, PRELOAD_MEMORY, PRELOAD_MEMMAP):
+            raise ValueError(f"Replay: neznámy preload '{preload}' (none | memory | memmap)")
+        self.gray = bool(gray)
+        self.max_frames = max(0, int(max_frames))
+        self.cache_dir = cache_dir
+        self.finished = False
+
+        self._files: List[str] = []
+        self._stack: Optional[np.ndarray] = None  # (N, H, W[, C]) pri memory/memmap
+        self._shape = None
+        self._cap: Optional[cv.VideoCapture] = None  # video bez preloadu
+        self._n = 0
+        self._pos = 0      # index ďalšej snímky
+        self._seq = -1     # seq poslednej vydanej snímky (fps = 0)
+        self._lock = threading.Lock()
+        self._run = False
+        self._th: Optional[threading.Thread] = None
+        self._stats = CaptureStats()  # read_ms = čas získania snímky (pri preloade ~0)
+        self._ring = FrameRing(ring_size, on_drop=self._stats.on_dropped)
+        self._on_new_frame: Optional[Callable[[Frame], None]] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "ReplayCamera":
+        """
+        Z jedného textového poľa (Nastavenia / stanice): "cesta[?fps=0&loop=1&preload=memmap&gray=1&max_frames=100]".
+        Napr. "samples/ok?fps=10", "/data/linka.avi?fps=0&loop=0".
+        """
+        path, _, query = (url or "").strip().partition("?")
+        if not path:
+            raise ValueError("Replay: chýba cesta k priečinku/videu")
+        q = {k: v[-1] for k, v in parse_qs(query).items()}
+        flag = lambda k, d: q.get(k, str(int(d))).lower() in ("1", "true", "yes", "on")
+        return cls(path, fps=float(q.get("fps", 30.0)), loop=flag("loop", True),
+                   preload=q.get("preload", PRELOAD_MEMORY), gray=flag("gray", False),
+                   max_frames=int(q.get("max_frames", 0)), cache_dir=q.get("cache_dir"))
+
+    # -------------------- zdroj --------------------
+
+    def _is_video(self) -> bool:
+        return os.path.isfile(self.source) and not self.source.lower().endswith(IMAGE_EXTS)
+
+    def _list_files(self) -> List[str]:
+        p = Path(self.source)
+        if p.is_dir():
+            files = sorted(str(f) for f in p.iterdir() if f.suffix.lower() in IMAGE_EXTS)
+        elif p.is_file():
+            files = [str(p)]
+        else:
+            files = sorted(str(f) for f in Path(p.parent if str(p.parent) else ".").glob(p.name)
+                           if f.suffix.lower() in IMAGE_EXTS)  # glob vzor, napr. samples/ok/*.png
+        return files[:self.max_frames] if self.max_frames else files
+
+    def _fit(self, img: np.ndarray) -> np.ndarray:
+        if self.gray and img.ndim == 3:
+            img = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+        if self._shape is None:
+            self._shape = img.shape
+        elif img.shape != self._shape:
+            if img.ndim != len(self._shape):
+                img = cv.cvtColor(img, cv.COLOR_GRAY2BGR if img.ndim == 2 else cv.COLOR_BGR2GRAY)
+            if img.shape[:2] != self._shape[:2]:
+                img = cv.resize(img, (self._shape[1], self._shape[0]), interpolation=cv.INTER_AREA)
+        return img
+
+    def _iter_decoded(self):
+        """Všetky snímky zdroja (dekódované, zjednotený tvar) – pre preload."""
+        if self._is_video():
+            cap = cv.VideoCapture(self.source)
+            try:
+                n = 0
+                while not self.max_frames or n < self.max_frames:
+                    ok, frm = cap.read()
+                    if not ok:
+                        break
+                    n += 1
+                    yield self._fit(frm)
+            finally:
+                cap.release()
+        else:
+            for f in self._files:
+                img = cv.imread(f, cv.IMREAD_GRAYSCALE if self.gray else cv.IMREAD_COLOR)
+                if img is not None:
+                    yield self._fit(img)
+
+    def _cache_path(self) -> Path:
+        # aj zoznam súborov: zmazaný/pridaný obrázok = iný kľúč (samotné mtime zmazanie neodhalí)
+        key = f"{os.path.abspath(self.source)}|{self.gray}|{self.max_frames}|{len(self._files)}|" + \
+              "\n".join(os.path.basename(f) for f in self._files)
+        name = f"{Path(self.source).name or 'replay'}.{hashlib.sha1(key.encode()).hexdigest()[:10]}.replay.npy"
+        d = Path(self.cache_dir) if self.cache_dir else (Path(self.source).parent if not Path(self.source).is_dir()
+                                                          else Path(self.source))
+        return d / name
+
+    def _source_mtime(self) -> float:
+        paths = [self.source] if self._is_video() else self._files
+        return max((os.path.getmtime(p) for p in paths if os.path.exists(p)), default=0.0)
+
+    def _frame_count(self) -> int:
+        """Počet snímok zdroja bez dekódu do RAM (video: CAP_PROP_FRAME_COUNT, inak grab() cez celé video)."""
+        if not self._is_video():
+            return len(self._files)
+        cap = cv.VideoCapture(self.source)
+        try:
+            n = int(cap.get(cv.CAP_PROP_FRAME_COUNT) or 0)
+            if n <= 0:  # kontajner počet nepozná -> spočítaj (grab bez konverzie snímky)
+                while (not self.max_frames or n < self.max_frames) and cap.grab():
+                    n += 1
+        finally:
+            cap.release()
+        return min(n, self.max_frames) if self.max_frames else n
+
+    def _load_memmap(self) -> np.ndarray:
+        """
+        Dekód raz do .npy cache po snímkach (v RAM je vždy len jedna) – aj zdroj väčší než RAM.
+        Tvar/dtype z prvej snímky, počet vopred; ak video dá menej snímok, cache sa prepíše na skutočný počet.
+        """
+        path = self._cache_path()
+        if path.exists() and path.stat().st_mtime >= self._source_mtime():
+            return np.load(str(path), mmap_mode="r")
+        frames = self._iter_decoded()
+        first = next(frames, None)
+        n = self._frame_count()
+        if first is None or n <= 0:
+            raise RuntimeError(f"Replay: žiadne snímky v {self.source}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npy")
+        mm = np.lib.format.open_memmap(str(tmp), mode="w+", dtype=first.dtype, shape=(n,) + first.shape)
+        mm[0] = first
+        got = 1
+        for f in frames:
+            if got >= n:
+                break  # video dalo viac snímok, než hlásilo – cache má ohlásený počet
+            mm[got] = f
+            got += 1
+        frames.close()
+        mm.flush()
+        if got < n:
+            # menej snímok (nečitateľné obrázky, nepresný počet vo videu) -> prepis na got po blokoch
+            tmp2 = path.with_suffix(".tmp2.npy")
+            out = np.lib.format.open_memmap(str(tmp2), mode="w+", dtype=first.dtype, shape=(got,) + first.shape)
+            step = max(1, (64 << 20) // max(1, first.nbytes))
+            for i in range(0, got, step):
+                out[i:min(i + step, got)] = mm[i:min(i + step, got)]
+            out.flush()
+            del out
+            del mm
+            os.replace(tmp2, tmp)
+        else:
+            del mm
+        os.replace(tmp, path)
+        return np.load(str(path), mmap_mode="r")
+
+    # -------------------- ICamera --------------------
+
+    def open(self) -> None:
+        self.finished = False
+        self._pos, self._seq, self._shape = 0, -1, None
+        self._files = [] if self._is_video() else self._list_files()
+        if self.preload == PRELOAD_MEMORY:
+            frames = list(self._iter_decoded())
+            if not frames:
+                raise RuntimeError(f"Replay: žiadne snímky v {self.source}")
+            self._stack = np.stack(frames)
+        elif self.preload == PRELOAD_MEMMAP:
+            self._stack = self._load_memmap()
+        else:
+            self._stack = None
+            if self._is_video():
+                self._cap = cv.VideoCapture(self.source)
+                if not self._cap.isOpened():
+                    raise RuntimeError(f"Replay: video sa neotvorilo: {self.source}")
+            elif not self._files:
+                raise RuntimeError(f"Replay: žiadne snímky v {self.source}")
+        if self._stack is not None:
+            if self._stack.flags.writeable:
+                self._stack.setflags(write=False)  # konzument dostáva view – nesmie prepísať zásobník
+            self._n = len(self._stack)
+        elif self._cap is not None:
+            self._n = int(self._cap.get(cv.CAP_PROP_FRAME_COUNT) or 0)
+        else:
+            self._n = len(self._files)
+
+    def close(self) -> None:
+        self.stop()
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._stack = None
+        self._ring.clear()
+
+    def start(self) -> None:
+        if self.fps <= 0 or (self._th and self._th.is_alive()):
+            return  # fps = 0: snímky sa vydávajú na požiadanie, vlákno netreba
+        if self._stack is None and self._cap is None and not self._files:
+            self.open()  # start() bez open() – ako pri RTSP kamere
+        self._run = True
+        self._th = threading.Thread(target=self._loop, daemon=True)
+        self._th.start()
+
+    def stop(self) -> None:
+        self._run = False
+        if self._th:
+            self._th.join(timeout=1.0)
+        self._th = None
+
+    def set_exposure(self, exposure_ms: float) -> None: pass
+    def set_gain(self, gain_db: float) -> None: pass
+    def set_trigger_mode(self, enabled: bool) -> None: pass
+
+    def __len__(self) -> int:
+        return self._n
+
+    # -------------------- snímky --------------------
+
+    def _next_frame(self, buf: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Ďalšia snímka podľa _pos (s loopom); None = koniec zdroja."""
+        if self._cap is None and self._pos >= self._n:  # video bez preloadu: koniec zistí až read()
+            if not self.loop:
+                self.finished = True
+                return None
+            self._pos = 0
+        if self._stack is not None:
+            frm = self._stack[self._pos]
+        elif self._cap is not None:
+            ok, frm = self._cap.read(buf) if buf is not None else self._cap.read()
+            if not ok:
+                if not self.loop:
+                    self.finished = True
+                    return None
+                self._cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+                self._pos = 0
+                ok, frm = self._cap.read(buf) if buf is not None else self._cap.read()
+                if not ok:
+                    self.finished = True
+                    return None
+            frm = self._fit(frm)
+        else:
+            frm = cv.imread(self._files[self._pos], cv.IMREAD_GRAYSCALE if self.gray else cv.IMREAD_COLOR)
+            if frm is None:
+                raise RuntimeError(f"Replay: nečitateľná snímka {self._files[self._pos]}")
+            frm = self._fit(frm)
+        self._pos += 1
+        return frm
+
+    def _loop(self):
+        period = 1.0 / self.fps
+        t_next = time.monotonic()
+        while self._run:
+            slot, buf = self._ring.writable()
+            t0 = time.monotonic()
+            try:
+                with self._lock:
+                    frm = self._next_frame(buf if self._stack is None else None)
+            except Exception:
+                frm = None  # nečitateľný súbor počas prehrávania = koniec (ako koniec zdroja)
+                self.finished = True
+            if frm is None:
+                break  # koniec zdroja bez loopu
+            self._ring.commit(slot, frm, self._stats.on_frame(t0))
+            if self._on_new_frame:
+                try: self._on_new_frame(self._ring.latest().frame)
+                except: pass
+            # rovnomerné tempo podľa plánu (nie sleep(period) – ten by sčítal oneskorenia)
+            t_next += period
+            delay = t_next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                t_next = time.monotonic()  # nestíhame (napr. dekód z disku) – neháň stratený čas
+
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100) -> Optional[FramePacket]:
+        if self.fps > 0:
+            return self._ring.get_after(seq, timeout_ms / 1000.0)
+        # fps = 0: ďalšia snímka hneď (každá práve raz), view bez kópie
+        with self._lock:
+            t0 = time.monotonic()
+            frm = self._next_frame()
+            if frm is None:
+                return None
+            self._seq += 1
+            ts = self._stats.on_frame(t0)
+        if frm.flags.writeable:
+            frm = frm.view()
+            frm.setflags(write=False)
+        return FramePacket(self._seq, ts, frm)
+
+    def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
+        if self.fps > 0:
+            pkt = self._ring.latest() or self._ring.get_after(-1, timeout_ms / 1000.0)
+        else:
+            pkt = self.get_frame_after(-1, timeout_ms)
+        return np.array(pkt.frame) if pkt is not None else None  # kópia (volajúci si ju môže meniť)
@@ -1,32 +1,56 @@
 # io/cameras/rtsp_camera.py
+import os
 import cv2 as cv
 import time
 import threading
 from typing import Optional, Callable
 import numpy as np
-from interfaces.camera import ICamera, Frame
+from interfaces.camera import ICamera, Frame, FramePacket, CaptureStats
+from qcio.cameras.frame_ring import FrameRing
+
+# FFmpeg voľby pre low-latency (formát OPENCV_FFMPEG_CAPTURE_OPTIONS: "kľúč;hodnota|kľúč;hodnota"):
+# bez vstupného bufferu, low_delay dekód, žiadne čakanie na preusporiadanie paketov
+LOW_DELAY_FFMPEG_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;0|reorder_queue_size;0"
+_ENV_LOCK = threading.Lock()  # env premenná je globálna pre proces; kamery sa neotvárajú naraz
 
 class RTSPCamera(ICamera):
     """
     ELI5: Načítava RTSP stream do background threadu a drží posledný frame.
-    get_frame() vráti posledný snímok (čaká do timeoutu, kým niečo príde).
-    Pozn.: RTSP zvyčajne nemá HW trigger; trigger() je tu no-op.
+    get_frame() vráti kópiu posledného snímku (čaká do timeoutu, kým niečo príde).
+    get_frame_after(seq) vráti len NOVÚ snímku (seq, timestamp, read-only view z ringu, bez kópie).
+    Pozn.: RTSP nemá HW trigger; trigger() len zapamätá čas a get_frame_after_trigger() počká
+    na prvú snímku z ringu zachytenú po ňom (snímky spred príchodu dielu sa nepoužijú).
+
+    low_latency=True: keď je konzument (alebo dekóder) pomalší než stream, FFmpeg si snímky hromadí
+    a inšpekcia vidí diel spred stoviek ms. V tomto režime:
+      - otvára sa s low-delay FFmpeg voľbami (ffmpeg_options) a CAP_PROP_BUFFERSIZE=buffer_size,
+      - po každom grab() sa ďalej grab()-uje, kým snímky chodia "hneď" (= čakali v bufferi),
+        a retrieve() (konverzia do BGR + zápis do ringu) sa robí len pre najnovšiu,
+      - stats(): "skipped" = preskočené staré snímky.
+    stats()["lag_ms"] (v oboch režimoch) = o koľko snímka meškala za streamom (príchod vs. PTS,
+    voči najlepšiemu videnému stavu) – rastie, keď sa tvorí buffer; podľa toho sa oplatí low_latency zapnúť.
     """
 
     def __init__(self, url: str, width: Optional[int] = None, height: Optional[int] = None,
-                 reconnect_sec: float = 2.0, backend: int = cv.CAP_FFMPEG):
+                 reconnect_sec: float = 2.0, backend: int = cv.CAP_FFMPEG, ring_size: int = 4,
+                 low_latency: bool = False, buffer_size: int = 1, max_drain: int = 30,
+                 ffmpeg_options: str = LOW_DELAY_FFMPEG_OPTIONS):
         self.url = url
         self.width = width
         self.height = height
         self.reconnect_sec = reconnect_sec
         self.backend = backend
+        self.low_latency = bool(low_latency)
+        self.buffer_size = int(buffer_size)
+        self.max_drain = max(0, int(max_drain))
+        self.ffmpeg_options = ffmpeg_options
+        self._drain_s = 0.010  # grab rýchlejší než toto = snímka už čakala v bufferi (prepočíta sa z FPS)
 
         self._cap: Optional[cv.VideoCapture] = None
         self._th: Optional[threading.Thread] = None
         self._run = False
-        self._lock = threading.Lock()
-        self._cond = threading.Condition(self._lock)
-        self._last: Optional[Frame] = None
+        self._stats = CaptureStats()
+        self._ring = FrameRing(ring_size, on_drop=self._stats.on_dropped)  # posledné snímky so seq/ts; dekóduje sa rovno do slotov
         self._on_new_frame: Optional[Callable[[Frame], None]] = None
 
     def open(self) -> None:
@@ -36,10 +60,28 @@ class RTSPCamera(ICamera):
         if self._cap is not None:
             try: self._cap.release()
             except: pass
-        self._cap = cv.VideoCapture(self.url, self.backend)
+        if self.low_latency and self.ffmpeg_options and self.backend == cv.CAP_FFMPEG:
+            # voľby číta FFmpeg backend pri otvorení; používateľom nastavenú env premennú neprepisujeme
+            with _ENV_LOCK:
+                key = "OPENCV_FFMPEG_CAPTURE_OPTIONS"
+                prev = os.environ.get(key)
+                if prev is None:
+                    os.environ[key] = self.ffmpeg_options
+                try:
+                    self._cap = cv.VideoCapture(self.url, self.backend)
+                finally:
+                    if prev is None:
+                        os.environ.pop(key, None)
+        else:
+            self._cap = cv.VideoCapture(self.url, self.backend)
         # voliteľné nastavenie rozlíšenia ak stream dovolí
         if self.width:  self._cap.set(cv.CAP_PROP_FRAME_WIDTH,  self.width)
         if self.height: self._cap.set(cv.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.low_latency:
+            self._cap.set(cv.CAP_PROP_BUFFERSIZE, self.buffer_size)  # backend, ktorý to nepodporuje, ignoruje
+            fps = self._cap.get(cv.CAP_PROP_FPS) or 0.0
+            # snímka "z bufferu" príde výrazne skôr než za interval snímok; 1/4 intervalu je bezpečná hranica
+            self._drain_s = 0.25 / fps if 1.0 <= fps <= 240.0 else 0.010
 
     def close(self) -> None:
         self.stop()
@@ -63,10 +105,6 @@ class RTSPCamera(ICamera):
             self._th.join(timeout=1.0)
         self._th = None
 
-    def trigger(self) -> None:
-        # RTSP nemá HW trigger; berieme posledný dostupný frame
-        pass
-
     def set_exposure(self, exposure_ms: float) -> None: pass
     def set_gain(self, gain_db: float) -> None: pass
     def set_trigger_mode(self, enabled: bool) -> None: pass
@@ -76,11 +114,19 @@ class RTSPCamera(ICamera):
         while self._run:
             if self._cap is None or not self._cap.isOpened():
                 self._open_cap()
+                self._stats.on_reconnect()
                 time.sleep(backoff)
 
             ok, frame = (False, None)
+            slot, buf = self._ring.writable()
+            t0 = time.monotonic()
             try:
-                ok, frame = self._cap.read()
+                if self.low_latency:
+                    ok, frame, t_frame = self._read_latest(buf)
+                else:
+                    # dekód rovno do recyklovaného bufferu slotu (žiadna alokácia na snímku)
+                    ok, frame = self._cap.read(buf) if buf is not None else self._cap.read()
+                    t_frame = None
             except Exception:
                 ok = False
 
@@ -94,18 +140,41 @@ class RTSPCamera(ICamera):
                 self._cap = None
                 continue
 
-            # máme frame
-            with self._cond:
-                self._last = frame
-                self._cond.notify_all()
+            # máme frame (timestamp = koniec read/dekódu; low-latency: kedy bola najnovšia snímka k dispozícii)
+            ts = self._stats.on_frame(t0, t_frame)
+            self._stats.on_pts(ts, self._cap.get(cv.CAP_PROP_POS_MSEC))
+            self._ring.commit(slot, frame, ts)
             if self._on_new_frame:
-                try: self._on_new_frame(frame)
+                try: self._on_new_frame(self._ring.latest().frame)
                 except: pass
 
+    def _read_latest(self, buf):
+        """
+        grab() čaká na ďalšiu snímku; ďalšie grab()-y, ktoré sa vrátia hneď, vyprázdňujú buffer
+        (tie snímky sú staré). retrieve() len pre poslednú. Vracia (ok, frame, čas poslednej snímky).
+        """
+        t1 = time.monotonic()
+        if not self._cap.grab():
+            return False, None, None
+        t_frame = time.monotonic()
+        skipped = 0
+        buffered = t_frame - t1 <= self._drain_s  # čakali sme na ňu? nie = bola v bufferi, sú aj novšie
+        while buffered and skipped < self.max_drain:
+            t1 = time.monotonic()
+            if not self._cap.grab():
+                return False, None, None  # stream spadol uprostred vyprázdňovania -> reconnect
+            skipped += 1
+            t_frame = time.monotonic()
+            buffered = t_frame - t1 <= self._drain_s  # táto už prišla "naživo" = najnovšia
+        if skipped:
+            self._stats.on_skipped(skipped)
+        ok, frame = self._cap.retrieve(buf) if buf is not None else self._cap.retrieve()
+        return ok, frame, t_frame
+
     def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
-        with self._cond:
-            if self._last is not None:
-                return self._last.copy()
-            # čakáme na prvý frame
-            self._cond.wait(timeout=timeout_ms/1000.0)
-            return self._last.copy() if self._last is not None else None
+        # kópia (volajúci si ju môže meniť); bez kópie => get_frame_after
+        pkt = self._ring.latest() or self._ring.get_after(-1, timeout_ms / 1000.0)
+        return pkt.frame.copy() if pkt is not None else None
+
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100) -> Optional[FramePacket]:
+        return self._ring.get_after(seq, timeout_ms / 1000.0)
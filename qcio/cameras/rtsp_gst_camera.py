@@ -3,7 +3,8 @@ import cv2 as cv
 import time, threading
 from typing import Optional, Callable
 import numpy as np
-from interfaces.camera import ICamera, Frame
+from interfaces.camera import ICamera, Frame, FramePacket, CaptureStats
+from qcio.cameras.frame_ring import FrameRing
 
 def build_gst_pipeline(rtsp_url: str, latency_ms: int = 0) -> str:
     """
@@ -17,22 +18,22 @@ def build_gst_pipeline(rtsp_url: str, latency_ms: int = 0) -> str:
         f"nvv4l2decoder ! "
         f"nvvidconv ! video/x-raw,format=BGRx ! "
         f"videoconvert ! video/x-raw,format=BGR ! "
-        f"appsink drop=true sync=false"
+        f"appsink drop=true max-buffers=1 sync=false"  # drop bez max-buffers nič nezahadzuje (default = neobmedzene)
     )
 
 class RTSPGstCamera(ICamera):
     """
-    ELI5: GStreamer kamera s HW dekódom. Background thread udržiava posledný frame.
+    ELI5: GStreamer kamera s HW dekódom. Background thread plní ring posledných snímok
+    (seq + timestamp); get_frame_after(seq) vráti novú snímku ako read-only view bez kópie.
     """
-    def __init__(self, url: str, latency_ms: int = 0):
+    def __init__(self, url: str, latency_ms: int = 0, ring_size: int = 4):
         self.url = url
         self.latency_ms = latency_ms
         self._cap: Optional[cv.VideoCapture] = None
         self._run = False
         self._th: Optional[threading.Thread] = None
-        self._lock = threading.Lock()
-        self._cond = threading.Condition(self._lock)
-        self._last: Optional[Frame] = None
+        self._stats = CaptureStats()
+        self._ring = FrameRing(ring_size, on_drop=self._stats.on_dropped)
         self._on_new_frame: Optional[Callable[[Frame], None]] = None
 
     def open(self) -> None:
@@ -62,27 +63,29 @@ class RTSPGstCamera(ICamera):
             self._th.join(timeout=1.0)
         self._th = None
 
-    def trigger(self) -> None: pass
     def set_exposure(self, exposure_ms: float) -> None: pass
     def set_gain(self, gain_db: float) -> None: pass
     def set_trigger_mode(self, enabled: bool) -> None: pass
 
     def _loop(self):
         while self._run:
-            ok, frame = self._cap.read() if self._cap is not None else (False, None)
+            slot, buf = self._ring.writable()
+            t0 = time.monotonic()
+            if self._cap is None:
+                ok, frame = (False, None)
+            else:
+                ok, frame = self._cap.read(buf) if buf is not None else self._cap.read()
             if not ok or frame is None:
                 time.sleep(0.01)
                 continue
-            with self._cond:
-                self._last = frame
-                self._cond.notify_all()
+            self._ring.commit(slot, frame, self._stats.on_frame(t0))
             if self._on_new_frame:
-                try: self._on_new_frame(frame)
+                try: self._on_new_frame(self._ring.latest().frame)
                 except: pass
 
     def get_frame(self, timeout_ms: int = 100) -> Optional[Frame]:
-        with self._cond:
-            if self._last is not None:
-                return self._last.copy()
-            self._cond.wait(timeout=timeout_ms/1000.0)
-            return self._last.copy() if self._last is not None else None
+        pkt = self._ring.latest() or self._ring.get_after(-1, timeout_ms / 1000.0)
+        return pkt.frame.copy() if pkt is not None else None
+
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100) -> Optional[FramePacket]:
+        return self._ring.get_after(seq, timeout_ms / 1000.0)
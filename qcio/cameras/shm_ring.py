@@ -0,0 +1,97 @@
+# qcio/cameras/shm_ring.py
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import numpy as np
+
+# hlavička slotu: h, w, c, seq (int64) + ts (float64 uložený cez view)
+_HDR_FIELDS = 5
+
+
+class ShmFrameRing:
+    """
+    ELI5: Kruh snímok v zdieľanej pamäti (multiprocessing.shared_memory) medzi procesmi.
+      - jeden proces (capture / farma) zapisuje do slotu, iné procesy ho čítajú ako numpy view bez kópie,
+      - slot má pevnú max. veľkosť (max_shape); skutočný rozmer snímky je v hlavičke slotu,
+      - KTO smie do slotu písať, tu nerieši nik: sloty si medzi procesmi posúvajú fronty
+        (voľné sloty -> zápis -> job -> worker -> výsledok -> voľné sloty), takže zámok netreba.
+    create=True vytvorí pamäť (vlastník ju na konci unlink()-ne), inak sa pripojí podľa mena.
+    """
+
+    def __init__(self, slots: int, max_shape: Tuple[int, ...], name: Optional[str] = None, create: bool = True):
+        self.slots = max(1, int(slots))
+        shape = tuple(int(v) for v in max_shape)
+        self.max_shape = shape if len(shape) == 3 else (shape[0], shape[1], 1)
+        self.slot_bytes = int(np.prod(self.max_shape))
+        hdr_bytes = self.slots * _HDR_FIELDS * 8
+        size = hdr_bytes + self.slots * self.slot_bytes
+        self._owner = bool(create)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self._hdr = np.ndarray((self.slots, _HDR_FIELDS), np.int64, self.shm.buf[:hdr_bytes])
+        self._ts = self._hdr.view(np.float64)  # stĺpec 4 = ts
+        self._data = np.ndarray((self.slots, self.slot_bytes), np.uint8, self.shm.buf[hdr_bytes:size])
+        if create:
+            self._hdr[:] = 0
+            self._hdr[:, 3] = -1
+
+    @classmethod
+    def attach(cls, name: str, slots: int, max_shape: Tuple[int, ...]) -> "ShmFrameRing":
+        return cls(slots, max_shape, name=name, create=False)
+
+    def spec(self) -> Tuple[str, int, Tuple[int, ...]]:
+        """(name, slots, max_shape) – stačí poslať do iného procesu a tam ShmFrameRing.attach(*spec)."""
+        return self.name, self.slots, self.max_shape
+
+    # -------------------- zápis --------------------
+
+    def write(self, slot: int, frame: np.ndarray, seq: int, ts: float) -> None:
+        """Skopíruje snímku (uint8, HxW alebo HxWxC) do slotu; väčšia než max_shape = ValueError."""
+        frame = np.asarray(frame)
+        if frame.dtype != np.uint8:
+            raise ValueError(f"ShmFrameRing: len uint8, nie {frame.dtype}")
+        h, w = frame.shape[:2]
+        c = 1 if frame.ndim == 2 else frame.shape[2]
+        if h > self.max_shape[0] or w > self.max_shape[1] or c > self.max_shape[2]:
+            raise ValueError(f"ShmFrameRing: snímka {frame.shape} je väčšia než slot {self.max_shape}")
+        dst = self._data[slot, :h * w * c].reshape(frame.shape)
+        np.copyto(dst, frame)
+        self._hdr[slot, 0:4] = (h, w, c, seq)
+        self._ts[slot, 4] = ts
+
+    def writable_view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """View slotu v danom tvare – kamera/dekodér tam môže písať priamo (potom publish())."""
+        n = int(np.prod(shape))
+        if n > self.slot_bytes:
+            raise ValueError(f"ShmFrameRing: {shape} je väčšie než slot {self.max_shape}")
+        return self._data[slot, :n].reshape(shape)
+
+    def publish(self, slot: int, shape: Tuple[int, ...], seq: int, ts: float) -> None:
+        h, w = shape[:2]
+        c = 1 if len(shape) == 2 else shape[2]
+        self._hdr[slot, 0:4] = (h, w, c, seq)
+        self._ts[slot, 4] = ts
+
+    # -------------------- čítanie --------------------
+
+    def read(self, slot: int) -> Tuple[int, float, np.ndarray]:
+        """(seq, ts, read-only view snímky) – bez kópie; platí, kým sa slot nevráti medzi voľné."""
+        h, w, c, seq = (int(v) for v in self._hdr[slot, 0:4])
+        shape = (h, w) if c == 1 else (h, w, c)
+        v = self._data[slot, :h * w * c].reshape(shape)
+        v.setflags(write=False)
+        return seq, float(self._ts[slot, 4]), v
+
+    # -------------------- koniec --------------------
+
+    def close(self) -> None:
+        """Pustí views a odpojí pamäť; vlastník ju aj zmaže (unlink)."""
+        self._hdr = self._ts = self._data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # niekto ešte drží view; pamäť sa uvoľní s procesom
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
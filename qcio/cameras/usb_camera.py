@@ -3,6 +3,7 @@ import sys
 import cv2
 import threading
 import time
+from interfaces.camera import CaptureStats, FramePacket
 
 class USBCamera:
     """
@@ -11,13 +12,21 @@ class USBCamera:
       - start_stream(index, frame_callback, settings: dict | None, backend: Optional[int])
       - stop_stream()
       - get_current_frame() -> posledný frame (BGR) alebo None
+      - get_frame_after(seq, timeout_ms) -> FramePacket(seq, ts, frame) so seq > seq, inak None po timeoute
+        (ts = monotónny čas zachytenia, rovnaký ako pri ostatných kamerách)
+      - stats() -> telemetria snímania (fps, read_ms, dropped, reconnects, ...)
     """
     def __init__(self):
         self.cap = None
         self.thread = None
         self.running = False
         self.last_frame = None
+        self.last_seq = -1     # seq posledného frame (rastie o 1)
+        self.last_ts = None    # monotónny capture timestamp posledného frame
         self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # čitatelia get_frame_after čakajú na nový frame
+        self._stats = CaptureStats()
+        self._consumed = True  # posledný frame si už niekto vyzdvihol (inak ho ďalší prepíše = drop)
 
     # ---------------- interné pomocné ----------------
     def _pick_backends(self, preferred=None):
@@ -114,6 +123,8 @@ class USBCamera:
         def _worker():
             backends = self._pick_backends(backend)
             self.cap = self._open_with_backends(device_index, backends)
+            if self._stats.frames:
+                self._stats.on_reconnect()  # stream už bežal => toto je znovuotvorenie
             if not self.cap:
                 self.running = False
                 return
@@ -123,12 +134,20 @@ class USBCamera:
 
             # loop
             while self.running:
+                t0 = time.monotonic()
                 ok, frame = self.cap.read()
                 if not ok or frame is None:
                     time.sleep(0.01)
                     continue
-                with self._lock:
+                ts = self._stats.on_frame(t0)
+                with self._cond:
+                    if not self._consumed:
+                        self._stats.on_dropped()
                     self.last_frame = frame.copy()
+                    self.last_seq += 1
+                    self.last_ts = ts
+                    self._consumed = False
+                    self._cond.notify_all()
                 try:
                     if callable(frame_callback):
                         frame_callback(frame)
@@ -164,4 +183,26 @@ class USBCamera:
 
     def get_current_frame(self):
         with self._lock:
-            return None if self.last_frame is None else self.last_frame.copy()
+            if self.last_frame is None:
+                return None
+            self._consumed = True
+            return self.last_frame.copy()
+
+    def get_frame_after(self, seq: int = -1, timeout_ms: int = 100):
+        """Najnovší frame so seq > seq ako FramePacket (kópia); čaká max timeout_ms, inak None."""
+        deadline = time.monotonic() + max(0.0, timeout_ms) / 1000.0
+        with self._cond:
+            while self.last_frame is None or self.last_seq <= seq:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+            self._consumed = True
+            return FramePacket(self.last_seq, self.last_ts, self.last_frame.copy())
+
+    def apply_settings(self, settings: dict):
+        """Nastavenia (expozícia, gain, ...) za behu streamu."""
+        self._apply_settings(settings or {})
+
+    def stats(self) -> dict:
+        return self._stats.snapshot()
@@ -8,7 +8,28 @@ DEFAULTS: Dict[str, Any] = {
     "active_profile": None,
     "ui": {
         "theme": "dark"  # "dark" alebo "light"
-    }
+    },
+    # ONNX Runtime pre YOLO (globálne defaulty; recept "yolo_engine" / tool params "engine" ich prepíšu)
+    "yolo_engine": {
+        "providers": "auto",          # "auto" | "cpu" | [zoznam providerov]
+        "intra_op_threads": 0,        # 0 = nechaj na ORT
+        "inter_op_threads": 0,
+        "execution_mode": "sequential",
+        "graph_opt": "all",           # disable | basic | extended | all
+        "optimized_model_path": "",   # priečinok pre optimalizované grafy (súbor na model + providery)
+        "warmup": 1,
+        "io_binding": True
+    },
+    # register ONNX session (spoločný pre všetky recepty): rozpočet pamäte + LRU
+    "model_registry": {
+        "budget_mb": 2048,            # 0 = bez limitu
+        "mem_factor": 3.0             # odhad pamäte session = veľkosť .onnx * mem_factor
+    },
+    # ďalšie stanice (kamery na ten istý diel) popri hlavnej; hlavná = kamera/recept z Nastavení
+    # [{"name": "bok", "camera_type": "RTSP (OpenCV/FFmpeg)", "url": "rtsp://...", "recipe": "...", "reg_base": 220}]
+    "stations": [],
+    # PLC cyklus: max čakanie na prvú snímku zachytenú po hrane triggeru (potom NOK "no frame after trigger")
+    "trigger_timeout_ms": 500
 }
 
 class SettingsStore:
@@ -48,6 +69,38 @@ class SettingsStore:
         self.data.setdefault("ui", {})["theme"] = (theme or "dark").lower()
         self.save()
 
+    # --- YOLO engine (ONNX Runtime) ---
+    def get_yolo_engine(self) -> Dict[str, Any]:
+        return dict(self.data.get("yolo_engine") or {})
+
+    def set_yolo_engine(self, opts: Dict[str, Any]):
+        self.data.setdefault("yolo_engine", {}).update(opts or {})
+        self.save()
+
+    # --- register modelov ---
+    def get_model_registry(self) -> Dict[str, Any]:
+        return dict(self.data.get("model_registry") or {})
+
+    def set_model_registry(self, opts: Dict[str, Any]):
+        self.data.setdefault("model_registry", {}).update(opts or {})
+        self.save()
+
+    # --- ďalšie stanice ---
+    def get_stations(self) -> List[Dict[str, Any]]:
+        return [dict(st) for st in (self.data.get("stations") or [])]
+
+    def set_stations(self, stations: List[Dict[str, Any]]):
+        self.data["stations"] = [dict(st) for st in stations]
+        self.save()
+
+    # --- PLC trigger ---
+    def get_trigger_timeout_ms(self) -> int:
+        return int(self.data.get("trigger_timeout_ms") or DEFAULTS["trigger_timeout_ms"])
+
+    def set_trigger_timeout_ms(self, ms: int):
+        self.data["trigger_timeout_ms"] = max(1, int(ms))
+        self.save()
+
     # --- camera profiles ---
     def profiles(self) -> List[Dict[str,Any]]:
         # doplníme default "type" pre staršie profily